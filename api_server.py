@@ -0,0 +1,442 @@
+"""設計計算的本機 HTTP/JSON API (無介面，供其他工具取用 design_inputV6.py 的計算結果)
+
+用法：
+    python api_server.py                         # http://127.0.0.1:8600
+    python api_server.py --port 8700 --workers 4
+    python api_server.py --bench                 # 在本機啟動並量測吞吐量與延遲 (未達目標時結束碼 1)
+
+端點：
+    GET  /health    服務狀態
+    GET  /options   可用的玻璃 / 外牆 / 主筋 / 混凝土強度選項
+    POST /design    單一方案 (JSON 物件) → climate / layout / check / rebar / cost
+    POST /batch     {"designs": [...]} → 逐筆結果 (與 batch_cli 相同的向量化計算，分塊交給行程池)
+
+/design 欄位 (皆可省略，預設與 design_inputV6.py 相同)：
+    lat, land_width, land_depth, floors, span_x, span_y, glass, wall, window_ratio,
+    fc, col_w, col_d, rebar_size, p_conc, p_steel, floors_below, basement_load,
+    transitions ([[起始樓層索引, 柱寬, 柱深, f'c], ...])、site (頂點 [[x, y], ...]、頂點文字或 GeoJSON)
+    floors 為地上樓層數 (外牆只計地上樓層)；fc / col_w / col_d 與變斷面的尺寸、強度必須大於 0，
+    floors_below >= 0，0 <= window_ratio <= 1，不符時回 400 並指出欄位。
+/batch 每筆的欄位同 batch_cli (矩形基地，land_width / land_depth 必填)。
+
+每個連線由一條執行緒接收，計算交給工作池 (/design 用執行緒池、/batch 用行程池)，
+同時處理中的請求超過 --max-pending 時回 503。錯誤的輸入回 400 與 {"error": 訊息}。
+
+效能目標 (單核心、本機、--bench 驗證，量測用的用戶端與伺服器在同一行程)：
+    /design   單筆計算約 2 ms；8 個同時連線下吞吐量 > 100 req/s、延遲 p95 < 100 ms (含排隊)
+    /batch    10,000 筆一次請求 < 1.5 s
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import design_engine as engine
+import rebar_layout
+
+HOST = "127.0.0.1"
+PORT = 8600
+BATCH_CHUNK = 5000          # /batch 每個行程池工作單元的筆數
+MAX_BODY = 64 * 2**20       # 請求內容上限 (bytes)
+
+# 與 design_inputV6.py 介面相同的預設值 (glass 未給時依緯度智慧預設)
+DESIGN_DEFAULTS = {
+    "lat": 25.03,
+    "land_width": 12.0,
+    "land_depth": 20.0,
+    "floors": 7,
+    "span_x": 6.0,
+    "span_y": 5.0,
+    "wall": "隔熱塗料",
+    "window_ratio": engine.WINDOW_RATIO,
+    "fc": 280,
+    "col_w": 60,
+    "col_d": 60,
+    "rebar_size": "#8",
+    "p_conc": 2500,
+    "p_steel": 28000,
+    "floors_below": 0,
+    "basement_load": engine.LOAD_INTENSITY,
+}
+
+# 效能目標 (--bench 檢查)
+TARGET_DESIGN_P95_MS = 100.0
+TARGET_DESIGN_RPS = 100.0
+TARGET_BATCH_10K_S = 1.5
+
+
+def _option(value, names, field):
+    """選項名稱或索引 → 索引，未知選項報錯"""
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool) and 0 <= value < len(names):
+        return int(value)
+    if value in names:
+        return names.index(value)
+    raise ValueError(f"{field} 有未知選項：{value!r}，可用：{names}")
+
+
+def _number(params, field, kind=float, low=None, high=None, positive=False):
+    """欄位轉數值並檢查範圍 (low <= 值 <= high；positive 時必須大於 0)，錯誤訊息指出欄位"""
+    try:
+        value = kind(params[field])
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} 必須是數值：{params[field]!r}") from None
+    if not np.isfinite(value):
+        raise ValueError(f"{field} 必須是有限數值：{params[field]!r}")
+    if positive and value <= 0:
+        raise ValueError(f"{field} 必須大於 0：{value!r}")
+    if low is not None and value < low:
+        raise ValueError(f"{field} 不可小於 {low}：{value!r}")
+    if high is not None and value > high:
+        raise ValueError(f"{field} 不可大於 {high}：{value!r}")
+    return value
+
+
+def evaluate_design(params):
+    """單一方案的完整計算 (與 design_inputV6.py 相同的 DAG)，回傳可轉 JSON 的 dict"""
+    from design_dag import build_design_dag
+    import site_polygon
+
+    if not isinstance(params, dict):
+        raise ValueError("請求內容必須是 JSON 物件")
+    unknown = set(params) - set(DESIGN_DEFAULTS) - {"glass", "transitions", "site"}
+    if unknown:
+        raise ValueError(f"未知欄位：{sorted(unknown)}")
+    p = {**DESIGN_DEFAULTS, **params}
+    lat = _number(p, "lat")
+    floors_below = _number(p, "floors_below", int, low=0)
+    floors = _number(p, "floors", int, low=1) + floors_below      # floors 為地上樓層數，DAG 的 floors 含地下層
+    span_x, span_y = _number(p, "span_x", positive=True), _number(p, "span_y", positive=True)
+    glass_idx = (_option(p["glass"], engine.GLASS_NAMES, "glass") if "glass" in p
+                 else int(engine.default_glass_index(lat)))
+    wall_idx = _option(p["wall"], engine.WALL_NAMES, "wall")
+    rebar_idx = _option(p["rebar_size"], engine.REBAR_SIZES, "rebar_size")
+    fc = _number(p, "fc", positive=True)
+
+    site = None
+    if p.get("site") is not None:
+        text = p["site"] if isinstance(p["site"], str) else json.dumps(p["site"])
+        try:
+            site = site_polygon.load_site(text)
+        except (TypeError, KeyError, IndexError) as e:
+            raise ValueError(f"site 格式錯誤：{type(e).__name__}: {e}") from None
+        land_width, land_depth = (float(v) for v in site.max(axis=0))
+    else:
+        land_width, land_depth = _number(p, "land_width"), _number(p, "land_depth")
+        if land_width <= 0 or land_depth <= 0:
+            raise ValueError("land_width / land_depth 必須大於 0")
+    try:
+        transitions = tuple((int(t[0]), float(t[1]), float(t[2]), float(t[3])) for t in p.get("transitions") or ())
+    except (TypeError, ValueError, IndexError):
+        raise ValueError("transitions 格式為 [[起始樓層索引, 柱寬, 柱深, f'c], ...]") from None
+    for i, (start, t_w, t_d, t_fc) in enumerate(transitions):
+        if start < 0:
+            raise ValueError(f"transitions[{i}] 的起始樓層索引不可小於 0：{start}")
+        if not all(np.isfinite(v) and v > 0 for v in (t_w, t_d, t_fc)):
+            raise ValueError(f"transitions[{i}] 的柱寬 / 柱深 / f'c 必須大於 0：{list(transitions[i])}")
+
+    dag = build_design_dag(actual_span=True)
+    dag.set_inputs(lat=lat, land_width=land_width, land_depth=land_depth, site=site, floors=floors,
+                   span_x=span_x, span_y=span_y, glass_idx=glass_idx, wall_idx=wall_idx,
+                   window_ratio=_number(p, "window_ratio", low=0, high=1), fc=fc,
+                   col_w=_number(p, "col_w", positive=True), col_d=_number(p, "col_d", positive=True),
+                   bar_area=float(engine.REBAR_AREA[rebar_idx]), p_conc=_number(p, "p_conc"), p_steel=_number(p, "p_steel"),
+                   floors_below=floors_below, basement_load=_number(p, "basement_load", low=0),
+                   transitions=transitions)
+    if dag["total_cols"] == 0:
+        raise ValueError("基地多邊形內沒有任何柱位")
+
+    zone, desc, strategy, rec_glass, rec_color = dag["climate"]
+    nx, ny = dag["grid"]
+    actual_sx, actual_sy = dag["actual_spans"]
+    check = dag["check"]
+    vol_total, weight_steel = dag["quantity"]
+    land_area = dag["land_area"]
+    return {
+        "climate": {
+            "zone": zone, "description": desc, "strategy": strategy, "recommended_glass": rec_glass,
+            "glass": engine.GLASS_NAMES[glass_idx], "wall": engine.WALL_NAMES[wall_idx],
+            "eewh_score": dag["score"], "facade_cost": dag["cost_facade_total"],
+        },
+        "layout": {
+            "land_area": land_area, "perimeter": dag["perimeter"], "nx": nx, "ny": ny,
+            "total_cols": dag["total_cols"], "actual_span_x": actual_sx, "actual_span_y": actual_sy,
+        },
+        "check": {**check, "n_cols": dag["total_cols"]},
+        "rebar": {"rebar_size": engine.REBAR_SIZES[rebar_idx], "num_bars": dag["num_bars"],
+                  "column_steel": dag["column_steel"], "schedule": rebar_layout.schedule_table(dag["rebar_design"])},
+        "cost": {
+            "vol_total": vol_total, "weight_steel": weight_steel,
+            "cost_structure": dag["cost_structure"], "cost_facade": dag["cost_facade_total"],
+            "grand_total": dag["grand_total"],
+            "per_ping": dag["grand_total"] / (land_area * floors / engine.PING),
+        },
+    }
+
+
+def evaluate_batch_chunk(records, start=0):
+    """行程池工作單元：一塊方案清單 → 結果 dict 清單 (同 batch_cli.evaluate_sites)
+
+    start 為這一塊在整個請求中的位置，錯誤訊息的第幾筆以整個請求計。
+    """
+    import pandas as pd
+    from batch_cli import evaluate_sites
+    out = evaluate_sites(pd.DataFrame.from_records(records, index=pd.RangeIndex(start, start + len(records))))
+    # 只有部分紀錄帶的額外欄位在其他紀錄為 NaN，轉成 JSON 的 null
+    return out.astype(object).where(out.notna(), None).to_dict(orient="records")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"無法轉成 JSON：{type(value).__name__}")
+
+
+class DesignAPI:
+    """工作池與請求計數 (HTTP handler 共用)"""
+
+    def __init__(self, workers=None, max_pending=64):
+        workers = workers or os.cpu_count() or 1
+        self.threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design")
+        self.processes = ProcessPoolExecutor(max_workers=workers)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    def try_acquire(self):
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.requests += 1
+            return True
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def release(self):
+        self._slots.release()
+
+    def design(self, params):
+        return self.threads.submit(evaluate_design, params).result()
+
+    def batch(self, designs):
+        if not isinstance(designs, list) or not all(isinstance(d, dict) for d in designs):
+            raise ValueError('請求格式為 {"designs": [{...}, ...]}')
+        futures = [self.processes.submit(evaluate_batch_chunk, designs[s:s + BATCH_CHUNK], s)
+                   for s in range(0, len(designs), BATCH_CHUNK)]
+        return [row for f in futures for row in f.result()]
+
+    def health(self):
+        with self._lock:
+            return {"status": "ok", "workers": self.workers, "requests": self.requests,
+                    "rejected": self.rejected, "uptime_s": round(time.time() - self.started, 1)}
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        self.processes.shutdown(wait=False, cancel_futures=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    api = None                  # DesignAPI (由 make_server 設定)
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass                    # 不逐筆輸出存取記錄 (量測吞吐量時會成為瓶頸)
+
+    def _send(self, status, payload):
+        try:
+            body = json.dumps(payload, ensure_ascii=False, default=_json_default, allow_nan=False)
+        except ValueError:      # NaN / Infinity 不是合法的 JSON，不送出無法解析的回應
+            status = 500
+            body = json.dumps({"error": "計算結果含有 NaN 或 Infinity"}, ensure_ascii=False)
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.api.health())
+        elif self.path == "/options":
+            self._send(200, {"glass": engine.GLASS_NAMES, "wall": engine.WALL_NAMES,
+                             "rebar_size": engine.REBAR_SIZES, "fc": engine.FC_OPTIONS,
+                             "defaults": DESIGN_DEFAULTS})
+        else:
+            self._send(404, {"error": f"找不到 {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            self._send(413, {"error": f"請求內容超過 {MAX_BODY // 2**20} MB"})
+            return
+        raw = self.rfile.read(length)
+        if self.path not in ("/design", "/batch"):
+            self._send(404, {"error": f"找不到 {self.path}"})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError as e:
+            self._send(400, {"error": f"JSON 格式錯誤：{e}"})
+            return
+        if not self.api.try_acquire():
+            self._send(503, {"error": "伺服器忙碌中，請稍後再試"})
+            return
+        t0 = time.perf_counter()
+        try:
+            if self.path == "/design":
+                result = self.api.design(body)
+            else:
+                designs = body.get("designs") if isinstance(body, dict) else None
+                results = self.api.batch(designs)
+                result = {"count": len(results), "results": results}
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:  # 計算本身的未預期錯誤不應讓伺服器中斷
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            self.api.release()
+        result["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        self._send(200, result)
+
+
+def make_server(host=HOST, port=PORT, workers=None, max_pending=64):
+    """建立 (尚未啟動的) HTTP 伺服器；port=0 時由系統指定可用埠"""
+    api = DesignAPI(workers, max_pending)
+    handler = type("DesignHandler", (Handler,), {"api": api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.api = api
+    return server
+
+
+# ==========================================
+# 本機效能量測 (--bench)
+# ==========================================
+
+def _post(conn, path, payload):
+    body = json.dumps(payload).encode()
+    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = resp.read()
+    if resp.status != 200:
+        raise RuntimeError(f"{path} 回應 {resp.status}：{data[:200]!r}")
+    return json.loads(data)
+
+
+def bench(host, port, clients=8, requests=400, batch_rows=10_000, seed=0):
+    """對執行中的伺服器量測 /design 延遲與吞吐量、/batch 大批次耗時，回傳統計 dict"""
+    from http.client import HTTPConnection
+    rng = np.random.default_rng(seed)
+    payloads = [{"land_width": float(w), "land_depth": float(d), "floors": int(f), "span_x": float(s)}
+                for w, d, f, s in zip(rng.uniform(10, 60, requests), rng.uniform(10, 60, requests),
+                                      rng.integers(3, 30, requests), rng.choice([4.0, 5.0, 6.0, 8.0], requests))]
+    latencies = []
+    lock = threading.Lock()
+
+    def client(k):
+        conn = HTTPConnection(host, port, timeout=60)
+        try:
+            for payload in payloads[k::clients]:
+                t0 = time.perf_counter()
+                _post(conn, "/design", payload)
+                with lock:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            conn.close()
+
+    warm = HTTPConnection(host, port, timeout=60)
+    _post(warm, "/design", {})                                     # 暖身 (匯入)
+    warm.close()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    rows = [{"land_width": p["land_width"], "land_depth": p["land_depth"], "floors": p["floors"]}
+            for p in payloads] * (batch_rows // len(payloads) + 1)
+    conn = HTTPConnection(host, port, timeout=300)
+    _post(conn, "/batch", {"designs": rows[:100]})                 # 暖身行程池
+    t1 = time.perf_counter()
+    result = _post(conn, "/batch", {"designs": rows[:batch_rows]})
+    batch_s = time.perf_counter() - t1
+    conn.close()
+
+    lat = np.array(latencies)
+    return {
+        "clients": clients,
+        "requests": len(lat),
+        "design_p50_ms": float(np.percentile(lat, 50)),
+        "design_p95_ms": float(np.percentile(lat, 95)),
+        "design_p99_ms": float(np.percentile(lat, 99)),
+        "design_rps": len(lat) / wall,
+        "batch_rows": result["count"],
+        "batch_s": batch_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="設計計算 HTTP/JSON API")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="工作池大小 (預設為 CPU 核心數)")
+    parser.add_argument("--max-pending", type=int, default=64, help="同時處理中的請求上限，超過回 503 (預設 64)")
+    parser.add_argument("--bench", action="store_true", help="在隨機埠啟動並量測效能後結束")
+    parser.add_argument("--clients", type=int, default=8, help="--bench 的同時連線數 (預設 8)")
+    parser.add_argument("--requests", type=int, default=400, help="--bench 的 /design 請求數 (預設 400)")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, 0 if args.bench else args.port, args.workers, args.max_pending)
+    host, port = server.server_address[:2]
+    if not args.bench:
+        print(f"設計計算 API：http://{host}:{port}  (工作池 {server.api.workers}，Ctrl+C 結束)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            server.api.shutdown()
+        return 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        s = bench(host, port, args.clients, args.requests)
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.api.shutdown()
+    ok_latency = s["design_p95_ms"] < TARGET_DESIGN_P95_MS
+    ok_rps = s["design_rps"] > TARGET_DESIGN_RPS
+    ok_batch = s["batch_s"] < TARGET_BATCH_10K_S * s["batch_rows"] / 10_000
+    mark = {True: "✓", False: "⚠ 未達目標"}
+    print(f"/design  {s['requests']} 次 ({s['clients']} 個同時連線)\n"
+          f"  延遲 p50 {s['design_p50_ms']:.1f} ms / p95 {s['design_p95_ms']:.1f} ms / p99 {s['design_p99_ms']:.1f} ms"
+          f"  (目標 p95 < {TARGET_DESIGN_P95_MS:g} ms) {mark[ok_latency]}\n"
+          f"  吞吐量 {s['design_rps']:.0f} req/s  (目標 > {TARGET_DESIGN_RPS:g}) {mark[ok_rps]}\n"
+          f"/batch   {s['batch_rows']:,} 筆 {s['batch_s']:.2f} s  (目標 10,000 筆 < {TARGET_BATCH_10K_S:g} s) {mark[ok_batch]}")
+    return 0 if ok_latency and ok_rps and ok_batch else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
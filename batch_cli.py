@@ -0,0 +1,249 @@
+"""批次評估基地清單 (CSV / Parquet)
+
+用法：
+    python batch_cli.py sites.csv -o results.csv
+    python batch_cli.py sites.parquet -o results.parquet --chunksize 200000 --workers 8
+
+輸入欄位 (缺少的欄位或空白格使用與 design_inputV6.py 相同的預設值)：
+    lat, lon, land_width, land_depth, floors, span_x, span_y, fc, col_w, col_d,
+    rebar_size, glass, wall, window_ratio, p_conc, p_steel
+輸出：原欄位 + climate_zone, eewh_score, total_cols, ratio, is_safe, num_bars, grand_total
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import design_engine as engine
+
+# 缺少欄位時的預設值 (與 Streamlit 介面預設相同)
+DEFAULTS = {
+    "lat": 25.03,
+    "lon": 121.56,
+    "floors": 7,
+    "span_x": 6.0,
+    "span_y": 5.0,
+    "fc": 280,
+    "col_w": 60,
+    "col_d": 60,
+    "rebar_size": "#8",
+    "wall": "隔熱塗料",
+    "window_ratio": engine.WINDOW_RATIO,
+    "p_conc": 2500,
+    "p_steel": 28000,
+}
+REQUIRED = ["land_width", "land_depth"]
+POSITIVE = ["land_width", "land_depth", "floors", "span_x", "span_y", "fc", "col_w", "col_d"]
+# 數值欄位的固定型別 (各塊推斷的型別不同時，Parquet 輸出的 schema 仍一致)
+DTYPES = {"floors": "int64", "lat": "float64", "lon": "float64", "land_width": "float64", "land_depth": "float64",
+          "span_x": "float64", "span_y": "float64", "fc": "float64", "col_w": "float64", "col_d": "float64",
+          "window_ratio": "float64", "p_conc": "float64", "p_steel": "float64"}
+# 選填的文字欄位：整塊空白時 pandas 會推斷成 float，固定為字串
+TEXT_COLUMNS = ["rebar_size", "glass", "wall"]
+# 輸出的計算欄位型別
+RESULT_DTYPES = {"climate_zone": "string", "eewh_score": "float64", "total_cols": "int64", "ratio": "float64",
+                 "is_safe": "bool", "num_bars": "int64", "grand_total": "float64"}
+CLIMATE_NAMES = np.array([z[0] for z in engine.CLIMATE_ZONES])
+
+
+def _row(label):
+    """列標籤轉成從 1 起算的筆數 (read_chunks 的 index 為整個檔案的列號)"""
+    return label + 1 if isinstance(label, (int, np.integer)) else label
+
+
+def _lookup(series, names, column):
+    """選項名稱轉索引，未知名稱直接報錯"""
+    idx = series.map({name: i for i, name in enumerate(names)})
+    bad = series[idx.isna()]
+    if len(bad):
+        raise ValueError(f"欄位 {column} 有未知選項：{sorted(set(bad.astype(str)))[:5]}，可用：{names}")
+    return idx.to_numpy(dtype=int)
+
+
+def _numeric(series, column):
+    """欄位轉數值，非數值的內容直接報錯 (空白保留為 NaN)"""
+    values = pd.to_numeric(series, errors="coerce")
+    bad = series[values.isna() & series.notna()]
+    if len(bad):
+        raise ValueError(f"第 {_row(bad.index[0])} 筆的欄位 {column} 不是數值：{bad.iloc[0]!r}")
+    return values
+
+
+def evaluate_sites(df):
+    """評估一批基地 (與 design_inputV6.py 相同的計算)，回傳附加結果欄位的 DataFrame
+
+    選填欄位的空白格使用預設值；必要欄位空白，或尺寸 / 樓層 / 強度不大於 0 時報錯 (指出第幾筆與欄位)。
+    數值欄位與文字欄位的輸出型別固定 (DTYPES / TEXT_COLUMNS)，不受各塊內容影響。
+    """
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要欄位：{missing}")
+    col = {name: (df[name].fillna(default) if name in df.columns else pd.Series(default, index=df.index))
+           for name, default in DEFAULTS.items()}
+    for name in REQUIRED:
+        col[name] = df[name]
+    for name, dtype in DTYPES.items():
+        if name in col:
+            values = _numeric(col[name], name)
+            blank = values.isna()
+            if blank.any():
+                raise ValueError(f"第 {_row(values.index[blank.argmax()])} 筆的必要欄位 {name} 空白")
+            col[name] = values.astype(dtype) if dtype != "int64" else values.round().astype(dtype)
+    for name in POSITIVE:
+        bad = col[name] <= 0
+        if bad.any():
+            raise ValueError(f"第 {_row(col[name].index[bad.argmax()])} 筆的欄位 {name} 必須大於 0：{col[name][bad].iloc[0]}")
+
+    lat = col["lat"].to_numpy(dtype=float)
+    rebar_idx = _lookup(col["rebar_size"].astype(str).str.split().str[0], engine.REBAR_SIZES, "rebar_size")
+    wall_idx = _lookup(col["wall"], engine.WALL_NAMES, "wall")
+    glass_idx = engine.default_glass_index(lat) # 依氣候帶智慧預設
+    if "glass" in df.columns:
+        given = df["glass"].notna().to_numpy()
+        glass_idx = np.where(given, 0, glass_idx)
+        glass_idx[given] = _lookup(df["glass"][given], engine.GLASS_NAMES, "glass")
+
+    res = engine.evaluate_designs(
+        col["land_width"].to_numpy(dtype=float), col["land_depth"].to_numpy(dtype=float),
+        col["floors"].to_numpy(), col["span_x"].to_numpy(dtype=float), col["span_y"].to_numpy(dtype=float),
+        col["fc"].to_numpy(), col["col_w"].to_numpy(), col["col_d"].to_numpy(),
+        rebar_idx=rebar_idx, p_conc=col["p_conc"].to_numpy(), p_steel=col["p_steel"].to_numpy(),
+        glass_idx=glass_idx, wall_idx=wall_idx, latitude=lat,
+        window_ratio=col["window_ratio"].to_numpy(dtype=float),
+    )
+    out = df.copy()
+    for name in DTYPES:
+        if name in out.columns:
+            out[name] = col[name]
+    for name in TEXT_COLUMNS:
+        if name in out.columns:
+            out[name] = out[name].astype("string")
+    out["climate_zone"] = CLIMATE_NAMES[res["climate_zone"]]
+    out["eewh_score"] = res["score"]
+    out["total_cols"] = res["total_cols"]
+    out["ratio"] = res["ratio"]
+    out["is_safe"] = res["is_safe"]
+    out["num_bars"] = res["num_bars"]
+    out["grand_total"] = res["grand_total"]
+    return out.astype(RESULT_DTYPES)
+
+
+def process_chunk(df, as_csv=False, header=True):
+    """行程池工作單元：計算並 (CSV 輸出時) 直接在工作行程中轉成文字"""
+    out = evaluate_sites(df)
+    return out.to_csv(index=False, header=header) if as_csv else out
+
+
+def read_chunks(path, chunksize):
+    """分塊讀取輸入檔，記憶體用量只與 chunksize 有關 (每塊的 index 為整個檔案的列號，錯誤訊息據此指出第幾筆)"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """依副檔名逐塊寫出 CSV 或 Parquet"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet = None
+
+    @property
+    def as_csv(self):
+        return not self.path.endswith(".parquet")
+
+    def write(self, data, rows):
+        """寫出一塊結果：CSV 為已格式化的文字，Parquet 為 DataFrame"""
+        if self.as_csv:
+            with open(self.path, "w" if self.rows == 0 else "a", encoding="utf-8", newline="") as f:
+                f.write(data)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            if self._parquet is None:
+                # 已知欄位以明確型別建立 schema；其他 (使用者自訂) 欄位沿用第一塊推斷的型別，
+                # 第一塊整欄空白者無從推斷，以字串儲存 (後續區塊的數值也可轉成字串)
+                fixed = {**{name: pa.from_numpy_dtype(np.dtype(t)) for name, t in {**DTYPES, **RESULT_DTYPES}.items()
+                            if t != "string"},
+                         **{name: pa.string() for name in TEXT_COLUMNS + ["climate_zone"]}}
+                for name in table.column_names:
+                    if name not in fixed and table.column(name).null_count == table.num_rows:
+                        fixed[name] = pa.string()
+                schema = pa.schema([pa.field(f.name, fixed.get(f.name, f.type)) for f in table.schema],
+                                   metadata=table.schema.metadata)
+                self._parquet = pq.ParquetWriter(self.path, schema)
+            # 各塊統一轉成第一塊的 schema
+            try:
+                table = table.cast(self._parquet.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"第 {self.rows + 1} 筆起的區塊欄位型別與前面的區塊不同 ({e})；"
+                                 "請加大 --chunksize 或改用 CSV 輸出") from None
+            self._parquet.write_table(table)
+        self.rows += rows
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run_batch(src, dst, chunksize=100_000, workers=None):
+    """串流處理整個檔案，回傳處理筆數
+
+    workers > 1 時以行程池平行計算；同時處理中的區塊數有上限，輸出順序與輸入相同。
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(dst)
+    try:
+        if workers == 1:
+            for i, chunk in enumerate(read_chunks(src, chunksize)):
+                writer.write(process_chunk(chunk, writer.as_csv, i == 0), len(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for i, chunk in enumerate(read_chunks(src, chunksize)):
+                    pending.append((pool.submit(process_chunk, chunk, writer.as_csv, i == 0), len(chunk)))
+                    if len(pending) >= 2 * workers:
+                        future, rows = pending.popleft()
+                        writer.write(future.result(), rows)
+                while pending:
+                    future, rows = pending.popleft()
+                    writer.write(future.result(), rows)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批次評估基地清單 (氣候、柱網、D/C、配筋、總造價)")
+    parser.add_argument("input", help="輸入檔 (.csv 或 .parquet)")
+    parser.add_argument("-o", "--output", required=True, help="輸出檔 (.csv 或 .parquet)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="每塊筆數 (預設 100000)")
+    parser.add_argument("--workers", type=int, default=None, help="行程數 (預設為 CPU 核心數)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        rows = run_batch(args.input, args.output, args.chunksize, args.workers)
+    except ValueError as e:
+        parser.exit(2, f"錯誤：{e}\n")
+    elapsed = time.perf_counter() - t0
+    print(f"完成 {rows:,} 筆，耗時 {elapsed:.2f} s ({rows / max(elapsed, 1e-9):,.0f} 筆/s) → {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""計算與繪圖熱點的效能基準 (無介面，可在 CI 執行)
+
+用法：
+    python benchmarks.py                          # 執行預設情境並與基準檔比較
+    python benchmarks.py --quick                  # 只跑小型情境
+    python benchmarks.py --sizes 50 500 --spans 4 8 --floors 5 30
+    python benchmarks.py --json bench.json        # 另存機器可讀結果
+    python benchmarks.py --save-baseline          # 以本次結果建立 / 更新本機基準檔
+
+項目：grid (nx/ny/linspace)、site (不規則基地裁切柱網)、check (逐柱軸力與 D/C)、rebar (主筋根數)、
+quantity (算量估價)、plan / stress / section (三張 matplotlib 圖，與介面相同的 PNG 輸出)、
+figures (三張圖同時送進背景繪圖池)、
+svg / dxf (含 D/C 上色的平面圖向量匯出，不經 matplotlib)、rebar_group (柱 × 樓層 分組配筋最佳化)。
+最佳值 (min，受背景負載影響最小) 比基準慢超過 --threshold 時標示為退步，並以結束碼 1 結束；
+變化量小於 --min-delta (預設 3 ms) 的項目視為計時雜訊，不判定退步或進步。
+基準檔與主機相關，預設存於未納入版控的 .cache/benchmark_baseline.json；其中記錄的 CPU 數、
+Python 與 numpy 版本與本機不同時略過比較 (結束碼 0)，請在本機以 --save-baseline 重建。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import matplotlib
+import numpy as np
+from matplotlib.patches import Rectangle
+
+import column_stack
+import design_engine as engine
+import plan_export
+import plan_render
+import rebar_layout
+import site_polygon
+from render_cache import RenderCache
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "benchmark_baseline.json")
+# 基準檔必須與本機一致的環境欄位 (不一致時計時不可比)
+BASELINE_ENV_KEYS = ["cpus", "python", "numpy"]
+
+# 預設情境：基地邊長 (m) × 柱距 (m) × 樓層數，最大約 100 萬支柱
+SIZES = [20, 100, 500, 3000]
+SPANS = [3.0, 6.0]
+FLOORS = [7, 30]
+QUICK_SIZES = [20, 100]
+RENDER_MAX_COLS = 1_000_000     # 超過此柱數不跑繪圖項目
+COL_W, COL_D, FC = 60, 60, 280
+MIN_DELTA_MS = 3.0              # 與基準相差小於此值 (ms) 視為雜訊 (微秒級項目的比例變化不具意義)
+SITE_VERTICES = 360            # 不規則基地項目的多邊形頂點數
+REBAR_MAX_SEGMENTS = 5_000_000  # 柱段 (柱數 × 樓層數) 超過此數不跑分組配筋項目 (柱段陣列的記憶體)
+
+
+def time_call(func, min_time=0.2, min_repeats=3, max_repeats=5000):
+    """重複執行直到累計 min_time 秒 (至少 min_repeats 次)，回傳每次耗時 (ms)
+
+    微秒級項目在 min_time 內可重複數千次，最佳值因此較穩定。
+    """
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < max_repeats:
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+        if len(samples) >= min_repeats and time.perf_counter() - start >= min_time:
+            break
+    return samples
+
+
+def scenario_cases(size, span, floors):
+    """單一情境的所有基準項目：名稱 -> 無參數函數"""
+    nx, ny = (int(n) for n in engine.grid_counts(size, size, span, span))
+    sx, sy = engine.actual_spans(size, size, nx, ny)
+    xs, ys = engine.grid_coords(size, size, nx, ny)
+    loads = engine.column_loads(nx, ny, sx, sy, floors, FC, COL_W, COL_D)
+    cols_w = np.full((nx, ny), COL_W)
+    bar_area = engine.BAR_AREAS["#8"]
+    num_bars = int(engine.rebar_count(COL_W, COL_D, bar_area))
+    # 內切於基地的鋸齒狀多邊形 (頂點數固定，測柱網裁切)
+    t = np.linspace(0, 2 * np.pi, SITE_VERTICES, endpoint=False)
+    r = size / 2 * (0.8 + 0.2 * (np.arange(SITE_VERTICES) % 2))
+    site = site_polygon.normalize(np.column_stack([r * np.cos(t), r * np.sin(t)]))[0]
+
+    def grid():
+        n = engine.grid_counts(size, size, span, span)
+        engine.actual_spans(size, size, *n)
+        engine.grid_coords(size, size, *n)
+
+    def site_mask():
+        mask = site_polygon.column_mask(site, xs, ys)
+        engine.column_loads(nx, ny, sx, sy, floors, FC, COL_W, COL_D, mask=mask)
+
+    def check():
+        engine.column_loads(nx, ny, sx, sy, floors, FC, COL_W, COL_D)
+
+    def rebar():
+        engine.rebar_count(cols_w, cols_w, bar_area)
+
+    def quantity():
+        vol, steel = engine.structure_quantity(size * size, floors, COL_W, COL_D, nx * ny)
+        engine.structure_cost(vol, steel, 2500, 28000)
+
+    # 繪圖：每次使用新的快取，量測的是未命中時的完整繪製 + PNG 輸出
+    def draw_plan(fig):
+        ax = fig.subplots()
+        ax.add_patch(Rectangle((0, 0), size, size, linewidth=2, edgecolor='red', fill=False, linestyle='--'))
+        plan_render.draw_grid_plan(ax, xs, ys, span, span)
+        ax.set_xlim(-2, size + 2)
+        ax.set_ylim(-2, size + 2)
+        ax.set_aspect('equal')
+
+    def draw_stress(fig):
+        ax = fig.subplots()
+        ax.add_patch(Rectangle((0, 0), size, size, fill=False, edgecolor='#aaa'))
+        plan_render.draw_stress_map(ax, xs, ys, loads["ratio"], COL_W / 100, COL_D / 100)
+        ax.set_xlim(-1, size + 1)
+        ax.set_ylim(-1, size + 1)
+        ax.set_aspect('equal')
+        ax.axis('off')
+
+    def draw_section(fig):
+        plan_render.draw_column_section(fig.subplots(), COL_W, COL_D, num_bars, "#8")
+
+    figure_cache = RenderCache()
+
+    def figures():
+        # 平面圖、應力圖、斷面圖同時送進背景繪圖池 (對照 plan + stress + section 的逐張繪製)
+        figure_cache.clear()
+        futures = [figure_cache.submit("plan", draw_plan, (10, 6), plan_render.PLAN_DPI),
+                   figure_cache.submit("stress", draw_stress, (8, 4)),
+                   figure_cache.submit("section", draw_section, (4, 4))]
+        return [future.result() for future in futures]
+
+    def export(fmt):
+        stream = plan_export.export_stream(fmt, xs=xs, ys=ys, width=size, depth=size, ratio=loads["ratio"],
+                                           col_w=COL_W / 100, col_d=COL_D / 100)
+        return sum(len(text) for text in stream)
+
+    cases = {"grid": grid, "site": site_mask, "check": check, "rebar": rebar, "quantity": quantity}
+    if nx * ny * floors <= REBAR_MAX_SEGMENTS:
+        stack = column_stack.build_stack(loads["trib_area"], column_stack.floor_schedule(floors, COL_W, COL_D, FC),
+                                         column_stack.floor_loads(floors))
+        cases["rebar_group"] = lambda: rebar_layout.optimize_rebar(stack)
+    if nx * ny <= RENDER_MAX_COLS:
+        cases["plan"] = lambda: RenderCache().render("plan", draw_plan, figsize=(10, 6), dpi=plan_render.PLAN_DPI)
+        cases["stress"] = lambda: RenderCache().render("stress", draw_stress, figsize=(8, 4))
+        cases["section"] = lambda: RenderCache().render("section", draw_section, figsize=(4, 4))
+        cases["figures"] = figures
+        cases["svg"] = lambda: export("svg")
+        cases["dxf"] = lambda: export("dxf")
+    return nx * ny, cases
+
+
+def run_benchmarks(sizes, spans, floors, min_time=0.2, only=None, log=None):
+    """執行所有情境，回傳結果 list (每筆含 name / params / min_ms / median_ms / repeats)"""
+    results = []
+    for size in sizes:
+        for span in spans:
+            for fl in floors:
+                total_cols, cases = scenario_cases(size, span, fl)
+                for item, func in cases.items():
+                    if only and item not in only:
+                        continue
+                    # 樓層數不影響繪圖，只在第一個樓層數跑
+                    if item in ("plan", "stress", "section") and fl != floors[0]:
+                        continue
+                    if item == "section" and (size, span) != (sizes[0], spans[0]):
+                        continue
+                    func()  # 暖身 (字型、快取等一次性成本)
+                    samples = time_call(func, min_time=min_time)
+                    res = {
+                        "name": f"{item}/site={size:g}/span={span:g}/floors={fl}",
+                        "item": item,
+                        "params": {"size": size, "span": span, "floors": fl, "columns": total_cols},
+                        "min_ms": min(samples),
+                        "median_ms": statistics.median(samples),
+                        "repeats": len(samples),
+                    }
+                    results.append(res)
+                    if log:
+                        log(res)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def environment_mismatch(env, baseline):
+    """基準檔與本機不一致的環境欄位：回傳 (欄位, 基準值, 本機值) list，空 list 代表可比較"""
+    base_env = baseline.get("environment", {})
+    return [(k, base_env.get(k), env.get(k)) for k in BASELINE_ENV_KEYS if base_env.get(k) != env.get(k)]
+
+
+def compare(results, baseline, threshold=0.25, min_delta_ms=MIN_DELTA_MS):
+    """以最佳值 (min_ms) 與基準比較：回傳 (name, 基準 ms, 本次 ms, 變化比例, 狀態) list
+
+    狀態為 "regression" / "improved" / "ok" / "new"；變化量小於 min_delta_ms 視為雜訊。
+    """
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in results:
+        old = base.get(r["name"])
+        if old is None:
+            rows.append((r["name"], None, r["min_ms"], None, "new"))
+            continue
+        delta = r["min_ms"] - old["min_ms"]
+        change = delta / old["min_ms"] if old["min_ms"] > 0 else 0.0
+        if abs(delta) < min_delta_ms:
+            status = "ok"
+        elif change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((r["name"], old["min_ms"], r["min_ms"], change, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="計算與繪圖熱點的效能基準")
+    parser.add_argument("--sizes", type=float, nargs="+", help="基地邊長 (m)")
+    parser.add_argument("--spans", type=float, nargs="+", help="柱距 (m)")
+    parser.add_argument("--floors", type=int, nargs="+", help="樓層數")
+    parser.add_argument("--only", nargs="+", help="只跑指定項目 (grid site check rebar rebar_group quantity plan stress section figures svg dxf)")
+    parser.add_argument("--quick", action="store_true", help="只跑小型情境")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每項最少量測秒數 (預設 0.2)")
+    parser.add_argument("--json", help="結果另存為 JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基準檔路徑 (預設為本機的 .cache/benchmark_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="以本次結果覆寫基準檔")
+    parser.add_argument("--threshold", type=float, default=0.25, help="退步判定門檻 (預設 0.25 = 慢 25%%)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_MS,
+                        help=f"變化量小於此值 (ms) 視為雜訊 (預設 {MIN_DELTA_MS:g})")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    spans = args.spans or SPANS
+    floors = args.floors or FLOORS
+
+    def log(res):
+        print(f"{res['name']:<45} {res['median_ms']:>10.3f} ms  (min {res['min_ms']:.3f}, n={res['repeats']})",
+              file=sys.stderr)
+
+    results = run_benchmarks(sizes, spans, floors, min_time=args.min_time, only=args.only, log=log)
+    report = {"environment": environment(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"已更新基準檔 {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"找不到基準檔 {args.baseline}，請先以 --save-baseline 建立", file=sys.stderr)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    mismatch = environment_mismatch(report["environment"], baseline)
+    if mismatch:
+        diff = "、".join(f"{k} {old} → {new}" for k, old, new in mismatch)
+        print(f"基準檔的環境與本機不同 ({diff})，略過比較；請在本機以 --save-baseline 重建", file=sys.stderr)
+        return 0
+    rows = compare(results, baseline, threshold=args.threshold, min_delta_ms=args.min_delta)
+    print(f"\n{'項目':<43} {'基準 ms':>10} {'本次 ms':>10} {'變化':>8}")
+    for name, old, new, change, status in rows:
+        old_s = f"{old:10.3f}" if old is not None else f"{'-':>10}"
+        change_s = f"{change:+8.0%}" if change is not None else f"{'':>8}"
+        flag = {"regression": "  ⚠ 退步", "improved": "  ✓ 進步", "new": "  (新)"}.get(status, "")
+        print(f"{name:<45} {old_s} {new:10.3f} {change_s}{flag}")
+    n_reg = sum(1 for row in rows if row[4] == "regression")
+    if n_reg:
+        print(f"\n{n_reg} 項效能退步 (門檻 {args.threshold:.0%})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import numpy as np
+
+import design_engine as engine
+
+# ==========================================
+# 柱 × 樓層 疊層模型：每根柱、每一層為一個柱段 (structured array)
+# 樓層由下往上編號 (0 = 最下層，含地下室)，每段軸力 = 負擔面積 × 該層以上所有樓層載重
+# 支援在指定樓層變斷面 / 變強度，回傳每一段的 D/C，並提供逐層柱體積給算量使用
+# ==========================================
+
+SEGMENT_DTYPE = np.dtype([
+    ("col_w", "f4"),       # 柱寬 (cm)
+    ("col_d", "f4"),       # 柱深 (cm)
+    ("fc", "f4"),          # 混凝土強度 (kgf/cm²)
+    ("pu", "f8"),          # 累積軸力 (ton)
+    ("capacity", "f8"),    # 容許強度 (ton)
+    ("ratio", "f8"),       # D/C
+])
+SCHEDULE_DTYPE = np.dtype([("col_w", "f4"), ("col_d", "f4"), ("fc", "f4")])
+
+
+def floor_schedule(n_floors, col_w, col_d, fc, transitions=()):
+    """每層的柱斷面與強度 (由下往上)
+
+    transitions 為 (起始樓層索引, 柱寬, 柱深, f'c) 的序列，自該層起 (含) 往上改用新斷面。
+    """
+    schedule = np.empty(int(n_floors), dtype=SCHEDULE_DTYPE)
+    schedule["col_w"], schedule["col_d"], schedule["fc"] = col_w, col_d, fc
+    for start, w, d, f in sorted(transitions):
+        if start < n_floors:
+            schedule[int(start):] = (w, d, f)
+    return schedule
+
+
+def floor_loads(n_floors, floors_below=0, basement_load=engine.LOAD_INTENSITY,
+                load_intensity=engine.LOAD_INTENSITY):
+    """每層樓板的單位面積載重 (kg/m²，由下往上)，地下層可另設載重"""
+    loads = np.full(int(n_floors), float(load_intensity))
+    loads[:int(floors_below)] = basement_load
+    return loads
+
+
+def floor_labels(n_floors, floors_below=0):
+    """樓層名稱 (由下往上)：B2, B1, 1F, 2F ..."""
+    below = int(floors_below)
+    return [f"B{below - i}" if i < below else f"{i - below + 1}F" for i in range(int(n_floors))]
+
+
+def build_stack(trib_area, schedule, loads):
+    """建立柱段陣列，形狀 (柱數, 樓層數)
+
+    trib_area：每根柱的負擔面積 (m²)，schedule：floor_schedule 的結果，loads：floor_loads 的結果。
+    """
+    trib_area = np.asarray(trib_area, dtype=float).ravel()
+    # 第 k 層柱承受 k 層 (含) 以上所有樓板的載重
+    cum_load = np.cumsum(np.asarray(loads, dtype=float)[::-1])[::-1]
+    stack = np.empty((len(trib_area), len(schedule)), dtype=SEGMENT_DTYPE)
+    stack["col_w"] = schedule["col_w"]
+    stack["col_d"] = schedule["col_d"]
+    stack["fc"] = schedule["fc"]
+    stack["pu"] = np.multiply.outer(trib_area, cum_load) / 1000.0
+    stack["capacity"] = engine.column_capacity(schedule["fc"], schedule["col_w"], schedule["col_d"])
+    stack["ratio"] = stack["pu"] / stack["capacity"]
+    return stack
+
+
+def governing_segment(stack, trib_area, loads):
+    """D/C 最大的柱段，回傳與 design_dag 的 check 相同欄位的 dict
+
+    另含控制樓層、該段斷面，以及 load_floors (該段承受載重換算成標準樓層載重的等效樓層數)。
+    """
+    ratio = stack["ratio"]
+    col, floor = np.unravel_index(np.argmax(ratio), ratio.shape)
+    seg = stack[col, floor]
+    worst = float(seg["ratio"])
+    return {
+        "trib_area": float(np.asarray(trib_area).ravel()[col]),
+        "total_load": float(seg["pu"]),
+        "capacity": float(seg["capacity"]),
+        "ratio": worst,
+        "is_safe": worst < 1.0,
+        "n_fail": int((ratio >= 1.0).any(axis=1).sum()),
+        "floor": int(floor),
+        "col_w": float(seg["col_w"]),
+        "col_d": float(seg["col_d"]),
+        "fc": float(seg["fc"]),
+        "load_floors": float(np.sum(loads[floor:]) / engine.LOAD_INTENSITY),
+    }
+
+
+def column_volume(schedule, total_cols, storey_height=engine.STOREY_HEIGHT):
+    """逐層斷面加總的柱混凝土體積 (m³)"""
+    area = schedule["col_w"].astype(float) / 100 * schedule["col_d"].astype(float) / 100
+    return float(area.sum() * storey_height * total_cols)
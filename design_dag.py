@@ -0,0 +1,247 @@
+import hashlib
+import time
+
+import numpy as np
+
+import column_stack
+import design_engine as engine
+import rebar_layout
+import site_polygon
+
+# ==========================================
+# 計算流程 DAG：每個節點以輸入指紋記憶結果，只有輸入改變的節點才重算
+# 氣候 → 建材 → 外牆造價；柱距 → 柱網 (依基地多邊形裁切) → 負擔面積 → 柱×樓層疊層 D/C → 分組配筋 → 算量 → 總價
+# 節點結果不變時 (例如柱距微調但柱網相同)，下游節點也不會重算
+# ==========================================
+
+
+def _feed(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(str((value.dtype, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for k in sorted(value):
+            h.update(repr(k).encode())
+            _feed(h, value[k])
+        h.update(b"}")
+    elif isinstance(value, (tuple, list)):
+        h.update(b"(")
+        for item in value:
+            _feed(h, item)
+        h.update(b")")
+    else:
+        h.update(repr(value).encode())
+        h.update(b",")
+
+
+def value_fingerprint(value):
+    """值的指紋 (陣列取內容雜湊，dict/tuple 逐項遞迴，其餘取 repr)"""
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, value)
+    return h.hexdigest()
+
+
+class DesignDAG:
+    """具名節點組成的計算圖，依需求 (pull) 計算並記憶每個節點的最新結果"""
+
+    def __init__(self):
+        self.nodes = {}        # 節點名稱 -> (函數, 相依名稱)
+        self.inputs = {}       # 輸入名稱 -> 值
+        self._input_fp = {}    # 輸入名稱 -> 指紋
+        self._memo = {}        # 節點名稱 -> (輸入指紋, 結果, 結果指紋)
+        self.log = {}          # 本次互動：節點名稱 -> (是否重算, 耗時 ms)
+
+    def node(self, *deps):
+        """註冊節點的裝飾器，節點名稱取函數名稱"""
+        def register(func):
+            self.nodes[func.__name__] = (func, deps)
+            return func
+        return register
+
+    def set_inputs(self, **values):
+        for name, value in values.items():
+            self.inputs[name] = value
+            self._input_fp[name] = value_fingerprint(value)
+
+    def begin(self):
+        """每次 rerun 開始時呼叫，清空重算紀錄"""
+        self.log = {}
+
+    def fingerprint(self, name):
+        """輸入或節點結果的指紋 (節點會先被求值)"""
+        if name in self._input_fp:
+            return self._input_fp[name]
+        self[name]
+        return self._memo[name][2]
+
+    def __getitem__(self, name):
+        if name in self.inputs:
+            return self.inputs[name]
+        if name not in self.nodes:
+            raise KeyError(f"未定義的節點或尚未設定的輸入：{name}")
+        func, deps = self.nodes[name]
+        # 節點的輸入指紋 = 節點名稱 + 所有相依項 (結果) 指紋
+        payload = "|".join([name] + [self.fingerprint(d) for d in deps]).encode()
+        key = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == key:
+            self.log.setdefault(name, (False, 0.0))
+            return memo[1]
+        t0 = time.perf_counter()
+        value = func(*[self[d] for d in deps])
+        self.log[name] = (True, (time.perf_counter() - t0) * 1000)
+        self._memo[name] = (key, value, value_fingerprint(value))
+        return value
+
+    def reran(self):
+        """本次互動重算的節點"""
+        return [name for name, (ran, _) in self.log.items() if ran]
+
+    def report(self):
+        """本次互動各節點狀態：(節點, 是否重算, 耗時 ms)"""
+        return [(name, ran, ms) for name, (ran, ms) in self.log.items()]
+
+
+def build_design_dag(actual_span=True):
+    """建立設計流程 DAG
+
+    actual_span=True 時負擔面積以實際跨距計算 (Master 版)，否則以名目柱距 (Pro 版)。
+    輸入：lat, land_width, land_depth, floors, span_x, span_y, glass_idx, wall_idx,
+    fc, col_w, col_d, bar_area, p_conc, p_steel
+    選填 (已有預設)：window_ratio (開窗率)、floors_below, basement_load, transitions (變斷面，見 column_stack.floor_schedule)、
+    site (不規則基地多邊形，見 site_polygon.load_site；None 為 land_width × land_depth 矩形，
+    給定時 land_width / land_depth 應為多邊形外框尺寸)
+    """
+    dag = DesignDAG()
+    dag.set_inputs(window_ratio=engine.WINDOW_RATIO, floors_below=0, basement_load=engine.LOAD_INTENSITY, transitions=(), site=None)
+
+    @dag.node("lat")
+    def climate(lat):
+        return engine.get_climate_zone(lat)
+
+    @dag.node("glass_idx", "lat", "window_ratio")
+    def score(glass_idx, lat, window_ratio):
+        return float(engine.eewh_score(glass_idx, lat, window_ratio))
+
+    @dag.node("land_width", "land_depth", "site")
+    def land_area(land_width, land_depth, site):
+        if site is not None:
+            return site_polygon.polygon_area(site)
+        return land_width * land_depth
+
+    @dag.node("land_width", "land_depth", "site")
+    def perimeter(land_width, land_depth, site):
+        if site is not None:
+            return site_polygon.polygon_perimeter(site)
+        return (land_width + land_depth) * 2
+
+    @dag.node("perimeter", "floors", "floors_below", "wall_idx", "glass_idx", "window_ratio")
+    def cost_facade_total(perimeter, floors, floors_below, wall_idx, glass_idx, window_ratio):
+        """外牆與門窗造價 (只計地上樓層，地下層沒有外牆帷幕與開窗)"""
+        return float(engine.facade_cost(perimeter, floors - floors_below, wall_idx, glass_idx,
+                                        wall_ratio=1 - window_ratio, window_ratio=window_ratio))
+
+    @dag.node("land_width", "land_depth", "span_x", "span_y")
+    def grid(land_width, land_depth, span_x, span_y):
+        return tuple(int(n) for n in engine.grid_counts(land_width, land_depth, span_x, span_y))
+
+    @dag.node("land_width", "land_depth", "grid")
+    def coords(land_width, land_depth, grid):
+        return engine.grid_coords(land_width, land_depth, *grid)
+
+    @dag.node("site", "coords")
+    def column_mask(site, coords):
+        """基地內的柱 (nx × ny 布林)，矩形基地全部為 True"""
+        return site_polygon.column_mask(site, *coords)
+
+    @dag.node("column_mask")
+    def total_cols(column_mask):
+        return int(column_mask.sum())
+
+    @dag.node("land_width", "land_depth", "grid")
+    def actual_spans(land_width, land_depth, grid):
+        return engine.actual_spans(land_width, land_depth, *grid)
+
+    @dag.node("grid", "actual_spans" if actual_span else "nominal_spans", "floors", "fc", "col_w", "col_d",
+              "column_mask")
+    def column_loads(grid, spans, floors, fc, col_w, col_d, column_mask):
+        mask = None if column_mask.all() else column_mask
+        return engine.column_loads(*grid, *spans, floors, fc, col_w, col_d, mask=mask)
+
+    @dag.node("span_x", "span_y")
+    def nominal_spans(span_x, span_y):
+        return span_x, span_y
+
+    @dag.node("floors", "col_w", "col_d", "fc", "transitions")
+    def schedule(floors, col_w, col_d, fc, transitions):
+        return column_stack.floor_schedule(floors, col_w, col_d, fc, transitions)
+
+    @dag.node("floors", "floors_below", "basement_load")
+    def floor_loads(floors, floors_below, basement_load):
+        return column_stack.floor_loads(floors, floors_below, basement_load)
+
+    @dag.node("column_loads", "column_mask")
+    def site_trib_area(column_loads, column_mask):
+        """基地內各柱的負擔面積 (一維，順序同柱網攤平)"""
+        return column_loads["trib_area"][column_mask]
+
+    @dag.node("site_trib_area", "schedule", "floor_loads")
+    def stack(site_trib_area, schedule, floor_loads):
+        """柱 × 樓層 柱段陣列 (每段的斷面、累積軸力與 D/C)，只含基地內的柱"""
+        return column_stack.build_stack(site_trib_area, schedule, floor_loads)
+
+    @dag.node("stack", "column_mask")
+    def column_ratio(stack, column_mask):
+        """每根柱各樓層中最大的 D/C (形狀 nx × ny，基地外的柱為 NaN，供應力圖使用)"""
+        ratio = np.full(column_mask.shape, np.nan)
+        ratio[column_mask] = stack["ratio"].max(axis=1)
+        return ratio
+
+    @dag.node("stack", "site_trib_area", "floor_loads")
+    def check(stack, site_trib_area, floor_loads):
+        """最不利柱段 (D/C 最大者) 的判定結果"""
+        return column_stack.governing_segment(stack, site_trib_area, floor_loads)
+
+    @dag.node("col_w", "col_d", "bar_area")
+    def section_rebar(col_w, col_d, bar_area):
+        """標準斷面以指定主筋配置的根數與沿周邊的排列 (斷面詳圖用)"""
+        return rebar_layout.section_layout(col_w, col_d, bar_area)
+
+    @dag.node("section_rebar")
+    def num_bars(section_rebar):
+        return section_rebar["num_bars"]
+
+    @dag.node("stack")
+    def rebar_design(stack):
+        """所有柱段依需求分組，每組選最省鋼筋的號數 (見 rebar_layout.optimize_rebar)"""
+        return rebar_layout.optimize_rebar(stack)
+
+    @dag.node("stack", "bar_area")
+    def rebar_fixed(stack, bar_area):
+        """同樣分組但全部使用指定主筋號數 (與最佳化結果比較用)"""
+        return rebar_layout.optimize_rebar(stack, sizes=rebar_layout.bar_index(bar_area))
+
+    @dag.node("schedule", "total_cols")
+    def column_volume(schedule, total_cols):
+        return column_stack.column_volume(schedule, total_cols)
+
+    @dag.node("rebar_design")
+    def column_steel(rebar_design):
+        """柱鋼筋重 (主筋 + 箍筋，ton)"""
+        return rebar_design["steel_weight"]
+
+    @dag.node("land_area", "floors", "col_w", "col_d", "total_cols", "column_volume", "column_steel")
+    def quantity(land_area, floors, col_w, col_d, total_cols, column_volume, column_steel):
+        return tuple(float(v) for v in engine.structure_quantity(land_area, floors, col_w, col_d, total_cols,
+                                                                 vol_col=column_volume, steel_col=column_steel))
+
+    @dag.node("quantity", "p_conc", "p_steel")
+    def cost_structure(quantity, p_conc, p_steel):
+        return float(engine.structure_cost(*quantity, p_conc, p_steel))
+
+    @dag.node("cost_structure", "cost_facade_total")
+    def grand_total(cost_structure, cost_facade_total):
+        return cost_structure + cost_facade_total
+
+    return dag
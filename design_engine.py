@@ -0,0 +1,493 @@
+import numpy as np
+
+# ==========================================
+# 設計引擎：與 Streamlit 介面無關的純計算核心
+# 所有函數皆接受 NumPy 陣列 (或純量)，以廣播方式一次計算大量方案
+# ==========================================
+
+# --- 共用設計常數 ---
+STOREY_HEIGHT = 3.2      # 樓高 (m)
+SLAB_THICKNESS = 0.25    # 樓板+樑 平均厚度 (m)
+LOAD_INTENSITY = 900     # 單位面積載重 (kg/m²)
+STEEL_RATIO = 0.18       # 鋼筋用量經驗值 (ton/m³ = 180 kg/m³)
+PHI = 0.65               # 強度折減係數
+MIN_REBAR_RATIO = 0.01   # 最小鋼筋比 1%
+COVER = 4                # 保護層 (cm)
+PLAN_COL_SIZE = 0.6      # 平面圖預設柱寬 (m)
+WALL_RATIO = 0.7         # 70% 實牆
+WINDOW_RATIO = 0.3       # 30% 開窗
+WINDOW_RATIOS = np.round(np.arange(0.1, 0.6 + 1e-9, 0.05), 2)   # 外殼方案比較的開窗率掃描範圍
+PING = 3.3058            # 1 坪 = 3.3058 m²
+
+FC_OPTIONS = [210, 280, 350, 420]
+
+# 玻璃選項與參數
+GLASS_OPTS = {
+    "一般單層玻璃": {"cost": 1500, "u": 5.8, "note": "便宜但耗能"},
+    "雙層中空玻璃": {"cost": 3000, "u": 2.8, "note": "標準隔音隔熱"},
+    "Low-E 節能玻璃": {"cost": 4500, "u": 1.6, "note": "熱帶推薦 (擋輻射)"},
+    "三層氣密玻璃": {"cost": 6500, "u": 0.8, "note": "寒帶推薦 (防凍)"}
+}
+# 外牆選項
+WALL_OPTS = {
+    "一般塗料": {"cost": 1000},
+    "隔熱塗料": {"cost": 1800},
+    "乾掛石材(含保溫)": {"cost": 8500},
+    "金屬包板": {"cost": 6500}
+}
+# 主筋規格 (cm²)
+BAR_AREAS = {"#6": 2.87, "#7": 3.87, "#8": 5.07, "#10": 7.94}
+# 主筋標稱直徑 (cm)
+BAR_DIAMETERS = {"#6": 1.91, "#7": 2.22, "#8": 2.54, "#10": 3.22}
+
+# 選項表轉成陣列，方便以索引向量化查表
+GLASS_NAMES = list(GLASS_OPTS.keys())
+GLASS_COST = np.array([v["cost"] for v in GLASS_OPTS.values()], dtype=float)
+GLASS_U = np.array([v["u"] for v in GLASS_OPTS.values()], dtype=float)
+GLASS_LOWE = np.array(["Low-E" in k for k in GLASS_NAMES])
+WALL_NAMES = list(WALL_OPTS.keys())
+WALL_COST = np.array([v["cost"] for v in WALL_OPTS.values()], dtype=float)
+REBAR_SIZES = list(BAR_AREAS.keys())
+REBAR_AREA = np.array(list(BAR_AREAS.values()), dtype=float)
+REBAR_DIA = np.array([BAR_DIAMETERS[k] for k in REBAR_SIZES], dtype=float)
+
+# 氣候帶代碼：0=熱帶, 1=溫帶, 2=寒帶
+TROPICAL, SUBTROPICAL, COLD = 0, 1, 2
+CLIMATE_ZONES = [
+    ("熱帶 (Tropical)", "🔥 高溫多濕", "遮陽、隔熱、通風", "Low-E 雙層玻璃", "淺色 (反射熱)"),
+    ("溫帶 (Subtropical)", "🌤️ 四季分明", "適度保溫、季節性遮陽", "雙層中空玻璃", "中性色"),
+    ("寒帶 (Cold)", "❄️ 寒冷乾燥", "高度氣密、加強保溫、吸熱", "三層氣密窗", "深色 (吸熱)"),
+]
+
+
+# --- 氣候 (V5) ---
+def climate_zone_code(latitude):
+    """依據緯度判斷氣候帶代碼 (向量化)"""
+    abs_lat = np.abs(np.asarray(latitude, dtype=float))
+    return np.where(abs_lat < 23.5, TROPICAL, np.where(abs_lat < 40, SUBTROPICAL, COLD))
+
+
+def get_climate_zone(latitude):
+    """V5 核心：依據緯度判斷氣候帶與對策"""
+    return CLIMATE_ZONES[int(climate_zone_code(latitude))]
+
+
+def default_glass_index(latitude):
+    """智慧預設值：熱帶 Low-E、寒帶三層、其他雙層"""
+    zone = climate_zone_code(latitude)
+    return np.where(zone == TROPICAL, 2, np.where(zone == COLD, 3, 1))
+
+
+def eewh_score(glass_idx, latitude, window_ratio=WINDOW_RATIO):
+    """外殼節能評分：依 U 值計算並做氣候修正
+
+    玻璃 U 值扣分依開窗率相對於基準 (30%) 等比例放大，開窗越多扣越多。
+    """
+    glass_idx = np.asarray(glass_idx)
+    zone = climate_zone_code(latitude)
+    u_val = GLASS_U[glass_idx]
+    score = 100 - (u_val * 12) * (np.asarray(window_ratio) / WINDOW_RATIO)
+    score = score - np.where((zone == COLD) & (u_val > 2.0), 20, 0)          # 寒帶用爛玻璃扣分
+    score = score - np.where((zone == TROPICAL) & ~GLASS_LOWE[glass_idx], 10, 0)  # 熱帶沒用Low-E扣分
+    return score
+
+
+def facade_cost(perimeter, floors, wall_idx, glass_idx, wall_ratio=WALL_RATIO, window_ratio=WINDOW_RATIO):
+    """外牆與門窗造價"""
+    area = np.asarray(perimeter, dtype=float) * STOREY_HEIGHT * np.asarray(floors)
+    return area * wall_ratio * WALL_COST[wall_idx] + area * window_ratio * GLASS_COST[glass_idx]
+
+
+def facade_matrix(perimeter, floors, latitude, window_ratios=WINDOW_RATIOS):
+    """所有 玻璃 × 外牆 × 開窗率 組合的評分與外牆造價 (一次向量化)，依每分造價由低到高排序
+
+    實牆比 = 1 - 開窗率；評分 <= 0 的組合每分造價為 inf (排在最後)。
+    """
+    G, W, R = (a.ravel() for a in np.meshgrid(np.arange(len(GLASS_NAMES)), np.arange(len(WALL_NAMES)),
+                                              np.asarray(window_ratios, dtype=float), indexing="ij"))
+    score = eewh_score(G, latitude, R)
+    cost = facade_cost(perimeter, floors, W, G, wall_ratio=1 - R, window_ratio=R)
+    cost_per_point = np.divide(cost, score, out=np.full(len(cost), np.inf), where=score > 0)
+    order = np.lexsort((-score, cost_per_point))
+    return {
+        "glass_idx": G[order],
+        "wall_idx": W[order],
+        "window_ratio": R[order],
+        "score": score[order],
+        "cost": cost[order],
+        "cost_per_point": cost_per_point[order],
+    }
+
+
+# --- 平面配置 (V2) ---
+def grid_counts(land_width, land_depth, span_x, span_y):
+    """計算 X/Y 向柱列數 nx, ny"""
+    land_width = np.asarray(land_width, dtype=float)
+    land_depth = np.asarray(land_depth, dtype=float)
+    nx = (land_width // span_x).astype(int) + 1
+    ny = (land_depth // span_y).astype(int) + 1
+    # 強制邏輯：避免最後跨距太小
+    nx = nx + ((nx - 1) * span_x < land_width * 0.8)
+    ny = ny + ((ny - 1) * span_y < land_depth * 0.8)
+    return nx, ny
+
+
+def grid_coords(land_width, land_depth, nx, ny, col_size=PLAN_COL_SIZE):
+    """單一方案的柱位座標 xs, ys"""
+    xs = np.linspace(0, land_width - col_size, int(nx))
+    ys = np.linspace(0, land_depth - col_size, int(ny))
+    return xs, ys
+
+
+def actual_spans(land_width, land_depth, nx, ny):
+    """實際跨距 (基地尺寸平均分配)"""
+    return land_width / (nx - 1), land_depth / (ny - 1)
+
+
+# --- 結構檢核 (V3) ---
+def column_capacity(fc, col_w, col_d):
+    """柱軸向容許強度 Pn (ton)"""
+    return (PHI * 0.85 * np.asarray(fc) * np.asarray(col_w) * np.asarray(col_d)) / 1000.0
+
+
+def column_check(trib_area, floors, fc, col_w, col_d, load_intensity=LOAD_INTENSITY):
+    """柱軸力檢核，回傳 (Pu, Pn, D/C) 單位 ton"""
+    total_load = (np.asarray(trib_area) * load_intensity * np.asarray(floors)) / 1000.0
+    capacity = column_capacity(fc, col_w, col_d)
+    return total_load, capacity, total_load / capacity
+
+
+CORNER, EDGE, INTERIOR = 0, 1, 2
+COLUMN_KINDS = ["角柱", "邊柱", "中柱"]
+
+
+def tributary_widths(n, span):
+    """單一方向每根柱的負擔寬度：端部半跨、中間整跨"""
+    widths = np.full(int(n), float(span))
+    widths[[0, -1]] = span / 2
+    return widths
+
+
+def governing_trib_area(nx, ny, span_x, span_y):
+    """最不利柱的負擔面積 (向量化)：有中間柱列時取整跨，只有兩列時取半跨
+
+    與 column_loads(...)["trib_area"].max() 相同，但不需展開整個柱網。
+    """
+    wx = np.where(np.asarray(nx) >= 3, span_x, np.asarray(span_x) / 2)
+    wy = np.where(np.asarray(ny) >= 3, span_y, np.asarray(span_y) / 2)
+    return wx * wy
+
+
+def grid_trib_classes(nx, ny, span_x, span_y):
+    """完整矩形柱網的柱分類 (向量化)：角柱、X向邊柱、Y向邊柱、中柱
+
+    回傳 (每類柱數, 每類負擔面積)，形狀皆為 (..., 4)；各類柱數合計為 nx × ny，
+    與 column_loads(...)["trib_area"] 逐柱展開的結果相同，但不需展開整個柱網。
+    """
+    nx, ny = np.asarray(nx), np.asarray(ny)
+    span_x, span_y = np.asarray(span_x, dtype=float), np.asarray(span_y, dtype=float)
+    mx, my = np.maximum(nx - 2, 0), np.maximum(ny - 2, 0)
+    counts = np.stack(np.broadcast_arrays(4, 2 * mx, 2 * my, mx * my), axis=-1)
+    areas = np.stack(np.broadcast_arrays(span_x * span_y / 4, span_x * span_y / 2, span_x * span_y / 2,
+                                         span_x * span_y), axis=-1)
+    return counts, areas
+
+
+def masked_tributary(mask, span_x, span_y):
+    """裁切後柱網 (mask 為 nx × ny 布林) 的負擔面積與位置分類
+
+    每向負擔寬度 = 兩側有相鄰柱者各取半跨；柱網完整時與 tributary_widths 的結果相同。
+    不在基地內的柱負擔面積為 0。
+    """
+    mask = np.asarray(mask, dtype=bool)
+    prev_x = np.zeros_like(mask)
+    next_x = np.zeros_like(mask)
+    prev_y = np.zeros_like(mask)
+    next_y = np.zeros_like(mask)
+    prev_x[1:], next_x[:-1] = mask[:-1], mask[1:]
+    prev_y[:, 1:], next_y[:, :-1] = mask[:, :-1], mask[:, 1:]
+    wx = (prev_x.astype(float) + next_x) * (span_x / 2)
+    wy = (prev_y.astype(float) + next_y) * (span_y / 2)
+    trib = np.where(mask, wx * wy, 0.0)
+    kind = INTERIOR - (~(prev_x & next_x)).astype(int) - (~(prev_y & next_y))
+    return trib, kind
+
+
+def column_loads(nx, ny, span_x, span_y, floors, fc, col_w, col_d, mask=None):
+    """柱網上每根柱的負擔面積、位置、軸力與 D/C (陣列形狀 nx × ny)
+
+    mask 為基地內的柱 (不規則基地裁切後)，未給時為完整矩形柱網。
+    """
+    if mask is not None:
+        trib, kind = masked_tributary(mask, span_x, span_y)
+        pu, pn, ratio = column_check(trib, floors, fc, col_w, col_d)
+        return {"trib_area": trib, "kind": kind, "pu": pu, "capacity": pn, "ratio": ratio}
+    wx = tributary_widths(nx, span_x)
+    wy = tributary_widths(ny, span_y)
+    trib = np.outer(wx, wy)
+    # 位置分類：兩向都在邊界=角柱、一向在邊界=邊柱、其餘=中柱
+    on_x = np.zeros(int(nx), dtype=int)
+    on_y = np.zeros(int(ny), dtype=int)
+    on_x[[0, -1]] = 1
+    on_y[[0, -1]] = 1
+    kind = INTERIOR - np.add.outer(on_x, on_y)
+    pu, pn, ratio = column_check(trib, floors, fc, col_w, col_d)
+    return {"trib_area": trib, "kind": kind, "pu": pu, "capacity": pn, "ratio": ratio}
+
+
+# --- 配筋與估價 (V4) ---
+def rebar_count(col_w, col_d, bar_area):
+    """最小鋼筋比 1% 所需主筋根數 (至少 4 根且取偶數)"""
+    num_bars = np.ceil((np.asarray(col_w) * np.asarray(col_d) * MIN_REBAR_RATIO) / bar_area).astype(int)
+    num_bars = np.maximum(num_bars, 4)
+    return num_bars + num_bars % 2
+
+
+def structure_quantity(land_area, floors, col_w, col_d, total_cols,
+                       slab_thickness=SLAB_THICKNESS, steel_ratio=STEEL_RATIO, vol_col=None, steel_col=None):
+    """結構混凝土量 (樓板+柱)，回傳 (vol_total m³, weight_steel ton)
+
+    vol_col 為逐層計算的柱體積 (見 column_stack.column_volume)；未給時以單一斷面估算。
+    steel_col 為依實際配筋計算的柱鋼筋重 (ton，見 estimate_column_steel)；給定時經驗鋼筋用量只用於樓板與樑。
+    """
+    vol_slab = np.asarray(land_area) * np.asarray(floors) * slab_thickness
+    if vol_col is None:
+        vol_col = (np.asarray(col_w) / 100 * np.asarray(col_d) / 100) * STOREY_HEIGHT * np.asarray(total_cols) * np.asarray(floors)
+    vol_total = vol_slab + vol_col
+    if steel_col is None:
+        return vol_total, vol_total * steel_ratio
+    return vol_total, vol_slab * steel_ratio + np.asarray(steel_col)
+
+
+def structure_cost(vol_total, weight_steel, p_conc, p_steel):
+    """結構體造價 (混凝土+鋼筋)"""
+    return vol_total * np.asarray(p_conc) + weight_steel * np.asarray(p_steel)
+
+
+# --- 柱配筋估算 (rebar_layout 分組配筋與批次估價共用) ---
+FY = 4200                   # 主筋降伏強度 (kgf/cm²，SD420)
+STEEL_DENSITY = 7.85        # 鋼筋單位重 (ton/m³)
+MAX_REBAR_RATIO = 0.08      # 最大鋼筋比 8%
+MAX_BAR_SPACING = 30.0      # 主筋最大中心間距 (cm)
+MIN_CLEAR_SPACING = 4.0     # 主筋最小淨間距 (cm，另需 >= 1.5 倍筋徑)
+TIE_DIAMETER = 1.27         # 箍筋 #4 直徑 (cm)
+TIE_AREA = 1.27             # 箍筋 #4 斷面積 (cm²)
+TIE_SPACING = 15.0          # 箍筋間距 (cm)
+REBAR_GROUPS = 4            # 每種斷面依需求鋼筋量分的組數
+ESTIMATE_CHUNK = 1_000_000  # 批次估算每次展開的柱段數上限 (限制暫存陣列的記憶體)
+
+
+def required_steel(pu, fc, col_w, col_d, fy=FY):
+    """柱段所需主筋面積 (cm²)：最小鋼筋比，或橫箍柱 Pu <= 0.8 φ [0.85 f'c (Ag - As) + fy As] 所需者"""
+    ag = np.asarray(col_w, dtype=float) * np.asarray(col_d, dtype=float)
+    fc = np.asarray(fc, dtype=float)
+    need = (np.asarray(pu, dtype=float) * 1000.0 / (0.8 * PHI) - 0.85 * fc * ag) / (fy - 0.85 * fc)
+    return np.maximum(need, MIN_REBAR_RATIO * ag)
+
+
+def bar_counts(as_req, col_w, col_d, bar_area, bar_dia):
+    """所需主筋根數與沿周邊的分配 (全部參數可廣播)
+
+    根數 = max(面積需求, 最大中心間距所需)，至少 4 根且取偶數；四角各一根，
+    其餘依兩向淨邊長比例分配到 X 面 (上下) 與 Y 面 (左右)，兩面對稱。
+    回傳 dict：num_bars、kx / ky (每個 X / Y 面的中間筋數)、spacing_x / spacing_y (中心間距 cm)、
+    feasible (淨間距與最大鋼筋比皆符合)。
+    """
+    as_req, col_w, col_d, bar_area, bar_dia = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (as_req, col_w, col_d, bar_area, bar_dia)))
+    inset = COVER + TIE_DIAMETER + bar_dia / 2
+    lx = np.maximum(col_w - 2 * inset, 0.0)
+    ly = np.maximum(col_d - 2 * inset, 0.0)
+    kx_min = np.maximum(np.ceil(lx / MAX_BAR_SPACING) - 1, 0)
+    ky_min = np.maximum(np.ceil(ly / MAX_BAR_SPACING) - 1, 0)
+    n = np.maximum(np.ceil(as_req / bar_area - 1e-9), 4 + 2 * (kx_min + ky_min))
+    n = n + n % 2
+    k = (n - 4) / 2
+    share = np.divide(lx, lx + ly, out=np.full_like(lx, 0.5), where=lx + ly > 0)
+    kx = np.clip(np.round(k * share), kx_min, k - ky_min)
+    ky = k - kx
+    sx = lx / (kx + 1)
+    sy = ly / (ky + 1)
+    clear = np.minimum(sx, sy) - bar_dia
+    feasible = (clear >= np.maximum(1.5 * bar_dia, MIN_CLEAR_SPACING)) & (n * bar_area <= MAX_REBAR_RATIO * col_w * col_d)
+    return {
+        "num_bars": n.astype(int),
+        "kx": kx.astype(int),
+        "ky": ky.astype(int),
+        "spacing_x": sx,
+        "spacing_y": sy,
+        "feasible": feasible,
+    }
+
+
+def tie_weight(col_w, col_d, storey_height=STOREY_HEIGHT):
+    """每個柱段的箍筋重 (ton)：周長 × 箍筋面積 × 支數"""
+    core = 2 * (np.asarray(col_w, dtype=float) + np.asarray(col_d, dtype=float) - 4 * COVER - 4 * TIE_DIAMETER / 2)
+    n_ties = np.ceil(storey_height * 100 / TIE_SPACING)
+    return core / 100 * TIE_AREA / 1e4 * n_ties * STEEL_DENSITY
+
+
+def estimate_column_steel(counts, trib, floors, fc, col_w, col_d, transitions=(), sizes=None, n_groups=REBAR_GROUPS,
+                          load_intensity=LOAD_INTENSITY, storey_height=STOREY_HEIGHT,
+                          chunk=ESTIMATE_CHUNK):
+    """批次模型的柱鋼筋重 (ton，每個方案一值)，與對完整柱段陣列做 rebar_layout.optimize_rebar 的結果相同
+
+    counts / trib 為 grid_trib_classes 的每類柱數與負擔面積 (n, k)，其餘參數每方案一值
+    (各層載重相同)。transitions 同 column_stack.floor_schedule，所有方案共用，柱斷面沿樓高因此分成數段。
+    同類柱、同一層的柱段需求相同，以柱數加權而不逐柱展開；軸力未超過最小鋼筋比所能承受者
+    (大多數柱段) 需求皆為最小鋼筋量，直接以段數計入，只有超過的樓層才逐段計算需求 (依段數分批)。
+    分組 (同斷面的各段共用) 與號數選法同 rebar_layout.optimize_rebar。
+    """
+    counts = np.atleast_2d(np.asarray(counts, dtype=float))
+    trib = np.atleast_2d(np.asarray(trib, dtype=float))
+    n, k = counts.shape
+    floors, fc, col_w, col_d = (np.broadcast_to(np.asarray(a, dtype=float), n) for a in (floors, fc, col_w, col_d))
+    floors = floors.astype(np.int64)
+    sizes = np.arange(len(REBAR_SIZES)) if sizes is None else np.atleast_1d(sizes)
+    rows = np.arange(n)
+
+    # 斷面分段 (n, m)：第 j 段為樓層 [start, end)，其柱段承受的樓層數為 [floors - end + 1, floors - start]
+    steps = sorted(transitions)
+    m = 1 + len(steps)
+    start = np.column_stack([np.zeros(n, dtype=np.int64)] + [np.minimum(int(t[0]), floors) for t in steps])
+    end = np.column_stack([start[:, 1:], floors])
+    seg_w, seg_d, seg_fc = (np.column_stack([base] + [np.full(n, float(t[i])) for t in steps])
+                            for i, base in ((1, col_w), (2, col_d), (3, fc)))
+    low, high = floors[:, None] - end + 1, floors[:, None] - start
+    # 同斷面 (柱寬, 柱深) 的各段共用分組：以第一個相同斷面的段號為斷面編號
+    slot = np.argmax((seg_w[:, :, None] == seg_w[:, None, :]) & (seg_d[:, :, None] == seg_d[:, None, :]), axis=2)
+
+    # 分組範圍：每段需求最小為最上層、最大為最下層
+    floor_load = trib * load_intensity / 1000.0
+    used = (counts > 0)[:, None, :] & (end > start)[:, :, None]
+    args = (seg_fc[:, :, None], seg_w[:, :, None], seg_d[:, :, None])
+    lo = np.full((n, m), np.inf)
+    hi = np.full((n, m), -np.inf)
+    np.minimum.at(lo, (rows[:, None], slot),
+                  np.where(used, required_steel(floor_load[:, None] * low[:, :, None], *args), np.inf).min(axis=2))
+    np.maximum.at(hi, (rows[:, None], slot),
+                  np.where(used, required_steel(floor_load[:, None] * high[:, :, None], *args), -np.inf).max(axis=2))
+    valid = np.isfinite(lo)
+    lo = np.where(valid, lo, 0.0)
+    width = np.where(valid, hi, 0.0) - lo
+    scale = np.divide(n_groups, width, out=np.zeros_like(width), where=width > 0)
+
+    def group_of(as_req, d, s):
+        level = np.minimum((as_req - lo[d, s]) * scale[d, s], n_groups - 1)
+        return level.astype(np.int64) + (d * m + s) * n_groups
+
+    demand = np.zeros(n * m * n_groups)
+    members = np.zeros(n * m * n_groups)
+
+    # 最小鋼筋比的柱段：承受軸力上限 (required_steel 的反算) 換算成樓層數
+    as_min = MIN_REBAR_RATIO * seg_w * seg_d
+    pu_min = 0.8 * PHI * (0.85 * seg_fc * seg_w * seg_d + as_min * (FY - 0.85 * seg_fc)) / 1000.0
+    n_min = np.floor(np.divide(pu_min[:, :, None], floor_load[:, None], out=np.full(used.shape, np.inf),
+                               where=floor_load[:, None] > 0))
+    n_low = np.where(used, np.clip(np.minimum(n_min, high[:, :, None]) - low[:, :, None] + 1, 0, None), 0)
+    n_low = n_low.astype(np.int64)
+    seg_min = (counts[:, None] * n_low).sum(axis=2)
+    has_min = seg_min > 0
+    g_min = group_of(as_min, rows[:, None], slot)[has_min]
+    np.add.at(members, g_min, seg_min[has_min])
+    np.maximum.at(demand, g_min, as_min[has_min])
+
+    # 其餘柱段 (每類柱、每段中承受較多樓層者) 逐段計算需求，依段數分批
+    first = low[:, :, None] + n_low
+    span = np.where(used, high[:, :, None] - first + 1, 0).ravel()
+    pair = np.flatnonzero(span > 0)
+    extra = span[pair]
+    ends = np.cumsum(extra)
+    pos = 0
+    while pos < len(pair):
+        stop = max(int(np.searchsorted(ends, ends[pos] - extra[pos] + chunk, side="right")), pos + 1)
+        rep = np.repeat(pair[pos:stop], extra[pos:stop])
+        d, rest = np.divmod(rep, m * k)
+        j, c = np.divmod(rest, k)
+        # 每段承受的樓層數 (first, ..., high)
+        offset = np.repeat(np.cumsum(extra[pos:stop]) - extra[pos:stop], extra[pos:stop])
+        level = np.arange(len(rep)) - offset + first[d, j, c]
+        as_req = required_steel(floor_load[d, c] * level, seg_fc[d, j], seg_w[d, j], seg_d[d, j])
+        g = group_of(as_req, d, slot[d, j])
+        np.maximum.at(demand, g, as_req)
+        members += np.bincount(g, weights=counts[d, c], minlength=n * m * n_groups)
+        pos = stop
+
+    # 每組取組內最大需求選號數 (同 rebar_layout.optimize_rebar：可行者中最輕，皆不可行時取根數最少)
+    area = REBAR_AREA[sizes]
+    group_w, group_d = (np.repeat(a.ravel(), n_groups)[:, None] for a in (seg_w, seg_d))
+    opts = bar_counts(demand[:, None], group_w, group_d, area, REBAR_DIA[sizes])
+    steel = opts["num_bars"] * area
+    best = np.argmin(np.where(opts["feasible"], steel, np.inf), axis=1)
+    best = np.where(opts["feasible"].any(axis=1), best, np.argmin(opts["num_bars"], axis=1))
+    main = (members * steel[np.arange(len(best)), best]).reshape(n, -1).sum(axis=1)
+    main *= storey_height * STEEL_DENSITY / 1e4
+    ties = ((end - start) * tie_weight(seg_w, seg_d, storey_height)).sum(axis=1)
+    return main + counts.sum(axis=1) * ties
+
+
+# --- 全流程批次計算 ---
+def evaluate_designs(land_width, land_depth, floors, span_x, span_y, fc, col_w, col_d,
+                     rebar_idx=2, p_conc=2500, p_steel=28000, glass_idx=1, wall_idx=1,
+                     latitude=25.03, actual_span=True, window_ratio=WINDOW_RATIO):
+    """一次向量化計算多組設計方案
+
+    所有參數皆可為等長陣列或純量 (自動廣播)，回傳各輸出陣列的 dict。
+    actual_span=True 時以實際跨距計算負擔面積 (Master 版)，否則以名目柱距 (Pro 版)。
+    """
+    land_width = np.asarray(land_width, dtype=float)
+    land_depth = np.asarray(land_depth, dtype=float)
+    span_x = np.asarray(span_x, dtype=float)
+    span_y = np.asarray(span_y, dtype=float)
+    rebar_idx = np.asarray(rebar_idx)
+
+    land_area = land_width * land_depth
+    perimeter = (land_width + land_depth) * 2
+
+    nx, ny = grid_counts(land_width, land_depth, span_x, span_y)
+    total_cols = nx * ny
+    actual_sx, actual_sy = actual_spans(land_width, land_depth, nx, ny)
+
+    if actual_span:
+        trib_area = governing_trib_area(nx, ny, actual_sx, actual_sy)
+    else:
+        trib_area = governing_trib_area(nx, ny, span_x, span_y)
+    total_load, capacity, ratio = column_check(trib_area, floors, fc, col_w, col_d)
+
+    num_bars = rebar_count(col_w, col_d, REBAR_AREA[rebar_idx])
+    # 柱鋼筋依每類柱、每層的需求配筋估算 (與 Tab 4 分組配筋同一套公式)，經驗鋼筋用量只用於樓板與樑
+    counts, areas = grid_trib_classes(nx, ny, *((actual_sx, actual_sy) if actual_span else (span_x, span_y)))
+    n = np.broadcast(land_width, land_depth, span_x, span_y, floors, fc, col_w, col_d).shape
+    steel_col = estimate_column_steel(
+        np.broadcast_to(counts, n + (4,)).reshape(-1, 4), np.broadcast_to(areas, n + (4,)).reshape(-1, 4),
+        *(np.broadcast_to(a, n).ravel() for a in (floors, fc, col_w, col_d))).reshape(n)
+    vol_total, weight_steel = structure_quantity(land_area, floors, col_w, col_d, total_cols, steel_col=steel_col)
+    cost_structure = structure_cost(vol_total, weight_steel, p_conc, p_steel)
+    window_ratio = np.asarray(window_ratio, dtype=float)
+    cost_facade_total = facade_cost(perimeter, floors, wall_idx, glass_idx,
+                                    wall_ratio=1 - window_ratio, window_ratio=window_ratio)
+    grand_total = cost_structure + cost_facade_total
+
+    return {
+        "land_area": land_area,
+        "perimeter": perimeter,
+        "climate_zone": climate_zone_code(latitude),
+        "score": eewh_score(glass_idx, latitude, window_ratio),
+        "nx": nx,
+        "ny": ny,
+        "total_cols": total_cols,
+        "actual_sx": actual_sx,
+        "actual_sy": actual_sy,
+        "trib_area": trib_area,
+        "total_load": total_load,
+        "capacity": capacity,
+        "ratio": ratio,
+        "is_safe": ratio < 1.0,
+        "num_bars": num_bars,
+        "vol_total": vol_total,
+        "steel_col": steel_col,
+        "weight_steel": weight_steel,
+        "cost_structure": cost_structure,
+        "cost_facade_total": cost_facade_total,
+        "grand_total": grand_total,
+    }
@@ -1,290 +1,626 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-
-# --- 頁面全域設定 ---
-st.set_page_config(page_title="建築全流程整合系統 (Master)", layout="wide", initial_sidebar_state="expanded")
-
-st.title("🏢 建築全流程整合系統 Master Edition")
-st.markdown("##### 整合：基地氣候(V1+V5) / 平面規劃(V2) / 結構安全(V3) / 總體估價(V4)")
-st.markdown("---")
-
-# ==========================================
-# 側邊欄：全域核心參數 (Global Control)
-# ==========================================
-with st.sidebar:
-    st.header("🎛️ 核心參數控制")
-    
-    st.subheader("1. 基地設定")
-    # 緯度連動氣候判斷
-    lat = st.number_input("基地緯度 (Latitude)", value=25.03, step=1.0, help="正=北緯, 負=南緯, 影響建材建議")
-    lon = st.number_input("基地經度 (Longitude)", value=121.56, step=0.01)
-    
-    land_width = st.number_input("基地面寬 (m)", value=12.0, step=0.5)
-    land_depth = st.number_input("基地深度 (m)", value=20.0, step=0.5)
-    land_area = land_width * land_depth
-    st.info(f"基地面積: {land_area:.1f} m²")
-    
-    st.subheader("2. 建築規模")
-    floors = st.number_input("總樓層數", value=7, min_value=1)
-    
-    st.subheader("3. 結構網格")
-    span_x = st.slider("X向柱距 (m)", 3.0, 12.0, 6.0)
-    span_y = st.slider("Y向柱距 (m)", 3.0, 12.0, 5.0)
-
-# --- 核心邏輯函數 ---
-def get_climate_zone(latitude):
-    """V5 核心：依據緯度判斷氣候帶與對策"""
-    abs_lat = abs(latitude)
-    if abs_lat < 23.5:
-        return "熱帶 (Tropical)", "🔥 高溫多濕", "遮陽、隔熱、通風", "Low-E 雙層玻璃", "淺色 (反射熱)"
-    elif abs_lat < 40:
-        return "溫帶 (Subtropical)", "🌤️ 四季分明", "適度保溫、季節性遮陽", "雙層中空玻璃", "中性色"
-    else:
-        return "寒帶 (Cold)", "❄️ 寒冷乾燥", "高度氣密、加強保溫、吸熱", "三層氣密窗", "深色 (吸熱)"
-
-# 執行氣候判斷
-climate_zone, climate_desc, strategy, rec_glass, rec_color = get_climate_zone(lat)
-
-# --- 分頁導航 ---
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📍 基地氣候與建材 (V1+V5)", 
-    "📐 平面配置 (V2)", 
-    "🛡️ 結構分析 (V3)", 
-    "💰 配筋與總估價 (V4)"
-])
-
-# ==========================================
-# Tab 1: 基地氣候與建材 (V1 + V5 深度整合)
-# ==========================================
-with tab1:
-    col_site, col_mat = st.columns([1, 1])
-    
-    # --- 左欄：V1 基地與使用者需求 ---
-    with col_site:
-        st.subheader("🌍 地理與使用者分析")
-        
-        # 1. 地圖 (V1)
-        st.map(pd.DataFrame({'lat': [lat], 'lon': [lon]}), zoom=13)
-        
-        # 2. 使用者邏輯 (V1)
-        st.write("#### 使用者需求檢核")
-        has_disabled = st.checkbox("包含身障/高齡使用者", value=True)
-        has_child = st.checkbox("包含幼童使用者", value=False)
-        
-        tags = []
-        if has_disabled: tags.append("🚨 無障礙坡道 (1:12)")
-        if has_child: tags.append("👶 防墜欄杆 (>110cm)")
-        if abs(lat) < 23.5: tags.append("☀️ 遮陽百葉")
-        if abs(lat) > 40: tags.append("🔥 室內暖氣系統")
-        
-        st.info("設計規範自動生成：\n" + "\n".join([f"- {t}" for t in tags]))
-
-    # --- 右欄：V5 氣候建材決策 ---
-    with col_mat:
-        st.subheader("🧱 氣候適應性建材決策")
-        
-        # 1. 氣候診斷 (V5)
-        st.success(f"📍 位於 **{climate_zone}** ({lat}°)\n\n特徵：{climate_desc}\n\n策略：{strategy}")
-        
-        # 2. 建材選擇 (V5)
-        st.write("#### 外殼建材選用")
-        
-        # 玻璃選項與參數
-        glass_opts = {
-            "一般單層玻璃": {"cost": 1500, "u": 5.8, "note": "便宜但耗能"},
-            "雙層中空玻璃": {"cost": 3000, "u": 2.8, "note": "標準隔音隔熱"},
-            "Low-E 節能玻璃": {"cost": 4500, "u": 1.6, "note": "熱帶推薦 (擋輻射)"},
-            "三層氣密玻璃": {"cost": 6500, "u": 0.8, "note": "寒帶推薦 (防凍)"}
-        }
-        # 智慧預設值
-        def_idx = 2 if abs(lat)<23.5 else (3 if abs(lat)>40 else 1)
-        sel_glass = st.selectbox("開窗玻璃系統", list(glass_opts.keys()), index=def_idx)
-        
-        # 外牆選項
-        wall_opts = {
-            "一般塗料": {"cost": 1000},
-            "隔熱塗料": {"cost": 1800},
-            "乾掛石材(含保溫)": {"cost": 8500},
-            "金屬包板": {"cost": 6500}
-        }
-        sel_wall = st.selectbox("外牆裝修材質", list(wall_opts.keys()), index=1)
-        
-        # 3. 節能評分
-        u_val = glass_opts[sel_glass]['u']
-        score = 100 - (u_val * 12)
-        # 氣候修正
-        if abs(lat) > 40 and u_val > 2.0: score -= 20 # 寒帶用爛玻璃扣分
-        if abs(lat) < 23.5 and "Low-E" not in sel_glass: score -= 10 # 熱帶沒用Low-E扣分
-        
-        st.metric("外殼節能評分 (EEWH)", f"{score:.1f} 分", delta="依據 U-Value 計算")
-        
-        # 4. 外牆造價計算 (存為變數供 Tab4 使用)
-        perimeter = (land_width + land_depth) * 2
-        area_facade = perimeter * 3.2 * floors * 0.7 # 70% 實牆
-        area_window = perimeter * 3.2 * floors * 0.3 # 30% 開窗
-        cost_facade_total = (area_facade * wall_opts[sel_wall]['cost']) + (area_window * glass_opts[sel_glass]['cost'])
-        
-        st.caption(f"外牆預算預估: ${cost_facade_total/10000:.1f} 萬")
-
-# ==========================================
-# Tab 2: 平面配置 (V2 完整版)
-# ==========================================
-with tab2:
-    st.subheader("📐 結構平面配置 (Grid Layout)")
-    
-    t2_c1, t2_c2 = st.columns([3, 1])
-    
-    with t2_c1:
-        # V2 繪圖引擎
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # 基地框
-        site = patches.Rectangle((0,0), land_width, land_depth, linewidth=2, edgecolor='red', fill=False, linestyle='--')
-        ax.add_patch(site)
-        
-        # 計算柱位
-        nx = int(land_width // span_x) + 1
-        ny = int(land_depth // span_y) + 1
-        # 強制邏輯
-        if (nx-1)*span_x < land_width*0.8: nx += 1
-        if (ny-1)*span_y < land_depth*0.8: ny += 1
-        
-        xs = np.linspace(0, land_width-0.6, nx)
-        ys = np.linspace(0, land_depth-0.6, ny)
-        
-        total_cols = 0
-        for x in xs:
-            for y in ys:
-                # 柱子
-                ax.add_patch(patches.Rectangle((x, y), 0.6, 0.6, facecolor='#555', edgecolor='black'))
-                total_cols += 1
-                # 樑線
-                if x > 0: ax.plot([x-span_x+0.6, x], [y+0.3, y+0.3], 'b-', alpha=0.3)
-                if y > 0: ax.plot([x+0.3, x+0.3], [y-span_y+0.6, y], 'b-', alpha=0.3)
-                
-        ax.set_xlim(-2, land_width+2)
-        ax.set_ylim(-2, land_depth+2)
-        ax.set_aspect('equal')
-        st.pyplot(fig)
-        
-    with t2_c2:
-        st.metric("總柱數", total_cols)
-        actual_sx = land_width/(nx-1)
-        actual_sy = land_depth/(ny-1)
-        st.metric("X向淨跨距", f"{actual_sx:.2f} m")
-        st.metric("Y向淨跨距", f"{actual_sy:.2f} m")
-        
-        if max(actual_sx, actual_sy) > 8.0:
-            st.error("⚠️ 跨距過大 (>8m)")
-        elif max(actual_sx, actual_sy) < 4.0:
-            st.warning("⚠️ 跨距過密 (<4m)")
-        else:
-            st.success("✅ 跨距適中")
-
-# ==========================================
-# Tab 3: 結構分析 (V3 完整版 - 紅綠燈)
-# ==========================================
-with tab3:
-    st.subheader("🛡️ 結構載重與安全檢核")
-    
-    # 參數輸入
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        fc = st.selectbox("混凝土強度 f'c", [210, 280, 350, 420], index=1)
-        col_w = st.slider("柱寬 (cm)", 50, 120, 60, step=10)
-        col_d = st.slider("柱深 (cm)", 50, 120, 60, step=10)
-    
-    # 計算
-    trib_area = actual_sx * actual_sy
-    total_load = (trib_area * 900 * floors) / 1000.0 # Ton
-    capacity = (0.65 * 0.85 * fc * col_w * col_d) / 1000.0 # Ton
-    ratio = total_load / capacity
-    is_safe = ratio < 1.0
-    
-    with c2:
-        st.metric("最不利柱載重 (Pu)", f"{total_load:.1f} ton")
-        st.metric("柱容許強度 (Pn)", f"{capacity:.1f} ton")
-    
-    with c3:
-        if is_safe:
-            st.success(f"✅ 安全 (D/C: {ratio:.2f})")
-        else:
-            st.error(f"❌ 危險 (D/C: {ratio:.2f})")
-            st.write("建議：1.加大柱子 2.提高強度 3.縮小柱距")
-            
-    # V3 經典紅綠燈圖
-    st.write("#### 結構應力分佈圖")
-    fig2, ax2 = plt.subplots(figsize=(8, 4))
-    ax2.add_patch(patches.Rectangle((0,0), land_width, land_depth, fill=False, edgecolor='#aaa'))
-    
-    center_x, center_y = xs[len(xs)//2], ys[len(ys)//2]
-    
-    for x in xs:
-        for y in ys:
-            # 只有中間柱顯示真實危險度，邊柱簡化設為安全(綠)
-            if x == center_x and y == center_y:
-                color = 'green' if is_safe else 'red'
-                if not is_safe: ax2.text(x, y+0.8, "FAIL", color='red', ha='center', fontsize=8, fontweight='bold')
-            else:
-                color = 'green'
-            ax2.add_patch(patches.Rectangle((x, y), col_w/100, col_d/100, facecolor=color, edgecolor='black'))
-            
-    ax2.set_xlim(-1, land_width+1); ax2.set_ylim(-1, land_depth+1)
-    ax2.set_aspect('equal'); ax2.axis('off')
-    st.pyplot(fig2)
-
-# ==========================================
-# Tab 4: 配筋與估價 (V4 + V5成本整合)
-# ==========================================
-with tab4:
-    st.subheader("💰 專案總體估價")
-    
-    if not is_safe:
-        st.error("⚠️ 請先解決 Tab 3 的結構安全問題，才能進行估價。")
-    else:
-        c_detail, c_cost = st.columns([1, 1])
-        
-        with c_detail:
-            st.info("🔧 柱斷面配筋詳圖")
-            # 配筋計算
-            rebar_size = st.selectbox("主筋規格", ["#6", "#7", "#8", "#10"], index=2)
-            bar_area = {"#6":2.87, "#7":3.87, "#8":5.07, "#10":7.94}[rebar_size]
-            num_bars = int(np.ceil((col_w*col_d*0.01)/bar_area))
-            if num_bars < 4: num_bars = 4
-            if num_bars % 2 != 0: num_bars += 1
-            
-            # V4 斷面圖
-            fig3, ax3 = plt.subplots(figsize=(4, 4))
-            ax3.add_patch(patches.Rectangle((0,0), col_w, col_d, facecolor='#ddd', edgecolor='black'))
-            ax3.add_patch(patches.Rectangle((4,4), col_w-8, col_d-8, fill=False, edgecolor='blue', linestyle='--'))
-            # 簡單畫四個角
-            ax3.scatter([4, col_w-4, col_w-4, 4], [4, 4, col_d-4, col_d-4], c='red', s=100)
-            ax3.text(col_w/2, col_d/2, f"{num_bars}-{rebar_size}", ha='center', color='red', fontweight='bold', fontsize=15)
-            ax3.axis('off'); ax3.set_xlim(-5, col_w+5); ax3.set_ylim(-5, col_d+5)
-            st.pyplot(fig3)
-
-        with c_cost:
-            st.info("💵 成本計算書")
-            p_conc = st.number_input("混凝土單價", value=2500)
-            p_steel = st.number_input("鋼筋單價", value=28000)
-            
-            # 結構算量
-            vol_total = (land_area * floors * 0.25) + (col_w/100*col_d/100 * 3.2 * total_cols * floors)
-            weight_steel = vol_total * 0.18 # ton
-            cost_structure = (vol_total * p_conc) + (weight_steel * p_steel)
-            
-            # 整合 V1+V5 的外牆造價
-            grand_total = cost_structure + cost_facade_total
-            
-            # 顯示報表
-            df = pd.DataFrame({
-                "分項工程": ["結構體工程 (混凝土+鋼筋)", "外牆與門窗工程 (Tab1選材)", "總計"],
-                "預估費用": [f"${cost_structure:,.0f}", f"${cost_facade_total:,.0f}", f"${grand_total:,.0f}"]
-            })
-            st.table(df)
-            
-            st.success(f"🏆 全案總造價： NT$ {grand_total/10000:,.1f} 萬")
-            st.metric("單坪造價", f"NT$ {grand_total/(land_area*floors/3.3058):,.0f} /坪")
\ No newline at end of file
+import streamlit as st
+import perf_monitor
+
+# --- 頁面全域設定 ---
+st.set_page_config(page_title="建築全流程整合系統 (Master)", layout="wide", initial_sidebar_state="expanded")
+
+# --- 效能監測 (除錯面板開啟時才量測記憶體與寫記錄檔) ---
+perf = perf_monitor.RerunTimer("master", memory=st.session_state.get("perf_panel", False),
+                               profile=st.session_state.pop("perf_profile_next", False))
+
+st.title("🏢 建築全流程整合系統 Master Edition")
+st.markdown("##### 整合：基地氣候(V1+V5) / 平面規劃(V2) / 結構安全(V3) / 總體估價(V4)")
+st.markdown("---")
+perf.lap("首次繪製 (標題)")
+
+# --- 計算模組 (NumPy) 在標題送出後才載入；pandas / matplotlib 延後到真正用到的分頁才載入 ---
+import numpy as np
+import design_engine as engine
+import design_optimizer as optimizer
+import plan_render
+from design_dag import build_design_dag
+import uncertainty
+import column_stack
+import site_polygon
+import sensitivity
+import plan_export
+import rebar_layout
+from render_cache import plot_cache, array_key
+from disk_cache import result_cache
+perf.lap("載入計算模組")
+
+# ==========================================
+# 側邊欄：全域核心參數 (Global Control)
+# ==========================================
+with st.sidebar:
+    st.header("🎛️ 核心參數控制")
+    
+    st.subheader("1. 基地設定")
+    # 緯度連動氣候判斷
+    lat = st.number_input("基地緯度 (Latitude)", value=25.03, step=1.0, help="正=北緯, 負=南緯, 影響建材建議")
+    lon = st.number_input("基地經度 (Longitude)", value=121.56, step=0.01)
+    
+    # 基地形狀：矩形 (面寬 × 深度) 或不規則多邊形 (頂點清單 / 匯入座標)
+    site_shape = st.radio("基地形狀", ["矩形", "多邊形"], horizontal=True, key="site_shape")
+    site = None
+    if site_shape == "多邊形":
+        site_file = st.file_uploader("匯入頂點 (CSV / TXT / GeoJSON)", type=["csv", "txt", "json", "geojson"])
+        if site_file is not None:
+            site_text = site_file.getvalue().decode("utf-8-sig")
+        else:
+            site_text = st.text_area("頂點座標 (每行 x, y，單位 m)", value=site_polygon.EXAMPLE_VERTICES, height=150)
+        site_lonlat = st.checkbox("座標為經緯度 (lon, lat)", value=False, help="GeoJSON 一律視為經緯度")
+        try:
+            site = site_polygon.load_site(site_text, lonlat=site_lonlat)
+        except ValueError as e:
+            st.error(f"基地多邊形無法使用：{e}，改以矩形計算")
+    if site is None:
+        land_width = st.number_input("基地面寬 (m)", value=12.0, step=0.5)
+        land_depth = st.number_input("基地深度 (m)", value=20.0, step=0.5)
+        land_area = land_width * land_depth
+    else:
+        # 柱網鋪滿多邊形外框，再裁切掉基地外的柱
+        land_width, land_depth = (float(v) for v in site.max(axis=0))
+        land_area = site_polygon.polygon_area(site)
+        st.caption(f"{len(site)} 個頂點，外框 {land_width:.1f} × {land_depth:.1f} m，"
+                   f"周長 {site_polygon.polygon_perimeter(site):.1f} m")
+    st.info(f"基地面積: {land_area:.1f} m²")
+    
+    st.subheader("2. 建築規模")
+    floors = st.number_input("總樓層數", value=7, min_value=1)
+    
+    st.subheader("3. 結構網格")
+    span_x = st.slider("X向柱距 (m)", 3.0, 12.0, 6.0)
+    span_y = st.slider("Y向柱距 (m)", 3.0, 12.0, 5.0)
+    
+    st.subheader("4. 顯示模式")
+    lazy_tabs = st.toggle("⚡ 只繪製目前分頁", value=True, key="lazy_tabs",
+                          help="切換分頁時才產生該分頁的地圖與圖面；關閉則每次互動都產生全部分頁")
+
+# --- 計算流程 DAG (每個 session 一份，只重算輸入有變的節點) ---
+if "dag" not in st.session_state:
+    st.session_state.dag = build_design_dag(actual_span=True)
+dag = st.session_state.dag
+dag.begin()
+dag.set_inputs(lat=lat, land_width=land_width, land_depth=land_depth, site=site, floors=floors,
+               span_x=span_x, span_y=span_y)
+site_key = array_key(site) if site is not None else None   # 繪圖快取 key 用
+if dag["total_cols"] == 0:
+    st.error("基地多邊形內沒有任何柱位，請調整頂點或柱距")
+    st.stop()
+
+# 執行氣候判斷 (核心邏輯見 design_engine)
+climate_zone, climate_desc, strategy, rec_glass, rec_color = dag["climate"]
+
+perf.lap("側邊欄 + DAG")
+
+@st.cache_data(max_entries=32)
+@result_cache.memoize("master_optimizer")  # 跨 session / 重啟後仍可重用
+def run_optimizer(land_width, land_depth, floors, lat, glass_idx, wall_idx, site=None,
+                  window_ratio=engine.WINDOW_RATIO, transitions=()):
+    """自動最佳化 (快取)：回傳 Pareto 前緣表格與掃描統計"""
+    import pandas as pd
+    front, stats = optimizer.optimize_design(land_width, land_depth, floors, latitude=lat,
+                                             glass_idx=glass_idx, wall_idx=wall_idx, site=site,
+                                             window_ratio=window_ratio, transitions=transitions)
+    df_front = pd.DataFrame({
+        "X向柱距 (m)": front["span_x"],
+        "Y向柱距 (m)": front["span_y"],
+        "柱數": front["total_cols"],
+        "柱寬 (cm)": front["col_w"],
+        "柱深 (cm)": front["col_d"],
+        "強度 fc": front["fc"],
+        "主筋": [f"{n}-{engine.REBAR_SIZES[i]}" for n, i in zip(front["num_bars"], front["rebar_idx"])],
+        "D/C": front["ratio"].round(2),
+        "總造價 (萬)": (front["grand_total"] / 10000).round(1),
+    })
+    return df_front, stats
+
+@st.cache_data(max_entries=32)
+def facade_table(lat, perimeter, floors):
+    """玻璃 × 外牆 × 開窗率 全組合的評分與造價表 (快取，與目前選項無關)"""
+    return engine.facade_matrix(perimeter, floors, lat)
+
+@st.cache_data(max_entries=8)
+def load_portfolio(data, name, n_sites):
+    """候選基地組合的評估結果 (依上傳檔內容或示範筆數快取)"""
+    import portfolio  # 組合地圖需要 pandas / pydeck，第一次用到時才載入
+    df = portfolio.read_sites(data, name) if data is not None else portfolio.demo_sites(n_sites)
+    return portfolio.evaluate_portfolio(df)
+
+@st.cache_resource(max_entries=8)
+def portfolio_deck(data, name, n_sites, mode):
+    """組合地圖 (同一資料與上色方式只建立與序列化一次，rerun 時重用同一個 Deck)"""
+    import portfolio
+    return portfolio.build_deck(load_portfolio(data, name, n_sites), mode)
+
+@st.cache_data(max_entries=32)
+def run_sensitivity(base, names=None, actual_span=True, cost_key="grand_total"):
+    """參數敏感度掃描 (每個參數一次向量化計算，依目前方案快取)"""
+    return sensitivity.sensitivity(base, names, actual_span=actual_span, cost_key=cost_key)
+
+@st.cache_data(max_entries=32)
+@result_cache.memoize("master_monte_carlo")
+def run_monte_carlo(*args, **kwargs):
+    """Monte Carlo 不確定性分析 (依輸入組合快取)"""
+    return uncertainty.monte_carlo(*args, **kwargs)
+
+# --- 分頁導航 (只繪製目前分頁時，切換分頁會觸發 rerun) ---
+tab1, tab2, tab3, tab4 = st.tabs([
+    "📍 基地氣候與建材 (V1+V5)", 
+    "📐 平面配置 (V2)", 
+    "🛡️ 結構分析 (V3)", 
+    "💰 配筋與總估價 (V4)"
+], key="active_tab", on_change="rerun" if lazy_tabs else "ignore")
+
+def visible(tab):
+    """分頁是否產生重量級內容 (地圖 / 圖面 / 最佳化 / Monte Carlo)；輸入元件與共用計算不受影響"""
+    return tab.open is not False
+
+# 分頁內的 matplotlib 圖：先佔位並全部送進背景繪圖池，腳本跑完後再一起等待填入
+# (同一次 rerun 的各張圖彼此並行，也和後續的計算重疊；繪圖函數引用的變數在送出後不再改變)
+pending_figures = []
+
+def show_figure(key, draw, figsize, dpi=None):
+    """佔位並送出背景繪圖，圖在 flush_figures() 時填入"""
+    pending_figures.append((st.empty(), plot_cache.submit(key, draw, figsize, dpi)))
+
+def flush_figures():
+    """等待所有背景繪圖並填入佔位 (總等待時間記為一個 perf 段落)"""
+    if not pending_figures:
+        return
+    with perf.stage(f"等待背景繪圖 ({len(pending_figures)} 張)"):
+        for slot, future in pending_figures:
+            slot.image(future.result(), width="stretch")
+    pending_figures.clear()
+
+# ==========================================
+# Tab 1: 基地氣候與建材 (V1 + V5 深度整合)
+# ==========================================
+with tab1:
+    col_site, col_mat = st.columns([1, 1])
+    
+    # --- 左欄：V1 基地與使用者需求 ---
+    with col_site:
+        st.subheader("🌍 地理與使用者分析")
+        
+        # 1. 地圖 (V1)
+        if visible(tab1):
+            with perf.stage("st.map 地圖"):
+                st.map({'lat': [lat], 'lon': [lon]}, zoom=13)
+        
+        # 2. 使用者邏輯 (V1)
+        st.write("#### 使用者需求檢核")
+        has_disabled = st.checkbox("包含身障/高齡使用者", value=True)
+        has_child = st.checkbox("包含幼童使用者", value=False)
+        
+        tags = []
+        if has_disabled: tags.append("🚨 無障礙坡道 (1:12)")
+        if has_child: tags.append("👶 防墜欄杆 (>110cm)")
+        if abs(lat) < 23.5: tags.append("☀️ 遮陽百葉")
+        if abs(lat) > 40: tags.append("🔥 室內暖氣系統")
+        
+        st.info("設計規範自動生成：\n" + "\n".join([f"- {t}" for t in tags]))
+
+    # --- 右欄：V5 氣候建材決策 ---
+    with col_mat:
+        st.subheader("🧱 氣候適應性建材決策")
+        
+        # 1. 氣候診斷 (V5)
+        st.success(f"📍 位於 **{climate_zone}** ({lat}°)\n\n特徵：{climate_desc}\n\n策略：{strategy}")
+        
+        # 2. 建材選擇 (V5)
+        st.write("#### 外殼建材選用")
+        
+        # 玻璃選項 (智慧預設值)
+        def_idx = int(engine.default_glass_index(lat))
+        sel_glass = st.selectbox("開窗玻璃系統", engine.GLASS_NAMES, index=def_idx)
+        glass_idx = engine.GLASS_NAMES.index(sel_glass)
+        
+        # 外牆選項
+        sel_wall = st.selectbox("外牆裝修材質", engine.WALL_NAMES, index=1)
+        wall_idx = engine.WALL_NAMES.index(sel_wall)
+        
+        # 開窗率 (窗牆比)，其餘為實牆
+        window_ratio = st.slider("開窗率 (窗牆比)", float(engine.WINDOW_RATIOS[0]), float(engine.WINDOW_RATIOS[-1]),
+                                 engine.WINDOW_RATIO, 0.05)
+        
+        dag.set_inputs(glass_idx=glass_idx, wall_idx=wall_idx, window_ratio=window_ratio)
+        
+        # 3. 節能評分 (含氣候修正)
+        score = dag["score"]
+        
+        st.metric("外殼節能評分 (EEWH)", f"{score:.1f} 分", delta="依據 U-Value 計算")
+        
+        # 4. 外牆造價計算 (存為變數供 Tab4 使用)
+        perimeter = dag["perimeter"]
+        cost_facade_total = dag["cost_facade_total"]
+        
+        st.caption(f"外牆預算預估: ${cost_facade_total/10000:.1f} 萬")
+        
+        # 5. 外殼方案比較：玻璃 × 外牆 × 開窗率 全部組合 (依 緯度/周長/樓層 快取，只改選項不重算)
+        with st.expander("📋 外殼方案比較 (每分造價排序)"):
+            if visible(tab1):
+                with perf.stage("外殼方案矩陣", kind="計算"):
+                    facade = facade_table(lat, perimeter, floors)
+                rank = np.flatnonzero((facade["glass_idx"] == glass_idx) & (facade["wall_idx"] == wall_idx)
+                                      & np.isclose(facade["window_ratio"], window_ratio))
+                if len(rank):
+                    st.caption(f"目前選擇排名第 {rank[0] + 1} / {len(facade['score'])} 名")
+                st.dataframe({
+                    "玻璃": [engine.GLASS_NAMES[i] for i in facade["glass_idx"]],
+                    "外牆": [engine.WALL_NAMES[i] for i in facade["wall_idx"]],
+                    "開窗率": facade["window_ratio"],
+                    "評分": facade["score"].round(1),
+                    "外牆造價 (萬)": (facade["cost"] / 10000).round(1),
+                    "每分造價 (元)": facade["cost_per_point"].round(0),
+                }, hide_index=True, height=300)
+
+    # 多基地組合地圖：候選基地清單一次向量化評估，依氣候帶 / 單坪造價 / D/C 上色 (資料與地圖皆快取)
+    with st.expander("🗺️ 候選基地組合地圖 (Portfolio)"):
+        import portfolio
+        pf_c1, pf_c2 = st.columns([2, 1])
+        with pf_c1:
+            pf_file = st.file_uploader("候選基地清單 (CSV / Parquet，欄位同 batch_cli，需有 lat / lon)",
+                                       type=["csv", "parquet"], key="portfolio_file")
+        with pf_c2:
+            pf_n = st.select_slider("示範基地數 (未上傳時)", options=[1_000, 10_000, 50_000],
+                                    value=portfolio.DEMO_SITES, disabled=pf_file is not None)
+            pf_mode = st.radio("上色方式", list(portfolio.COLOR_MODES), format_func=portfolio.COLOR_MODES.get,
+                               horizontal=True, key="portfolio_color")
+        # 展開區塊收合時內容仍會執行：評估與地圖 (pandas / pydeck) 只在開啟後才執行，首次繪製不載入
+        if st.toggle("顯示組合地圖", value=False, key="portfolio_on") and visible(tab1):
+            pf_data = pf_file.getvalue() if pf_file is not None else None
+            pf_name = pf_file.name if pf_file is not None else ""
+            try:
+                with perf.stage("組合評估", kind="計算"):
+                    pf_result = load_portfolio(pf_data, pf_name, pf_n)
+                    pf_deck = portfolio_deck(pf_data, pf_name, pf_n, pf_mode)
+            except ValueError as e:
+                st.error(f"❌ 候選基地清單錯誤：{e}")
+            else:
+                with perf.stage("pydeck 組合地圖"):
+                    st.pydeck_chart(pf_deck, height=450)
+                pf_stats = portfolio.summary(pf_result)
+                st.caption(f"{pf_stats['n_sites']:,} 個基地 ("
+                           + "、".join(f"{k.split()[0]} {v:,}" for k, v in pf_stats["zone_counts"].items())
+                           + f")，不安全 {pf_stats['n_unsafe']:,} 個，單坪造價中位數 NT$ {pf_stats['median_per_ping']:,.0f}，"
+                           f"評估耗時 {pf_result['elapsed']*1000:.0f} ms (矩形基地批次模型)")
+
+perf.lap("Tab 1 基地氣候與建材")
+
+# ==========================================
+# Tab 2: 平面配置 (V2 完整版)
+# ==========================================
+with tab2:
+    st.subheader("📐 結構平面配置 (Grid Layout)")
+    
+    t2_c1, t2_c2 = st.columns([3, 1])
+    
+    with t2_c1:
+        # 計算柱位
+        nx, ny = dag["grid"]
+        xs, ys = dag["coords"]
+        total_cols = dag["total_cols"]
+        column_mask = dag["column_mask"] if site is not None else None
+        
+        # V2 繪圖引擎 (依幾何參數快取，只有基地或柱距改變才重畫)
+        def draw_plan(fig):
+            ax = fig.subplots()
+            # 基地框 (矩形或不規則多邊形)
+            plan_render.draw_site(ax, site, land_width, land_depth, linewidth=2, edgecolor='red', linestyle='--')
+            # 柱子 + 樑線 (Collection 批次繪製，基地外的柱不畫)
+            plan_render.draw_grid_plan(ax, xs, ys, span_x, span_y, mask=column_mask)
+            ax.set_xlim(-2, land_width+2)
+            ax.set_ylim(-2, land_depth+2)
+            ax.set_aspect('equal')
+        
+        if visible(tab2):
+            show_figure(("master", "plan", land_width, land_depth, site_key, span_x, span_y), draw_plan, figsize=(10, 6),
+                        dpi=plan_render.PLAN_DPI)
+        # 向量匯出 (SVG / DXF)：柱斷面與 D/C 在 Tab 3 才決定，先預留位置，於 Tab 3 填入
+        export_slot = st.container()
+        
+    with t2_c2:
+        st.metric("總柱數", total_cols)
+        actual_sx, actual_sy = dag["actual_spans"]
+        st.metric("X向淨跨距", f"{actual_sx:.2f} m")
+        st.metric("Y向淨跨距", f"{actual_sy:.2f} m")
+        
+        if max(actual_sx, actual_sy) > 8.0:
+            st.error("⚠️ 跨距過大 (>8m)")
+        elif max(actual_sx, actual_sy) < 4.0:
+            st.warning("⚠️ 跨距過密 (<4m)")
+        else:
+            st.success("✅ 跨距適中")
+
+perf.lap("Tab 2 平面配置")
+
+# ==========================================
+# Tab 3: 結構分析 (V3 完整版 - 紅綠燈)
+# ==========================================
+with tab3:
+    st.subheader("🛡️ 結構載重與安全檢核")
+    
+    # 參數輸入
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        fc = st.selectbox("混凝土強度 f'c", [210, 280, 350, 420], index=1)
+        col_w = st.slider("柱寬 (cm)", 50, 120, 60, step=10)
+        col_d = st.slider("柱深 (cm)", 50, 120, 60, step=10)
+        # 柱 × 樓層疊層：上部樓層可改用較小斷面 / 較低強度 (D/C 逐段檢核)
+        with st.expander("🏗️ 上部樓層變斷面"):
+            labels = column_stack.floor_labels(floors, 0)
+            use_transition = st.toggle("啟用變斷面", value=False, disabled=len(labels) < 2)
+            transitions = ()
+            if use_transition:
+                t_label = st.selectbox("自此樓層起 (含)", labels[1:], index=len(labels) // 2 - 1)
+                t_w = st.slider("上部柱寬 (cm)", 50, 120, col_w, step=10)
+                t_d = st.slider("上部柱深 (cm)", 50, 120, col_d, step=10)
+                t_fc = st.selectbox("上部 f'c", engine.FC_OPTIONS, index=engine.FC_OPTIONS.index(fc))
+                transitions = ((labels.index(t_label), t_w, t_d, t_fc),)
+    
+    # 計算：每根柱 × 每層柱段的累積軸力與 D/C，取最不利柱段判定
+    dag.set_inputs(fc=fc, col_w=col_w, col_d=col_d, transitions=transitions)
+    column_ratio = dag["column_ratio"]
+    check = dag["check"]
+    trib_area = check["trib_area"]
+    total_load = check["total_load"] # Ton
+    capacity = check["capacity"] # Ton
+    ratio = check["ratio"]
+    is_safe = check["is_safe"]
+    n_fail = check["n_fail"]
+    
+    with c2:
+        st.metric("最不利柱載重 (Pu)", f"{total_load:.1f} ton")
+        st.metric("柱容許強度 (Pn)", f"{capacity:.1f} ton")
+        st.metric("不安全柱數", f"{n_fail} / {total_cols}")
+    
+    with c3:
+        if is_safe:
+            st.success(f"✅ 安全 (D/C: {ratio:.2f})")
+        else:
+            st.error(f"❌ 危險 (D/C: {ratio:.2f})")
+            st.write("建議：1.加大柱子 2.提高強度 3.縮小柱距")
+            
+    # 柱 × 樓層疊層：控制柱段與各樓層最大 D/C
+    st.caption(f"控制柱段：{labels[check['floor']]} (斷面 {check['col_w']:.0f}×{check['col_d']:.0f} cm，"
+               f"f'c {check['fc']:.0f})，共檢核 {total_cols * len(labels):,} 段")
+    if visible(tab3):
+        with st.expander("📊 各樓層最大 D/C"):
+            floor_ratio = dag["stack"]["ratio"].max(axis=0)
+            st.bar_chart({"樓層": labels[::-1], "D/C": floor_ratio[::-1]}, x="樓層", y="D/C",
+                         horizontal=True, sort=False)
+
+    # V3 經典紅綠燈圖
+    st.write("#### 結構應力分佈圖")
+    def draw_stress(fig):
+        ax2 = fig.subplots()
+        plan_render.draw_site(ax2, site, land_width, land_depth, edgecolor='#aaa')
+        # 依每根柱的 D/C 上色：綠 < 0.8 <= 橘 < 1.0 <= 紅
+        plan_render.draw_stress_map(ax2, xs, ys, column_ratio, col_w/100, col_d/100,
+                                    label="FAIL", label_kw={"fontweight": 'bold'})
+        ax2.set_xlim(-1, land_width+1); ax2.set_ylim(-1, land_depth+1)
+        ax2.set_aspect('equal'); ax2.axis('off')
+    
+    # 快取 key 只取幾何與紅綠燈等級，D/C 數值微調但顏色不變時不重畫
+    stress_key = ("master", "stress", land_width, land_depth, site_key, nx, ny, col_w, col_d,
+                  array_key(plan_render.ratio_classes(column_ratio)))
+    if visible(tab3):
+        show_figure(stress_key, draw_stress, figsize=(8, 4))
+
+    # Tab 2 的向量匯出：逐批串流產生 (不經 matplotlib)，按下下載才產生檔案
+    with export_slot:
+        with st.expander("📤 匯出向量平面圖 (SVG / DXF)"):
+            if visible(tab2):
+                export_kw = dict(xs=xs, ys=ys, width=land_width, depth=land_depth, site=site, mask=column_mask,
+                                 ratio=column_ratio, col_w=col_w/100, col_d=col_d/100)
+                for col, fmt in zip(st.columns(len(plan_export.MIME_TYPES)), plan_export.MIME_TYPES):
+                    col.download_button(f"下載 {fmt.upper()}", plan_export.plan_download(fmt, **export_kw),
+                                        file_name=f"master_grid_plan.{fmt}", mime=plan_export.MIME_TYPES[fmt],
+                                        on_click="ignore")
+                st.caption(f"基地外框、樑線與 {total_cols:,} 支柱 (依 D/C 紅綠燈上色，斷面 {col_w}×{col_d} cm)，座標單位 m；"
+                           "DXF 的柱依等級分在 DC_OK / DC_WARN / DC_FAIL 圖層")
+    
+    # 自動最佳化模式：掃描柱距 / 柱斷面 / 強度 / 主筋，取代手動調整滑桿
+    with st.expander("🤖 自動最佳化 (成本 vs 安全 Pareto 前緣)"):
+        if st.toggle("啟用最佳化掃描", value=False) and visible(tab3):
+            with perf.stage("最佳化掃描", kind="計算"):
+                df_front, opt_stats = run_optimizer(land_width, land_depth, floors, lat, glass_idx, wall_idx, site,
+                                                    window_ratio, transitions)
+            st.caption(f"掃描 {opt_stats['checked']:,} 組 (柱網 {opt_stats['layouts']} 種)，"
+                       f"可行 {opt_stats['feasible']:,} 組，前緣 {opt_stats['front']} 組，"
+                       f"耗時 {opt_stats['elapsed']*1000:.0f} ms (以預設單價估算)")
+            if df_front.empty:
+                st.error("❌ 掃描範圍內無安全方案")
+            else:
+                best = df_front.iloc[0]
+                st.success(f"💡 最低造價安全方案：柱距 {best['X向柱距 (m)']:.1f} × {best['Y向柱距 (m)']:.1f} m，"
+                           f"柱 {best['柱寬 (cm)']}×{best['柱深 (cm)']} cm，f'c {best['強度 fc']}，"
+                           f"D/C {best['D/C']:.2f}，總造價 {best['總造價 (萬)']:,.1f} 萬")
+                st.scatter_chart(df_front, x="D/C", y="總造價 (萬)", color="柱數")
+                with perf.stage("Pareto 表格", kind="表格"):
+                    st.dataframe(df_front, hide_index=True)
+
+perf.lap("Tab 3 結構分析")
+
+# ==========================================
+# Tab 4: 配筋與估價 (V4 + V5成本整合)
+# ==========================================
+with tab4:
+    st.subheader("💰 專案總體估價")
+    
+    if not is_safe:
+        st.error("⚠️ 請先解決 Tab 3 的結構安全問題，才能進行估價。")
+    else:
+        c_detail, c_cost = st.columns([1, 1])
+        
+        with c_detail:
+            st.info("🔧 柱斷面配筋詳圖")
+            # 配筋計算
+            rebar_size = st.selectbox("主筋規格", engine.REBAR_SIZES, index=2)
+            bar_area = engine.BAR_AREAS[rebar_size]
+            dag.set_inputs(bar_area=bar_area)
+            num_bars = dag["num_bars"]
+            section_rebar = dag["section_rebar"]
+            
+            # V4 斷面圖 (主筋沿周邊實際排列)
+            def draw_section(fig):
+                plan_render.draw_column_section(fig.subplots(), col_w, col_d, num_bars, rebar_size,
+                                                positions=section_rebar["positions"])
+            
+            if visible(tab4):
+                show_figure(("master", "section", col_w, col_d, num_bars, rebar_size), draw_section, figsize=(4, 4))
+                st.caption(f"間距 X {section_rebar['spacing_x']:.1f} cm / Y {section_rebar['spacing_y']:.1f} cm"
+                           + ("" if section_rebar["feasible"] else " ⚠️ 不符間距或最大鋼筋比限制"))
+
+            # 分組配筋：所有柱段依需求鋼筋量分組，每組選最省鋼筋的號數，柱鋼筋重計入造價
+            with st.expander("🧮 分組配筋最佳化"):
+                if visible(tab4):
+                    with perf.stage("分組配筋", kind="計算"):
+                        rebar_design = dag["rebar_design"]
+                        rebar_fixed = dag["rebar_fixed"]
+                    r1, r2, r3 = st.columns(3)
+                    r1.metric("柱鋼筋 (分組最佳化)", f"{rebar_design['steel_weight']:,.1f} t")
+                    r2.metric(f"全部用 {rebar_size}", f"{rebar_fixed['steel_weight']:,.1f} t",
+                              f"{rebar_fixed['steel_weight'] - rebar_design['steel_weight']:+,.1f} t", delta_color="inverse")
+                    r3.metric("經驗值 180 kg/m³", f"{dag['column_volume'] * engine.STEEL_RATIO:,.1f} t")
+                    st.dataframe(rebar_layout.schedule_table(rebar_design), hide_index=True)
+                    st.caption(f"{rebar_design['group'].size:,} 個柱段分 {len(rebar_design['groups']['col_w'])} 組 "
+                               f"(主筋 {rebar_design['main_weight']:,.1f} t + 箍筋 {rebar_design['tie_weight']:,.1f} t)，"
+                               f"耗時 {rebar_design['elapsed']*1000:.0f} ms；樓板與樑仍以經驗值估算")
+                    if rebar_design["n_infeasible"]:
+                        st.warning(f"⚠️ {rebar_design['n_infeasible']:,} 個柱段在任何號數下都無法滿足間距或最大鋼筋比，請加大斷面")
+
+        with c_cost:
+            st.info("💵 成本計算書")
+            p_conc = st.number_input("混凝土單價", value=2500)
+            p_steel = st.number_input("鋼筋單價", value=28000)
+            
+            dag.set_inputs(p_conc=p_conc, p_steel=p_steel)
+            
+            # 結構算量
+            vol_total, weight_steel = dag["quantity"]
+            cost_structure = dag["cost_structure"]
+            
+            # 整合 V1+V5 的外牆造價
+            grand_total = dag["grand_total"]
+            
+            # 顯示報表
+            df = {
+                "分項工程": ["結構體工程 (混凝土+鋼筋)", "外牆與門窗工程 (Tab1選材)", "總計"],
+                "預估費用": [f"${cost_structure:,.0f}", f"${cost_facade_total:,.0f}", f"${grand_total:,.0f}"]
+            }
+            with perf.stage("成本表", kind="表格"):
+                st.table(df)
+            
+            st.success(f"🏆 全案總造價： NT$ {grand_total/10000:,.1f} 萬")
+            st.metric("單坪造價", f"NT$ {grand_total/(land_area*floors/3.3058):,.0f} /坪")
+
+            # 不確定性分析：單價、載重、樓板厚度、f'c、鋼筋用量皆以分佈抽樣
+            with st.expander("🎲 不確定性分析 (Monte Carlo)"):
+                mc_c1, mc_c2 = st.columns(2)
+                with mc_c1:
+                    n_samples = st.select_slider("樣本數", options=[10_000, 100_000, 1_000_000], value=100_000)
+                    price_cv = st.slider("單價變異係數 (%)", 0, 30, 10)
+                    steel_cv = st.slider("鋼筋用量變異係數 (%)", 0, 30, 15)
+                with mc_c2:
+                    load_cv = st.slider("載重變異係數 (%)", 0, 30, 10)
+                    fc_cv = st.slider("混凝土強度變異係數 (%)", 0, 30, 10)
+                    slab_tol = st.slider("樓板厚度誤差 (± cm)", 0, 8, 3)
+                if visible(tab4):
+                    mc_args = (trib_area, floors, check["fc"], check["col_w"], check["col_d"],
+                               land_area, total_cols, p_conc, p_steel, cost_facade_total,
+                               n_samples, price_cv/100, load_cv/100, fc_cv/100, steel_cv/100, slab_tol/100)
+                    # D/C 以控制柱段抽樣，柱體積與柱鋼筋取逐層算量與分組配筋結果
+                    mc_kw = {"load_floors": check["load_floors"], "vol_col": dag["column_volume"],
+                             "steel_col": dag["column_steel"]}
+                    with perf.stage("Monte Carlo", kind="計算"):
+                        mc = run_monte_carlo(*mc_args, **mc_kw)
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("P5 造價", f"{mc['total_pct'][5]/10000:,.0f} 萬")
+                    m2.metric("P50 造價", f"{mc['total_pct'][50]/10000:,.0f} 萬")
+                    m3.metric("P95 造價", f"{mc['total_pct'][95]/10000:,.0f} 萬")
+                    m4.metric("P(D/C ≥ 1)", f"{mc['p_fail']*100:.2f} %")
+                    show_figure(("master", "monte_carlo") + mc_args + tuple(mc_kw.values()),
+                                lambda fig: uncertainty.draw_histograms(fig, mc), figsize=(8, 3))
+                    st.caption(f"{mc['n_samples']:,} 組樣本，計算 {mc['elapsed']*1000:.0f} ms")
+
+    # 參數敏感度：一次只改一個參數掃過其範圍，不必逐一拖動滑桿再 rerun
+    with st.expander("📈 參數敏感度 (總造價與 D/C)"):
+        sens_names = list(sensitivity.PARAMETERS)
+        sens_param = st.selectbox("掃描參數", sens_names, format_func=lambda n: sensitivity.PARAMETERS[n][0],
+                                  key="sens_param")
+        if visible(tab4):
+            sens_base = dict(land_width=land_width, land_depth=land_depth, floors=floors, span_x=span_x, span_y=span_y,
+                             fc=fc, col_w=col_w, col_d=col_d, p_conc=dag.inputs.get("p_conc", 2500),
+                             p_steel=dag.inputs.get("p_steel", 28000), glass_idx=glass_idx, wall_idx=wall_idx,
+                             latitude=lat, window_ratio=window_ratio)
+            with perf.stage("敏感度掃描", kind="計算"):
+                sens = run_sensitivity(sens_base, sens_names, actual_span=True, cost_key="grand_total")
+            curve = sens["curves"][sens_param]
+            label = sensitivity.PARAMETERS[sens_param][0]
+            x = curve["values"]
+            if sens_param in ("glass_idx", "wall_idx"):
+                names = engine.GLASS_NAMES if sens_param == "glass_idx" else engine.WALL_NAMES
+                x = [names[int(i)] for i in x]
+            s1, s2 = st.columns(2)
+            with perf.stage("敏感度曲線", kind="表格"):
+                s1.line_chart({label: x, "D/C": curve["ratio"]}, x=label, y="D/C")
+                s2.line_chart({label: x, "總造價 (萬)": curve["cost"] / 10000}, x=label, y="總造價 (萬)")
+            st.write("##### 總造價龍捲風圖 (各參數在範圍內的最低 / 最高造價與目前方案的差)")
+            tornado = sens["tornado"]
+            st.bar_chart({"參數": [row[1] for row in tornado],
+                          "最低 (萬)": [row[2] / 10000 for row in tornado],
+                          "最高 (萬)": [row[3] / 10000 for row in tornado]},
+                         x="參數", y=["最低 (萬)", "最高 (萬)"], horizontal=True, sort=False, stack=False)
+            st.caption(f"目前方案 D/C {sens['base_ratio']:.2f}、總造價 {sens['base_cost']/10000:,.1f} 萬 "
+                       f"(矩形基地、單一柱斷面的批次模型)，{len(sens_names)} 個參數共耗時 {sens['elapsed']*1000:.0f} ms")
+
+flush_figures()
+perf.lap("Tab 4 配筋與估價")
+
+# ==========================================
+# 側邊欄：繪圖快取狀態
+# ==========================================
+with st.sidebar:
+    with st.expander("🧮 繪圖快取狀態"):
+        cache_stats = plot_cache.stats()
+        st.metric("快取命中率", f"{cache_stats['hit_rate']*100:.0f} %",
+                  f"{cache_stats['hits']} 命中 / {cache_stats['misses'] - cache_stats['disk_hits']} 重畫", delta_color="off")
+        st.metric("快取圖檔", f"{cache_stats['entries']} 張 / {cache_stats['cache_mb']:.2f} MB")
+        disk_stats = result_cache.stats()
+        if disk_stats["enabled"]:
+            st.metric("磁碟快取", f"{disk_stats['entries']} 筆 / {disk_stats['cache_mb']:.1f} MB",
+                      f"{disk_stats['hits']} 命中 / {disk_stats['misses']} 未命中", delta_color="off")
+            st.caption(f"版本 {disk_stats['version']}，其中 {cache_stats['disk_hits']} 張圖由磁碟讀回")
+        if cache_stats["rss_mb"] is not None:
+            st.metric("行程記憶體 (RSS)", f"{cache_stats['rss_mb']:.0f} MB")
+    with st.expander("🔗 計算節點 (DAG)"):
+        st.caption(f"本次互動重算 {len(dag.reran())} / {len(dag.log)} 個節點")
+        dag_report = dag.report()
+        st.dataframe({"節點": [name for name, _, _ in dag_report], "重算": [ran for _, ran, _ in dag_report],
+                      "耗時 (ms)": [round(ms, 3) for _, _, ms in dag_report]}, hide_index=True)
+
+    # 效能監測：各段落 / 各張圖耗時與峰值記憶體，可對單次 rerun 做 cProfile
+    with st.expander("⏱️ 效能監測 (除錯)"):
+        perf_on = st.toggle("記錄每次互動的耗時與峰值記憶體", key="perf_panel",
+                            help=f"開啟後每次 rerun 附加一行 JSON 到 {perf_monitor.PERF_LOG_PATH}")
+        st.button("🔬 以 cProfile 分析下一次 rerun",
+                  on_click=lambda: st.session_state.update(perf_profile_next=True))
+        perf.lap("側邊欄狀態面板")
+        perf_summary = perf.finish()
+        if perf_on:
+            perf.write_log()
+            st.metric("本次 rerun", f"{perf_summary['total_ms']:.0f} ms")
+            if perf_summary["peak_mb"] is not None:
+                st.metric("Python 記憶體峰值", f"{perf_summary['peak_mb']:.1f} MB")
+            st.dataframe([{"類別": r["kind"], "項目": r["name"], "耗時 (ms)": r["ms"]} for r in perf_summary["records"]],
+                         hide_index=True)
+            st.caption("「段落」為依序的區段耗時；「圖 / 表格 / 計算」為段落內的單項")
+        if perf_summary["profiled"]:
+            st.session_state.perf_profile = (perf.profile_text(), perf.profile_bytes())
+        if "perf_profile" in st.session_state:
+            profile_text, profile_data = st.session_state.perf_profile
+            st.code(profile_text, language=None)
+            st.download_button("下載 cProfile 結果 (.prof)", profile_data, file_name="master_rerun.prof")
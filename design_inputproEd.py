@@ -1,292 +1,619 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-
-# --- 頁面全域設定 ---
-st.set_page_config(page_title="建築結構專業整合系統 Pro", layout="wide", initial_sidebar_state="expanded")
-
-st.title("🏢 建築結構設計系統 Professional")
-st.markdown("##### 集成 基地分析(V1) / 幾何規劃(V2) / 結構計算(V3) / 成本估算(V4)")
-st.markdown("---")
-
-# ==========================================
-# 側邊欄：全域核心參數 (Global Parameters)
-# 這些參數在所有分頁都會用到，所以固定在左邊
-# ==========================================
-with st.sidebar:
-    st.header("🎛️ 核心參數控制")
-    
-    st.subheader("1. 基地規模")
-    land_width = st.number_input("基地面寬 (m)", value=12.0, step=0.5)
-    land_depth = st.number_input("基地深度 (m)", value=20.0, step=0.5)
-    land_area = land_width * land_depth
-    st.info(f"基地面積: {land_area:.2f} m² ({land_area/3.3058:.1f} 坪)")
-    
-    st.subheader("2. 量體規模")
-    floors_above = st.number_input("地上樓層", value=7, min_value=1)
-    floors_below = st.number_input("地下樓層", value=2, min_value=0)
-    total_floors = floors_above + floors_below
-    
-    st.subheader("3. 結構網格")
-    span_x = st.slider("X向柱距 (m)", 3.0, 12.0, 6.0)
-    span_y = st.slider("Y向柱距 (m)", 3.0, 12.0, 5.0)
-
-# --- 分頁導航 ---
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📍 基地與法規 (Site)", 
-    "📐 平面配置 (Layout)", 
-    "🛡️ 載重分析 (Analysis)", 
-    "💰 配筋與估價 (Cost)"
-])
-
-# ==========================================
-# 分頁 1: 基地與使用者邏輯 (保留 V1 的地圖與詳細邏輯)
-# ==========================================
-with tab1:
-    col1, col2 = st.columns([1, 2])
-    
-    with col1:
-        st.subheader("🌍 地理環境設定")
-        lat = st.number_input("緯度 (Latitude)", value=25.0330, format="%.4f")
-        lon = st.number_input("經度 (Longitude)", value=121.5654, format="%.4f")
-        
-        st.subheader("👥 使用者需求邏輯")
-        count_adult = st.number_input("一般成人", 0, 1000, 10)
-        count_elder = st.number_input("高齡長者", 0, 1000, 2)
-        count_disabled = st.number_input("身障/輪椅", 0, 1000, 0)
-        count_child = st.number_input("幼童", 0, 1000, 0)
-        
-        # V1 的智慧邏輯判斷
-        st.info("👇 系統自動生成的設計規範：")
-        constraints = []
-        if count_disabled > 0 or count_elder > 0:
-            st.error("🚨 **無障礙規範啟動**：需配置坡道(1:12)、浴廁扶手、門寬>90cm。")
-        else:
-            st.write("- 無特殊無障礙需求")
-            
-        if count_child > 0:
-            st.warning("👶 **幼童安全規範啟動**：欄杆防墜間隙<10cm、插座安全保護。")
-        else:
-            st.write("- 無特殊幼童防護需求")
-
-    with col2:
-        st.subheader("🗺️ 基地位置預覽")
-        # V1 的地圖功能回歸
-        map_data = pd.DataFrame({'lat': [lat], 'lon': [lon]})
-        st.map(map_data, zoom=15)
-        
-        st.subheader("📊 法規檢討")
-        c1, c2 = st.columns(2)
-        with c1:
-            cov_ratio = st.slider("法定建蔽率 (%)", 30, 100, 60)
-            max_footprint = land_area * (cov_ratio/100)
-            st.metric("單層最大建築面積", f"{max_footprint:.1f} m²")
-        with c2:
-            vol_ratio = st.number_input("法定容積率 (%)", 100, 1000, 240)
-            max_vol_area = land_area * (vol_ratio/100)
-            st.metric("法定容積總樓地板", f"{max_vol_area:.1f} m²")
-
-# ==========================================
-# 分頁 2: 結構平面配置 (保留 V2 的繪圖與警告)
-# ==========================================
-with tab2:
-    st.subheader("📐 結構平面配置預覽")
-    
-    col_layout, col_info = st.columns([3, 1])
-    
-    with col_layout:
-        # V2 的繪圖引擎
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # 畫基地紅框
-        site_rect = patches.Rectangle((0, 0), land_width, land_depth, 
-                                      linewidth=2, edgecolor='red', facecolor='none', linestyle='--', label='基地範圍')
-        ax.add_patch(site_rect)
-        
-        # 計算柱位
-        nx = int(land_width // span_x) + 1
-        ny = int(land_depth // span_y) + 1
-        # 強制邏輯：避免最後跨距太小
-        if (nx-1)*span_x < land_width*0.8: nx += 1
-        if (ny-1)*span_y < land_depth*0.8: ny += 1
-        
-        xs = np.linspace(0, land_width - 0.6, nx) # 預設0.6m柱寬做圖
-        ys = np.linspace(0, land_depth - 0.6, ny)
-        
-        total_cols = 0
-        for x in xs:
-            for y in ys:
-                # 畫柱子
-                col_p = patches.Rectangle((x, y), 0.6, 0.6, facecolor='#444444', edgecolor='black')
-                ax.add_patch(col_p)
-                total_cols += 1
-                # 畫樑線 (示意)
-                if x > 0: ax.plot([x-span_x+0.6, x], [y+0.3, y+0.3], color='blue', alpha=0.3, linewidth=1)
-                if y > 0: ax.plot([x+0.3, x+0.3], [y-span_y+0.6, y], color='blue', alpha=0.3, linewidth=1)
-
-        ax.set_xlim(-2, land_width + 2)
-        ax.set_ylim(-2, land_depth + 2)
-        ax.set_aspect('equal')
-        ax.grid(True, linestyle=':', alpha=0.5)
-        ax.set_title(f"結構平面圖 (Grid Plan) - {land_width}m x {land_depth}m")
-        st.pyplot(fig)
-        
-    with col_info:
-        st.write("#### 配置統計")
-        st.metric("總柱數", f"{total_cols} 支")
-        st.metric("X向實際跨距", f"{land_width/(nx-1):.2f} m")
-        st.metric("Y向實際跨距", f"{land_depth/(ny-1):.2f} m")
-        
-        st.write("#### 設計建議")
-        actual_span = max(land_width/(nx-1), land_depth/(ny-1))
-        if actual_span > 8.0:
-            st.error("⚠️ 跨距過大 (>8m)！建議增加柱子或改用鋼骨(SC)。")
-        elif actual_span < 4.0:
-            st.warning("⚠️ 跨距過密 (<4m)，影響空間使用。")
-        else:
-            st.success("✅ 跨距適中 (RC結構)。")
-
-# ==========================================
-# 分頁 3: 結構安全檢核 (保留 V3 的互動紅綠燈)
-# ==========================================
-with tab3:
-    st.subheader("🛡️ 結構載重與安全性檢核")
-    
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        st.info("🛠️ 1. 材料與斷面設定")
-        fc = st.selectbox("混凝土強度 f'c", [210, 280, 350, 420], index=1)
-        col_w = st.slider("柱寬 (cm)", 50, 120, 60, step=10)
-        col_d = st.slider("柱深 (cm)", 50, 120, 60, step=10)
-    
-    # 計算核心
-    trib_area = span_x * span_y
-    # 載重：(靜載重600 + 活載重200) * 樓層數 * 面積
-    total_load_ton = (trib_area * 900 * total_floors) / 1000.0
-    # 強度：0.65 * 0.85 * fc * Ag
-    col_ag = col_w * col_d
-    capacity_ton = (0.65 * 0.85 * fc * col_ag) / 1000.0
-    ratio = total_load_ton / capacity_ton
-    is_safe = ratio < 1.0
-    
-    with c2:
-        st.warning("⚖️ 2. 載重分析 (最不利柱)")
-        st.metric("單柱負擔面積", f"{trib_area:.1f} m²")
-        st.metric("總垂直載重 (Pu)", f"{total_load_ton:.1f} ton", f"{total_floors}層樓加總")
-        
-    with c3:
-        if is_safe:
-            st.success("✅ 3. 安全性判定：通過")
-            st.metric("柱容許強度 (Pn)", f"{capacity_ton:.1f} ton")
-            st.markdown(f"**應力比：{ratio:.2f}**")
-            st.progress(ratio)
-        else:
-            st.error("❌ 3. 安全性判定：失敗")
-            st.metric("柱容許強度 (Pn)", f"{capacity_ton:.1f} ton")
-            st.markdown(f"**應力比：{ratio:.2f}** (超過 1.0)")
-            st.progress(1.0)
-            st.write("👉 建議：加大柱尺寸 或 提高混凝土強度")
-
-    st.markdown("---")
-    # V3 的視覺化紅綠燈圖
-    st.write("#### 🔍 結構平面應力圖 (Stress Map)")
-    fig2, ax2 = plt.subplots(figsize=(8, 4))
-    site_rect = patches.Rectangle((0, 0), land_width, land_depth, fill=False, edgecolor='#aaa')
-    ax2.add_patch(site_rect)
-    
-    center_x = xs[len(xs)//2]
-    center_y = ys[len(ys)//2]
-    
-    for x in xs:
-        for y in ys:
-            # 中央柱最危險，顯示真實狀態
-            if x == center_x and y == center_y:
-                color = 'green' if is_safe else 'red'
-                ax2.text(x, y+0.5, "Critical", color='red', ha='center', fontsize=8)
-            else:
-                # 邊柱通常負擔較小，這裡簡化假設邊柱只有一半載重
-                color = 'green' 
-            
-            rect = patches.Rectangle((x, y), col_w/100, col_d/100, facecolor=color, edgecolor='black')
-            ax2.add_patch(rect)
-    
-    ax2.set_xlim(-1, land_width+1)
-    ax2.set_ylim(-1, land_depth+1)
-    ax2.set_aspect('equal')
-    ax2.axis('off') # 不顯示座標軸比較乾淨
-    ax2.set_title("紅燈=危險, 綠燈=安全")
-    st.pyplot(fig2)
-
-# ==========================================
-# 分頁 4: 配筋與估價 (保留 V4 的斷面圖與詳細算表)
-# ==========================================
-with tab4:
-    st.subheader("💰 配筋詳圖與造價估算")
-    
-    if not is_safe:
-        st.error("⚠️ 前一步驟「結構檢核」未通過，請先修正結構設計（加大柱子）後再來估價。")
-    else:
-        col_detail, col_cost = st.columns(2)
-        
-        with col_detail:
-            st.info("🔧 柱斷面配筋設計")
-            rebar_size = st.selectbox("主筋號數", ["#6 (D19)", "#7 (D22)", "#8 (D25)", "#10 (D32)"], index=2)
-            
-            # 計算鋼筋支數
-            bar_areas = {"#6 (D19)": 2.87, "#7 (D22)": 3.87, "#8 (D25)": 5.07, "#10 (D32)": 7.94}
-            one_area = bar_areas[rebar_size]
-            min_steel = col_ag * 0.01 # 1%
-            num_bars = int(np.ceil(min_steel / one_area))
-            if num_bars < 4: num_bars = 4
-            if num_bars % 2 != 0: num_bars += 1
-            
-            # V4 的斷面圖繪製
-            fig3, ax3 = plt.subplots(figsize=(5, 5))
-            # 混凝土
-            ax3.add_patch(patches.Rectangle((0,0), col_w, col_d, facecolor='#dddddd', edgecolor='black', linewidth=2))
-            # 箍筋
-            ax3.add_patch(patches.Rectangle((4,4), col_w-8, col_d-8, fill=False, edgecolor='blue', linestyle='--'))
-            # 鋼筋點 (示意畫4角+文字)
-            corners = [(4,4), (col_w-4, 4), (col_w-4, col_d-4), (4, col_d-4)]
-            for c in corners:
-                ax3.add_patch(patches.Circle(c, 1.5, color='red'))
-            
-            ax3.text(col_w/2, col_d/2, f"{num_bars} - {rebar_size}", ha='center', va='center', fontsize=20, color='red', fontweight='bold')
-            ax3.set_xlim(-5, col_w+5)
-            ax3.set_ylim(-5, col_d+5)
-            ax3.axis('off')
-            st.pyplot(fig3)
-            st.success(f"配筋結果：需配置 {num_bars} 根 {rebar_size} (鋼筋比 {(num_bars*one_area/col_ag)*100:.2f}%)")
-
-        with col_cost:
-            st.info("💵 工程造價預算書")
-            price_c = st.number_input("混凝土單價 ($/m³)", value=2500)
-            price_s = st.number_input("鋼筋單價 ($/ton)", value=28000)
-            
-            # 精細算量
-            # 1. 結構混凝土量 (柱+樑板)
-            # 假設樓板厚15cm + 樑佔比 = 平均厚度 25cm
-            vol_slab = land_area * total_floors * 0.25
-            vol_col = (col_w/100 * col_d/100) * 3.2 * total_cols * total_floors
-            total_vol = vol_slab + vol_col
-            
-            # 2. 鋼筋量 (經驗值 180kg/m3)
-            total_steel_ton = (total_vol * 180) / 1000.0
-            
-            # 3. 總價
-            cost_total = (total_vol * price_c) + (total_steel_ton * price_s)
-            
-            # 顯示報表
-            df_cost = pd.DataFrame({
-                "項目": ["混凝土工程", "鋼筋工程", "結構體總計"],
-                "數量": [f"{total_vol:.1f} m³", f"{total_steel_ton:.1f} ton", "-"],
-                "預估費用": [f"${total_vol*price_c:,.0f}", f"${total_steel_ton*price_s:,.0f}", f"${cost_total:,.0f}"]
-            })
-            st.table(df_cost)
-            
-            st.write("---")
-            st.metric("工程總造價", f"NT$ {cost_total/10000:,.1f} 萬")
-            unit_cost = cost_total / (land_area * total_floors / 3.3058)
-            st.metric("單坪造價 (參考)", f"NT$ {unit_cost:,.0f} /坪")
\ No newline at end of file
+import streamlit as st
+import perf_monitor
+
+# --- 頁面全域設定 ---
+st.set_page_config(page_title="建築結構專業整合系統 Pro", layout="wide", initial_sidebar_state="expanded")
+
+# --- 效能監測 (除錯面板開啟時才量測記憶體與寫記錄檔) ---
+perf = perf_monitor.RerunTimer("pro", memory=st.session_state.get("perf_panel", False),
+                               profile=st.session_state.pop("perf_profile_next", False))
+
+st.title("🏢 建築結構設計系統 Professional")
+st.markdown("##### 集成 基地分析(V1) / 幾何規劃(V2) / 結構計算(V3) / 成本估算(V4)")
+st.markdown("---")
+perf.lap("首次繪製 (標題)")
+
+# --- 計算模組 (NumPy) 在標題送出後才載入；pandas / matplotlib 延後到真正用到的分頁才載入 ---
+import design_engine as engine
+import design_optimizer as optimizer
+import plan_render
+from design_dag import build_design_dag
+import uncertainty
+import column_stack
+import site_polygon
+import sensitivity
+import plan_export
+import rebar_layout
+from render_cache import plot_cache, array_key
+from disk_cache import result_cache
+perf.lap("載入計算模組")
+
+# ==========================================
+# 側邊欄：全域核心參數 (Global Parameters)
+# 這些參數在所有分頁都會用到，所以固定在左邊
+# ==========================================
+with st.sidebar:
+    st.header("🎛️ 核心參數控制")
+    
+    st.subheader("1. 基地規模")
+    # 基地形狀：矩形 (面寬 × 深度) 或不規則多邊形 (頂點清單 / 匯入座標)
+    site_shape = st.radio("基地形狀", ["矩形", "多邊形"], horizontal=True, key="site_shape")
+    site = None
+    if site_shape == "多邊形":
+        site_file = st.file_uploader("匯入頂點 (CSV / TXT / GeoJSON)", type=["csv", "txt", "json", "geojson"])
+        if site_file is not None:
+            site_text = site_file.getvalue().decode("utf-8-sig")
+        else:
+            site_text = st.text_area("頂點座標 (每行 x, y，單位 m)", value=site_polygon.EXAMPLE_VERTICES, height=150)
+        site_lonlat = st.checkbox("座標為經緯度 (lon, lat)", value=False, help="GeoJSON 一律視為經緯度")
+        try:
+            site = site_polygon.load_site(site_text, lonlat=site_lonlat)
+        except ValueError as e:
+            st.error(f"基地多邊形無法使用：{e}，改以矩形計算")
+    if site is None:
+        land_width = st.number_input("基地面寬 (m)", value=12.0, step=0.5)
+        land_depth = st.number_input("基地深度 (m)", value=20.0, step=0.5)
+        land_area = land_width * land_depth
+    else:
+        # 柱網鋪滿多邊形外框，再裁切掉基地外的柱
+        land_width, land_depth = (float(v) for v in site.max(axis=0))
+        land_area = site_polygon.polygon_area(site)
+        st.caption(f"{len(site)} 個頂點，外框 {land_width:.1f} × {land_depth:.1f} m，"
+                   f"周長 {site_polygon.polygon_perimeter(site):.1f} m")
+    st.info(f"基地面積: {land_area:.2f} m² ({land_area/3.3058:.1f} 坪)")
+    
+    st.subheader("2. 量體規模")
+    floors_above = st.number_input("地上樓層", value=7, min_value=1)
+    floors_below = st.number_input("地下樓層", value=2, min_value=0)
+    total_floors = floors_above + floors_below
+    basement_load = st.number_input("地下層樓板載重 (kg/m²)", value=engine.LOAD_INTENSITY, step=50,
+                                    help="停車場 / 機房等地下層可設定較高載重")
+    
+    st.subheader("3. 結構網格")
+    span_x = st.slider("X向柱距 (m)", 3.0, 12.0, 6.0)
+    span_y = st.slider("Y向柱距 (m)", 3.0, 12.0, 5.0)
+    
+    st.subheader("4. 顯示模式")
+    lazy_tabs = st.toggle("⚡ 只繪製目前分頁", value=True, key="lazy_tabs",
+                          help="切換分頁時才產生該分頁的地圖與圖面；關閉則每次互動都產生全部分頁")
+
+# --- 計算流程 DAG：每個 session 保留各節點結果，只重算輸入有變的部分 ---
+if "dag" not in st.session_state:
+    st.session_state.dag = build_design_dag(actual_span=False) # Pro 版以名目柱距計算負擔面積
+dag = st.session_state.dag
+dag.begin()
+dag.set_inputs(land_width=land_width, land_depth=land_depth, site=site, floors=total_floors,
+               floors_below=floors_below, basement_load=basement_load, span_x=span_x, span_y=span_y)
+site_key = array_key(site) if site is not None else None   # 繪圖快取 key 用
+if dag["total_cols"] == 0:
+    st.error("基地多邊形內沒有任何柱位，請調整頂點或柱距")
+    st.stop()
+
+perf.lap("側邊欄 + DAG")
+
+# --- 自動最佳化 (快取) ---
+@st.cache_data(max_entries=32)
+@result_cache.memoize("pro_optimizer")  # 跨 session / 重啟後仍可重用
+def run_optimizer(land_width, land_depth, total_floors, site=None, transitions=()):
+    """掃描柱距/斷面/強度，回傳結構體造價 vs 應力比的 Pareto 前緣表格與統計"""
+    import pandas as pd
+    front, stats = optimizer.optimize_design(land_width, land_depth, total_floors,
+                                             actual_span=False, include_facade=False, site=site,
+                                             transitions=transitions)
+    df_front = pd.DataFrame({
+        "X向柱距 (m)": front["span_x"],
+        "Y向柱距 (m)": front["span_y"],
+        "柱數": front["total_cols"],
+        "柱寬 (cm)": front["col_w"],
+        "柱深 (cm)": front["col_d"],
+        "強度 fc": front["fc"],
+        "主筋": [f"{n} - {engine.REBAR_SIZES[i]}" for n, i in zip(front["num_bars"], front["rebar_idx"])],
+        "應力比": front["ratio"].round(2),
+        "結構體造價 (萬)": (front["grand_total"] / 10000).round(1),
+    })
+    return df_front, stats
+
+@st.cache_data(max_entries=8)
+def load_portfolio(data, name, n_sites):
+    """候選基地組合的評估結果 (依上傳檔內容或示範筆數快取)"""
+    import portfolio  # 組合地圖需要 pandas / pydeck，第一次用到時才載入
+    df = portfolio.read_sites(data, name) if data is not None else portfolio.demo_sites(n_sites)
+    return portfolio.evaluate_portfolio(df)
+
+@st.cache_resource(max_entries=8)
+def portfolio_deck(data, name, n_sites, mode):
+    """組合地圖 (同一資料與上色方式只建立與序列化一次，rerun 時重用同一個 Deck)"""
+    import portfolio
+    return portfolio.build_deck(load_portfolio(data, name, n_sites), mode)
+
+@st.cache_data(max_entries=32)
+def run_sensitivity(base, names=None, actual_span=True, cost_key="grand_total"):
+    """參數敏感度掃描 (每個參數一次向量化計算，依目前方案快取)"""
+    return sensitivity.sensitivity(base, names, actual_span=actual_span, cost_key=cost_key)
+
+@st.cache_data(max_entries=32)
+@result_cache.memoize("pro_monte_carlo")
+def run_monte_carlo(*args, **kwargs):
+    """Monte Carlo 不確定性分析 (依輸入組合快取)"""
+    return uncertainty.monte_carlo(*args, **kwargs)
+
+# --- 分頁導航 (只繪製目前分頁時，切換分頁會觸發 rerun) ---
+tab1, tab2, tab3, tab4 = st.tabs([
+    "📍 基地與法規 (Site)", 
+    "📐 平面配置 (Layout)", 
+    "🛡️ 載重分析 (Analysis)", 
+    "💰 配筋與估價 (Cost)"
+], key="active_tab", on_change="rerun" if lazy_tabs else "ignore")
+
+def visible(tab):
+    """分頁是否產生重量級內容 (地圖 / 圖面 / 最佳化 / Monte Carlo)；輸入元件與共用計算不受影響"""
+    return tab.open is not False
+
+# 分頁內的 matplotlib 圖：先佔位並全部送進背景繪圖池，腳本跑完後再一起等待填入
+# (同一次 rerun 的各張圖彼此並行，也和後續的計算重疊；繪圖函數引用的變數在送出後不再改變)
+pending_figures = []
+
+def show_figure(key, draw, figsize, dpi=None):
+    """佔位並送出背景繪圖，圖在 flush_figures() 時填入"""
+    pending_figures.append((st.empty(), plot_cache.submit(key, draw, figsize, dpi)))
+
+def flush_figures():
+    """等待所有背景繪圖並填入佔位 (總等待時間記為一個 perf 段落)"""
+    if not pending_figures:
+        return
+    with perf.stage(f"等待背景繪圖 ({len(pending_figures)} 張)"):
+        for slot, future in pending_figures:
+            slot.image(future.result(), width="stretch")
+    pending_figures.clear()
+
+# ==========================================
+# 分頁 1: 基地與使用者邏輯 (保留 V1 的地圖與詳細邏輯)
+# ==========================================
+with tab1:
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("🌍 地理環境設定")
+        lat = st.number_input("緯度 (Latitude)", value=25.0330, format="%.4f")
+        lon = st.number_input("經度 (Longitude)", value=121.5654, format="%.4f")
+        
+        st.subheader("👥 使用者需求邏輯")
+        count_adult = st.number_input("一般成人", 0, 1000, 10)
+        count_elder = st.number_input("高齡長者", 0, 1000, 2)
+        count_disabled = st.number_input("身障/輪椅", 0, 1000, 0)
+        count_child = st.number_input("幼童", 0, 1000, 0)
+        
+        # V1 的智慧邏輯判斷
+        st.info("👇 系統自動生成的設計規範：")
+        constraints = []
+        if count_disabled > 0 or count_elder > 0:
+            st.error("🚨 **無障礙規範啟動**：需配置坡道(1:12)、浴廁扶手、門寬>90cm。")
+        else:
+            st.write("- 無特殊無障礙需求")
+            
+        if count_child > 0:
+            st.warning("👶 **幼童安全規範啟動**：欄杆防墜間隙<10cm、插座安全保護。")
+        else:
+            st.write("- 無特殊幼童防護需求")
+
+    with col2:
+        st.subheader("🗺️ 基地位置預覽")
+        # V1 的地圖功能回歸
+        map_data = {'lat': [lat], 'lon': [lon]}
+        if visible(tab1):
+            with perf.stage("st.map 地圖"):
+                st.map(map_data, zoom=15)
+        
+        st.subheader("📊 法規檢討")
+        c1, c2 = st.columns(2)
+        with c1:
+            cov_ratio = st.slider("法定建蔽率 (%)", 30, 100, 60)
+            max_footprint = land_area * (cov_ratio/100)
+            st.metric("單層最大建築面積", f"{max_footprint:.1f} m²")
+        with c2:
+            vol_ratio = st.number_input("法定容積率 (%)", 100, 1000, 240)
+            max_vol_area = land_area * (vol_ratio/100)
+            st.metric("法定容積總樓地板", f"{max_vol_area:.1f} m²")
+
+    # 多基地組合地圖：候選基地清單一次向量化評估，依氣候帶 / 單坪造價 / D/C 上色 (資料與地圖皆快取)
+    with st.expander("🗺️ 候選基地組合地圖 (Portfolio)"):
+        import portfolio
+        pf_c1, pf_c2 = st.columns([2, 1])
+        with pf_c1:
+            pf_file = st.file_uploader("候選基地清單 (CSV / Parquet，欄位同 batch_cli，需有 lat / lon)",
+                                       type=["csv", "parquet"], key="portfolio_file")
+        with pf_c2:
+            pf_n = st.select_slider("示範基地數 (未上傳時)", options=[1_000, 10_000, 50_000],
+                                    value=portfolio.DEMO_SITES, disabled=pf_file is not None)
+            pf_mode = st.radio("上色方式", list(portfolio.COLOR_MODES), format_func=portfolio.COLOR_MODES.get,
+                               horizontal=True, key="portfolio_color")
+        # 展開區塊收合時內容仍會執行：評估與地圖 (pandas / pydeck) 只在開啟後才執行，首次繪製不載入
+        if st.toggle("顯示組合地圖", value=False, key="portfolio_on") and visible(tab1):
+            pf_data = pf_file.getvalue() if pf_file is not None else None
+            pf_name = pf_file.name if pf_file is not None else ""
+            try:
+                with perf.stage("組合評估", kind="計算"):
+                    pf_result = load_portfolio(pf_data, pf_name, pf_n)
+                    pf_deck = portfolio_deck(pf_data, pf_name, pf_n, pf_mode)
+            except ValueError as e:
+                st.error(f"❌ 候選基地清單錯誤：{e}")
+            else:
+                with perf.stage("pydeck 組合地圖"):
+                    st.pydeck_chart(pf_deck, height=450)
+                pf_stats = portfolio.summary(pf_result)
+                st.caption(f"{pf_stats['n_sites']:,} 個基地 ("
+                           + "、".join(f"{k.split()[0]} {v:,}" for k, v in pf_stats["zone_counts"].items())
+                           + f")，不安全 {pf_stats['n_unsafe']:,} 個，單坪造價中位數 NT$ {pf_stats['median_per_ping']:,.0f}，"
+                           f"評估耗時 {pf_result['elapsed']*1000:.0f} ms (矩形基地批次模型)")
+
+perf.lap("Tab 1 基地與法規")
+
+# ==========================================
+# 分頁 2: 結構平面配置 (保留 V2 的繪圖與警告)
+# ==========================================
+with tab2:
+    st.subheader("📐 結構平面配置預覽")
+    
+    col_layout, col_info = st.columns([3, 1])
+    
+    with col_layout:
+        # 計算柱位
+        nx, ny = dag["grid"]
+        xs, ys = dag["coords"] # 預設0.6m柱寬做圖
+        total_cols = dag["total_cols"]
+        column_mask = dag["column_mask"] if site is not None else None
+        
+        # V2 的繪圖引擎 (圖檔依幾何參數快取，調整其他參數不會重畫)
+        def draw_plan(fig):
+            ax = fig.subplots()
+            # 畫基地紅框 (矩形或不規則多邊形)
+            plan_render.draw_site(ax, site, land_width, land_depth,
+                                  linewidth=2, edgecolor='red', linestyle='--', label='基地範圍')
+            # 畫柱子 + 樑線 (示意)，以 Collection 一次畫完，基地外的柱不畫
+            plan_render.draw_grid_plan(ax, xs, ys, span_x, span_y, col_color='#444444', mask=column_mask)
+            ax.set_xlim(-2, land_width + 2)
+            ax.set_ylim(-2, land_depth + 2)
+            ax.set_aspect('equal')
+            ax.grid(True, linestyle=':', alpha=0.5)
+            ax.set_title(f"結構平面圖 (Grid Plan) - {land_width:.1f}m x {land_depth:.1f}m" + (" (外框)" if site is not None else ""))
+
+        if visible(tab2):
+            show_figure(("pro", "plan", land_width, land_depth, site_key, span_x, span_y), draw_plan, figsize=(10, 8),
+                        dpi=plan_render.PLAN_DPI)
+        # 向量匯出 (SVG / DXF)：柱斷面與 D/C 在 Tab 3 才決定，先預留位置，於 Tab 3 填入
+        export_slot = st.container()
+        
+    with col_info:
+        st.write("#### 配置統計")
+        st.metric("總柱數", f"{total_cols} 支")
+        st.metric("X向實際跨距", f"{land_width/(nx-1):.2f} m")
+        st.metric("Y向實際跨距", f"{land_depth/(ny-1):.2f} m")
+        
+        st.write("#### 設計建議")
+        actual_span = max(land_width/(nx-1), land_depth/(ny-1))
+        if actual_span > 8.0:
+            st.error("⚠️ 跨距過大 (>8m)！建議增加柱子或改用鋼骨(SC)。")
+        elif actual_span < 4.0:
+            st.warning("⚠️ 跨距過密 (<4m)，影響空間使用。")
+        else:
+            st.success("✅ 跨距適中 (RC結構)。")
+
+perf.lap("Tab 2 平面配置")
+
+# ==========================================
+# 分頁 3: 結構安全檢核 (保留 V3 的互動紅綠燈)
+# ==========================================
+with tab3:
+    st.subheader("🛡️ 結構載重與安全性檢核")
+    
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.info("🛠️ 1. 材料與斷面設定")
+        fc = st.selectbox("混凝土強度 f'c", [210, 280, 350, 420], index=1)
+        col_w = st.slider("柱寬 (cm)", 50, 120, 60, step=10)
+        col_d = st.slider("柱深 (cm)", 50, 120, 60, step=10)
+        # 柱 × 樓層疊層：上部樓層可改用較小斷面 / 較低強度 (D/C 逐段檢核)
+        with st.expander("🏗️ 上部樓層變斷面"):
+            labels = column_stack.floor_labels(total_floors, floors_below)
+            use_transition = st.toggle("啟用變斷面", value=False, disabled=len(labels) < 2)
+            transitions = ()
+            if use_transition:
+                t_label = st.selectbox("自此樓層起 (含)", labels[1:], index=len(labels) // 2 - 1)
+                t_w = st.slider("上部柱寬 (cm)", 50, 120, col_w, step=10)
+                t_d = st.slider("上部柱深 (cm)", 50, 120, col_d, step=10)
+                t_fc = st.selectbox("上部 f'c", engine.FC_OPTIONS, index=engine.FC_OPTIONS.index(fc))
+                transitions = ((labels.index(t_label), t_w, t_d, t_fc),)
+    
+    # 計算核心：每根柱 (角柱/邊柱/中柱) 的負擔面積，中柱負擔整跨、邊柱半跨、角柱 1/4
+    # 載重：每層樓板載重 (地下層可另設) 由上往下累加，逐層柱段檢核
+    # 強度：0.65 * 0.85 * fc * Ag (各段依該段斷面與強度)
+    col_ag = col_w * col_d
+    dag.set_inputs(fc=fc, col_w=col_w, col_d=col_d, transitions=transitions)
+    column_ratio = dag["column_ratio"]
+    check = dag["check"]
+    trib_area = check["trib_area"]
+    total_load_ton = check["total_load"]
+    capacity_ton = check["capacity"]
+    ratio = check["ratio"]
+    is_safe = check["is_safe"]
+    n_fail = check["n_fail"]
+    
+    with c2:
+        st.warning("⚖️ 2. 載重分析 (最不利柱)")
+        st.metric("單柱負擔面積", f"{trib_area:.1f} m²")
+        st.metric("總垂直載重 (Pu)", f"{total_load_ton:.1f} ton", f"{total_floors}層樓加總")
+        st.metric("不安全柱數", f"{n_fail} / {total_cols} 支")
+        
+    with c3:
+        if is_safe:
+            st.success("✅ 3. 安全性判定：通過")
+            st.metric("柱容許強度 (Pn)", f"{capacity_ton:.1f} ton")
+            st.markdown(f"**應力比：{ratio:.2f}**")
+            st.progress(ratio)
+        else:
+            st.error("❌ 3. 安全性判定：失敗")
+            st.metric("柱容許強度 (Pn)", f"{capacity_ton:.1f} ton")
+            st.markdown(f"**應力比：{ratio:.2f}** (超過 1.0)")
+            st.progress(1.0)
+            st.write("👉 建議：加大柱尺寸 或 提高混凝土強度")
+
+    # 柱 × 樓層疊層：控制柱段與各樓層最大 D/C
+    st.caption(f"控制柱段：{labels[check['floor']]} (斷面 {check['col_w']:.0f}×{check['col_d']:.0f} cm，"
+               f"f'c {check['fc']:.0f})，共檢核 {total_cols * len(labels):,} 段")
+    if visible(tab3):
+        with st.expander("📊 各樓層最大 D/C"):
+            floor_ratio = dag["stack"]["ratio"].max(axis=0)
+            st.bar_chart({"樓層": labels[::-1], "D/C": floor_ratio[::-1]}, x="樓層", y="D/C",
+                         horizontal=True, sort=False)
+
+    st.markdown("---")
+    # V3 的視覺化紅綠燈圖
+    st.write("#### 🔍 結構平面應力圖 (Stress Map)")
+    def draw_stress(fig):
+        ax2 = fig.subplots()
+        plan_render.draw_site(ax2, site, land_width, land_depth, edgecolor='#aaa')
+        # 每根柱依自己的應力比上色 (綠 < 0.8 <= 橘 < 1.0 <= 紅)
+        plan_render.draw_stress_map(ax2, xs, ys, column_ratio, col_w/100, col_d/100,
+                                    label="Critical", label_kw={"dy": 0.5})
+        ax2.set_xlim(-1, land_width+1)
+        ax2.set_ylim(-1, land_depth+1)
+        ax2.set_aspect('equal')
+        ax2.axis('off') # 不顯示座標軸比較乾淨
+        ax2.set_title("紅燈=危險, 橘燈=接近, 綠燈=安全")
+
+    # 快取 key：幾何 + 每根柱的紅綠燈等級
+    stress_key = ("pro", "stress", land_width, land_depth, site_key, nx, ny, col_w, col_d,
+                  array_key(plan_render.ratio_classes(column_ratio)))
+    if visible(tab3):
+        show_figure(stress_key, draw_stress, figsize=(8, 4))
+
+    # Tab 2 的向量匯出：逐批串流產生 (不經 matplotlib)，按下下載才產生檔案
+    with export_slot:
+        with st.expander("📤 匯出向量平面圖 (SVG / DXF)"):
+            if visible(tab2):
+                export_kw = dict(xs=xs, ys=ys, width=land_width, depth=land_depth, site=site, mask=column_mask,
+                                 ratio=column_ratio, col_w=col_w/100, col_d=col_d/100)
+                for col, fmt in zip(st.columns(len(plan_export.MIME_TYPES)), plan_export.MIME_TYPES):
+                    col.download_button(f"下載 {fmt.upper()}", plan_export.plan_download(fmt, **export_kw),
+                                        file_name=f"pro_grid_plan.{fmt}", mime=plan_export.MIME_TYPES[fmt],
+                                        on_click="ignore")
+                st.caption(f"基地外框、樑線與 {total_cols:,} 支柱 (依 D/C 紅綠燈上色，斷面 {col_w}×{col_d} cm)，座標單位 m；"
+                           "DXF 的柱依等級分在 DC_OK / DC_WARN / DC_FAIL 圖層")
+
+    st.markdown("---")
+    # 自動最佳化：一次掃描所有柱距/斷面/強度組合，不必手動調整滑桿
+    st.write("#### 🤖 自動最佳化 (Pareto 前緣)")
+    if st.toggle("啟用最佳化掃描", value=False) and visible(tab3):
+        with perf.stage("最佳化掃描", kind="計算"):
+            df_front, opt_stats = run_optimizer(land_width, land_depth, total_floors, site, transitions)
+        st.caption(f"掃描 {opt_stats['checked']:,} 組，可行 {opt_stats['feasible']:,} 組，"
+                   f"前緣 {opt_stats['front']} 組，耗時 {opt_stats['elapsed']*1000:.0f} ms (以預設單價估算)")
+        if df_front.empty:
+            st.error("❌ 掃描範圍內無通過檢核的方案")
+        else:
+            best = df_front.iloc[0]
+            st.success(f"💡 建議方案：柱距 {best['X向柱距 (m)']:.1f} × {best['Y向柱距 (m)']:.1f} m，"
+                       f"柱 {best['柱寬 (cm)']}×{best['柱深 (cm)']} cm，f'c {best['強度 fc']}，"
+                       f"應力比 {best['應力比']:.2f}，結構體造價 {best['結構體造價 (萬)']:,.1f} 萬")
+            st.scatter_chart(df_front, x="應力比", y="結構體造價 (萬)", color="柱數")
+            with perf.stage("Pareto 表格", kind="表格"):
+                st.dataframe(df_front, hide_index=True)
+
+perf.lap("Tab 3 結構分析")
+
+# ==========================================
+# 分頁 4: 配筋與估價 (保留 V4 的斷面圖與詳細算表)
+# ==========================================
+with tab4:
+    st.subheader("💰 配筋詳圖與造價估算")
+    
+    if not is_safe:
+        st.error("⚠️ 前一步驟「結構檢核」未通過，請先修正結構設計（加大柱子）後再來估價。")
+    else:
+        col_detail, col_cost = st.columns(2)
+        
+        with col_detail:
+            st.info("🔧 柱斷面配筋設計")
+            rebar_size = st.selectbox("主筋號數", ["#6 (D19)", "#7 (D22)", "#8 (D25)", "#10 (D32)"], index=2)
+            
+            # 計算鋼筋支數
+            bar_areas = {"#6 (D19)": 2.87, "#7 (D22)": 3.87, "#8 (D25)": 5.07, "#10 (D32)": 7.94}
+            one_area = bar_areas[rebar_size]
+            dag.set_inputs(bar_area=one_area)
+            num_bars = dag["num_bars"] # 最小鋼筋比 1% + 最大間距
+            section_rebar = dag["section_rebar"]
+            
+            # V4 的斷面圖繪製
+            def draw_section(fig):
+                from matplotlib import patches
+                ax3 = fig.subplots()
+                # 混凝土
+                ax3.add_patch(patches.Rectangle((0,0), col_w, col_d, facecolor='#dddddd', edgecolor='black', linewidth=2))
+                # 箍筋
+                ax3.add_patch(patches.Rectangle((4,4), col_w-8, col_d-8, fill=False, edgecolor='blue', linestyle='--'))
+                # 鋼筋點 (沿周邊實際排列)
+                for c in section_rebar["positions"]:
+                    ax3.add_patch(patches.Circle(c, section_rebar["bar_dia"] / 2, color='red'))
+                
+                ax3.text(col_w/2, col_d/2, f"{num_bars} - {rebar_size}", ha='center', va='center', fontsize=20, color='red', fontweight='bold')
+                ax3.set_xlim(-5, col_w+5)
+                ax3.set_ylim(-5, col_d+5)
+                ax3.axis('off')
+
+            if visible(tab4):
+                show_figure(("pro", "section", col_w, col_d, num_bars, rebar_size), draw_section, figsize=(5, 5))
+            st.success(f"配筋結果：需配置 {num_bars} 根 {rebar_size} (鋼筋比 {(num_bars*one_area/col_ag)*100:.2f}%，"
+                       f"間距 {section_rebar['spacing_x']:.1f} / {section_rebar['spacing_y']:.1f} cm)")
+            if not section_rebar["feasible"]:
+                st.warning("⚠️ 此號數不符主筋淨間距或最大鋼筋比限制")
+
+            # 分組配筋：所有柱段依需求鋼筋量分組，每組選最省鋼筋的號數，柱鋼筋重計入造價
+            with st.expander("🧮 分組配筋最佳化"):
+                if visible(tab4):
+                    with perf.stage("分組配筋", kind="計算"):
+                        rebar_design = dag["rebar_design"]
+                        rebar_fixed = dag["rebar_fixed"]
+                    r1, r2, r3 = st.columns(3)
+                    r1.metric("柱鋼筋 (分組最佳化)", f"{rebar_design['steel_weight']:,.1f} ton")
+                    r2.metric(f"全部用 {rebar_size.split()[0]}", f"{rebar_fixed['steel_weight']:,.1f} ton",
+                              f"{rebar_fixed['steel_weight'] - rebar_design['steel_weight']:+,.1f} ton", delta_color="inverse")
+                    r3.metric("經驗值 180 kg/m³", f"{dag['column_volume'] * engine.STEEL_RATIO:,.1f} ton")
+                    st.dataframe(rebar_layout.schedule_table(rebar_design), hide_index=True)
+                    st.caption(f"{rebar_design['group'].size:,} 個柱段分 {len(rebar_design['groups']['col_w'])} 組 "
+                               f"(主筋 {rebar_design['main_weight']:,.1f} ton + 箍筋 {rebar_design['tie_weight']:,.1f} ton)，"
+                               f"耗時 {rebar_design['elapsed']*1000:.0f} ms；樓板與樑仍以經驗值估算")
+                    if rebar_design["n_infeasible"]:
+                        st.warning(f"⚠️ {rebar_design['n_infeasible']:,} 個柱段在任何號數下都無法滿足間距或最大鋼筋比，請加大斷面")
+
+        with col_cost:
+            st.info("💵 工程造價預算書")
+            price_c = st.number_input("混凝土單價 ($/m³)", value=2500)
+            price_s = st.number_input("鋼筋單價 ($/ton)", value=28000)
+            
+            # 精細算量
+            # 1. 結構混凝土量 (柱+樑板)
+            # 假設樓板厚15cm + 樑佔比 = 平均厚度 25cm
+            # 2. 鋼筋量 (柱依分組配筋實算主筋+箍筋，樓板與樑取經驗值 180kg/m3)
+            dag.set_inputs(p_conc=price_c, p_steel=price_s)
+            total_vol, total_steel_ton = dag["quantity"]
+            
+            # 3. 總價
+            cost_total = dag["cost_structure"]
+            
+            # 顯示報表
+            df_cost = {
+                "項目": ["混凝土工程", "鋼筋工程", "結構體總計"],
+                "數量": [f"{total_vol:.1f} m³", f"{total_steel_ton:.1f} ton", "-"],
+                "預估費用": [f"${total_vol*price_c:,.0f}", f"${total_steel_ton*price_s:,.0f}", f"${cost_total:,.0f}"]
+            }
+            with perf.stage("成本表", kind="表格"):
+                st.table(df_cost)
+            
+            st.write("---")
+            st.metric("工程總造價", f"NT$ {cost_total/10000:,.1f} 萬")
+            unit_cost = cost_total / (land_area * total_floors / 3.3058)
+            st.metric("單坪造價 (參考)", f"NT$ {unit_cost:,.0f} /坪")
+
+            # 不確定性分析：單價、載重、樓板厚度、f'c、鋼筋用量皆以分佈抽樣
+            with st.expander("🎲 不確定性分析 (Monte Carlo)"):
+                mc_c1, mc_c2 = st.columns(2)
+                with mc_c1:
+                    n_samples = st.select_slider("樣本數", options=[10_000, 100_000, 1_000_000], value=100_000)
+                    price_cv = st.slider("單價變異係數 (%)", 0, 30, 10)
+                    steel_cv = st.slider("鋼筋用量變異係數 (%)", 0, 30, 15)
+                with mc_c2:
+                    load_cv = st.slider("載重變異係數 (%)", 0, 30, 10)
+                    fc_cv = st.slider("混凝土強度變異係數 (%)", 0, 30, 10)
+                    slab_tol = st.slider("樓板厚度誤差 (± cm)", 0, 8, 3)
+                if visible(tab4):
+                    mc_args = (trib_area, total_floors, check["fc"], check["col_w"], check["col_d"],
+                               land_area, total_cols, price_c, price_s, 0.0,
+                               n_samples, price_cv/100, load_cv/100, fc_cv/100, steel_cv/100, slab_tol/100)
+                    # D/C 以控制柱段抽樣，柱體積與柱鋼筋取逐層算量與分組配筋結果
+                    mc_kw = {"load_floors": check["load_floors"], "vol_col": dag["column_volume"],
+                             "steel_col": dag["column_steel"]}
+                    with perf.stage("Monte Carlo", kind="計算"):
+                        mc = run_monte_carlo(*mc_args, **mc_kw)
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("P5 造價", f"{mc['total_pct'][5]/10000:,.0f} 萬")
+                    m2.metric("P50 造價", f"{mc['total_pct'][50]/10000:,.0f} 萬")
+                    m3.metric("P95 造價", f"{mc['total_pct'][95]/10000:,.0f} 萬")
+                    m4.metric("P(D/C ≥ 1)", f"{mc['p_fail']*100:.2f} %")
+                    show_figure(("pro", "monte_carlo") + mc_args + tuple(mc_kw.values()),
+                                lambda fig: uncertainty.draw_histograms(fig, mc), figsize=(8, 3))
+                    st.caption(f"{mc['n_samples']:,} 組樣本，計算 {mc['elapsed']*1000:.0f} ms")
+
+    # 參數敏感度：一次只改一個參數掃過其範圍，不必逐一拖動滑桿再 rerun
+    with st.expander("📈 參數敏感度 (結構體造價與 D/C)"):
+        sens_names = [n for n in sensitivity.PARAMETERS if n not in sensitivity.FACADE_PARAMETERS]
+        sens_param = st.selectbox("掃描參數", sens_names, format_func=lambda n: sensitivity.PARAMETERS[n][0],
+                                  key="sens_param")
+        if visible(tab4):
+            sens_base = dict(land_width=land_width, land_depth=land_depth, floors=total_floors, span_x=span_x,
+                             span_y=span_y, fc=fc, col_w=col_w, col_d=col_d, p_conc=dag.inputs.get("p_conc", 2500),
+                             p_steel=dag.inputs.get("p_steel", 28000))
+            with perf.stage("敏感度掃描", kind="計算"):
+                sens = run_sensitivity(sens_base, sens_names, actual_span=False, cost_key="cost_structure")
+            curve = sens["curves"][sens_param]
+            label = sensitivity.PARAMETERS[sens_param][0]
+            x = curve["values"]
+            s1, s2 = st.columns(2)
+            with perf.stage("敏感度曲線", kind="表格"):
+                s1.line_chart({label: x, "D/C": curve["ratio"]}, x=label, y="D/C")
+                s2.line_chart({label: x, "結構體造價 (萬)": curve["cost"] / 10000}, x=label, y="結構體造價 (萬)")
+            st.write("##### 結構體造價龍捲風圖 (各參數在範圍內的最低 / 最高造價與目前方案的差)")
+            tornado = sens["tornado"]
+            st.bar_chart({"參數": [row[1] for row in tornado],
+                          "最低 (萬)": [row[2] / 10000 for row in tornado],
+                          "最高 (萬)": [row[3] / 10000 for row in tornado]},
+                         x="參數", y=["最低 (萬)", "最高 (萬)"], horizontal=True, sort=False, stack=False)
+            st.caption(f"目前方案 D/C {sens['base_ratio']:.2f}、結構體造價 {sens['base_cost']/10000:,.1f} 萬 "
+                       f"(矩形基地、單一柱斷面的批次模型)，{len(sens_names)} 個參數共耗時 {sens['elapsed']*1000:.0f} ms")
+
+flush_figures()
+perf.lap("Tab 4 配筋與估價")
+
+# ==========================================
+# 側邊欄：繪圖快取狀態 (監控長時間運行的記憶體)
+# ==========================================
+with st.sidebar:
+    with st.expander("🧮 繪圖快取狀態"):
+        cache_stats = plot_cache.stats()
+        st.metric("快取命中率", f"{cache_stats['hit_rate']*100:.0f} %",
+                  f"{cache_stats['hits']} 命中 / {cache_stats['misses'] - cache_stats['disk_hits']} 重畫", delta_color="off")
+        st.metric("快取圖檔", f"{cache_stats['entries']} 張 / {cache_stats['cache_mb']:.2f} MB")
+        disk_stats = result_cache.stats()
+        if disk_stats["enabled"]:
+            st.metric("磁碟快取", f"{disk_stats['entries']} 筆 / {disk_stats['cache_mb']:.1f} MB",
+                      f"{disk_stats['hits']} 命中 / {disk_stats['misses']} 未命中", delta_color="off")
+            st.caption(f"版本 {disk_stats['version']}，其中 {cache_stats['disk_hits']} 張圖由磁碟讀回")
+        if cache_stats["rss_mb"] is not None:
+            st.metric("行程記憶體 (RSS)", f"{cache_stats['rss_mb']:.0f} MB")
+    with st.expander("🔗 計算節點 (DAG)"):
+        st.caption(f"本次互動重算 {len(dag.reran())} / {len(dag.log)} 個節點")
+        dag_report = dag.report()
+        st.dataframe({"節點": [name for name, _, _ in dag_report], "重算": [ran for _, ran, _ in dag_report],
+                      "耗時 (ms)": [round(ms, 3) for _, _, ms in dag_report]}, hide_index=True)
+
+    # 效能監測：各段落 / 各張圖耗時與峰值記憶體，可對單次 rerun 做 cProfile
+    with st.expander("⏱️ 效能監測 (除錯)"):
+        perf_on = st.toggle("記錄每次互動的耗時與峰值記憶體", key="perf_panel",
+                            help=f"開啟後每次 rerun 附加一行 JSON 到 {perf_monitor.PERF_LOG_PATH}")
+        st.button("🔬 以 cProfile 分析下一次 rerun",
+                  on_click=lambda: st.session_state.update(perf_profile_next=True))
+        perf.lap("側邊欄狀態面板")
+        perf_summary = perf.finish()
+        if perf_on:
+            perf.write_log()
+            st.metric("本次 rerun", f"{perf_summary['total_ms']:.0f} ms")
+            if perf_summary["peak_mb"] is not None:
+                st.metric("Python 記憶體峰值", f"{perf_summary['peak_mb']:.1f} MB")
+            st.dataframe([{"類別": r["kind"], "項目": r["name"], "耗時 (ms)": r["ms"]} for r in perf_summary["records"]],
+                         hide_index=True)
+            st.caption("「段落」為依序的區段耗時；「圖 / 表格 / 計算」為段落內的單項")
+        if perf_summary["profiled"]:
+            st.session_state.perf_profile = (perf.profile_text(), perf.profile_bytes())
+        if "perf_profile" in st.session_state:
+            profile_text, profile_data = st.session_state.perf_profile
+            st.code(profile_text, language=None)
+            st.download_button("下載 cProfile 結果 (.prof)", profile_data, file_name="pro_rerun.prof")
@@ -0,0 +1,168 @@
+import time
+
+import numpy as np
+
+import design_engine as engine
+import site_polygon
+
+# ==========================================
+# 自動最佳化：掃描柱距 / 柱斷面 / 混凝土強度 / 主筋，求成本-安全 Pareto 前緣
+# ==========================================
+
+SPAN_RANGE = np.arange(3.0, 12.0 + 1e-9, 0.5)     # 柱距 3~12 m
+COL_RANGE = np.arange(50, 120 + 1, 10)             # 柱寬/柱深 50~120 cm
+
+
+def pareto_mask(*objectives):
+    """三目標 (皆為越小越好) 的非支配解遮罩，完全相同的解只保留第一個
+
+    第三個目標應為離散值 (例如柱數)，用來分組做快速剔除。
+    """
+    obj = np.column_stack(objectives).astype(float)
+    n = len(obj)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    # 1. 依第三目標分組，組內先做 2D 前緣快速剔除 (組內被支配者全域也被支配)
+    cand = np.zeros(n, dtype=bool)
+    for g in np.unique(obj[:, 2]):
+        idx = np.flatnonzero(obj[:, 2] == g)
+        idx = idx[np.lexsort((obj[idx, 1], obj[idx, 0]))]
+        second = obj[idx, 1]
+        keep = np.ones(len(idx), dtype=bool)
+        keep[1:] = second[1:] < np.minimum.accumulate(second)[:-1]
+        cand[idx[keep]] = True
+
+    # 2. 候選解兩兩比較 (分塊避免記憶體暴增)
+    cidx = np.flatnonzero(cand)
+    c = obj[cidx]
+    mask = np.zeros(n, dtype=bool)
+    chunk = max(1, 2_000_000 // max(len(c), 1))
+    for s in range(0, len(c), chunk):
+        block = c[s:s + chunk, None, :]
+        dominated = (np.all(c[None] <= block, axis=2) & np.any(c[None] < block, axis=2)).any(axis=1)
+        mask[cidx[s:s + chunk][~dominated]] = True
+    return mask
+
+
+def _masked_trib_classes(masks, span_x, span_y):
+    """裁切後各柱網的柱分類：相同負擔面積的柱為一類，回傳 (每類柱數, 每類負擔面積)，形狀 (柱網數, 最多類數)"""
+    classes = [np.unique(engine.masked_tributary(mask, a, b)[0][mask], return_counts=True)
+               for mask, a, b in zip(masks, span_x, span_y)]
+    k = max([len(areas) for areas, _ in classes], default=0)
+    counts = np.zeros((len(classes), max(k, 1)))
+    areas = np.zeros((len(classes), max(k, 1)))
+    for i, (a, c) in enumerate(classes):
+        areas[i, :len(a)], counts[i, :len(c)] = a, c
+    return counts, areas
+
+
+def optimize_design(land_width, land_depth, floors, perimeter=None, latitude=25.03,
+                    glass_idx=1, wall_idx=1, p_conc=2500, p_steel=28000,
+                    spans=SPAN_RANGE, col_sizes=COL_RANGE, fc_options=engine.FC_OPTIONS,
+                    rebar_options=None, max_ratio=1.0, actual_span=True, include_facade=True, site=None,
+                    window_ratio=engine.WINDOW_RATIO, transitions=()):
+    """掃描所有設計組合並回傳 (Pareto 前緣 dict, 統計 dict)
+
+    目標：總造價、D/C 比、柱數皆越小越好。不安全 (D/C >= max_ratio) 的組合
+    在算量估價之前就先剔除。site 為不規則基地多邊形 (land_width / land_depth 為其外框)，
+    面積、周長與各柱網的柱數改由多邊形計算。
+    掃描的柱斷面與強度用於下部樓層，transitions (同 column_stack.floor_schedule) 的上部斷面固定；
+    D/C 取各段最下層的最大值，柱體積逐段加總，柱鋼筋依分組配筋估算 (engine.estimate_column_steel)。
+    """
+    t0 = time.perf_counter()
+    spans = np.asarray(spans, dtype=float)
+    col_sizes = np.asarray(col_sizes)
+    fc_options = np.asarray(fc_options)
+    rebar_options = np.arange(len(engine.REBAR_SIZES)) if rebar_options is None else np.asarray(rebar_options)
+    if site is None:
+        land_area = land_width * land_depth
+        if perimeter is None:
+            perimeter = (land_width + land_depth) * 2
+    else:
+        land_area = site_polygon.polygon_area(site)
+        if perimeter is None:
+            perimeter = site_polygon.polygon_perimeter(site)
+
+    # 1. 柱網：不同柱距可能得到相同的 nx, ny，先去重
+    sx, sy = (a.ravel() for a in np.meshgrid(spans, spans, indexing="ij"))
+    nx, ny = engine.grid_counts(land_width, land_depth, sx, sy)
+    if actual_span:
+        asx, asy = engine.actual_spans(land_width, land_depth, nx, ny)
+    else:
+        asx, asy = sx, sy
+    trib = engine.governing_trib_area(nx, ny, asx, asy)
+    _, first = np.unique(np.column_stack([nx, ny, trib]), axis=0, return_index=True)
+    sx, sy, nx, ny, asx, asy, trib = (a[first] for a in (sx, sy, nx, ny, asx, asy, trib))
+    n_layouts = len(first)
+    if site is None:
+        layout_cols = nx * ny
+        class_counts, class_areas = engine.grid_trib_classes(nx, ny, asx, asy)
+    else:
+        masks = [site_polygon.column_mask(site, *engine.grid_coords(land_width, land_depth, a, b))
+                 for a, b in zip(nx, ny)]
+        layout_cols = np.array([mask.sum() for mask in masks], dtype=int)
+        class_counts, class_areas = _masked_trib_classes(masks, asx, asy)
+
+    # 變斷面：各段 (起始樓層, 柱寬, 柱深, f'c)，同一起始樓層只保留最後一個 (同 floor_schedule)
+    steps = [t for t in sorted(transitions) if t[0] < floors]
+    pieces = [t for t, nxt in zip(steps, [t[0] for t in steps[1:]] + [floors]) if t[0] < nxt]
+    base_floors = pieces[0][0] if pieces else floors
+
+    # 2. 柱網 × 斷面 × 強度 的檢核，先剔除不安全組合
+    L, W, D, F = (a.ravel() for a in np.meshgrid(np.arange(n_layouts), col_sizes, col_sizes, fc_options, indexing="ij"))
+    n_checked = len(L)
+    total_load, capacity, ratio = engine.column_check(trib[L], floors, F, W, D)
+    if base_floors == 0:
+        ratio = np.zeros_like(ratio)
+    for start, w, d, f in pieces:
+        ratio = np.maximum(ratio, engine.column_check(trib[L], floors - start, f, w, d)[2])
+    ok = (ratio < max_ratio) & (layout_cols[L] > 0)
+    L, W, D, F, ratio = L[ok], W[ok], D[ok], F[ok], ratio[ok]
+
+    # 3. 可行解才做算量與估價 (柱鋼筋依分組配筋估算，主筋規格另於前緣上選定)
+    total_cols = layout_cols[L]
+    ends = [t[0] for t in pieces[1:]] + [floors]
+    col_area = W / 100 * D / 100 * base_floors     # 每支柱各層斷面積合計 (m²)
+    for (start, w, d, _), end in zip(pieces, ends):
+        col_area = col_area + w / 100 * d / 100 * (end - start)
+    vol_col = col_area * engine.STOREY_HEIGHT * total_cols
+    steel_col = engine.estimate_column_steel(class_counts[L], class_areas[L], floors, F, W, D,
+                                             transitions=pieces)
+    vol_total, weight_steel = engine.structure_quantity(land_area, floors, W, D, total_cols,
+                                                        vol_col=vol_col, steel_col=steel_col)
+    grand_total = engine.structure_cost(vol_total, weight_steel, p_conc, p_steel)
+    if include_facade:
+        grand_total = grand_total + engine.facade_cost(perimeter, floors, wall_idx, glass_idx,
+                                                       wall_ratio=1 - window_ratio, window_ratio=window_ratio)
+
+    # 4. Pareto 前緣，依總造價排序
+    front = np.flatnonzero(pareto_mask(grand_total, ratio, total_cols))
+    front = front[np.argsort(grand_total[front], kind="stable")]
+    L, W, D, F = L[front], W[front], D[front], F[front]
+
+    # 5. 前緣上每個方案選主筋：根數最少者
+    bars = engine.rebar_count(W[:, None], D[:, None], engine.REBAR_AREA[rebar_options][None, :])
+    best_bar = np.argmin(bars, axis=1)
+    result = {
+        "span_x": sx[L],
+        "span_y": sy[L],
+        "nx": nx[L],
+        "ny": ny[L],
+        "total_cols": total_cols[front],
+        "col_w": W,
+        "col_d": D,
+        "fc": F,
+        "rebar_idx": rebar_options[best_bar],
+        "num_bars": bars[np.arange(len(front)), best_bar],
+        "ratio": ratio[front],
+        "grand_total": grand_total[front],
+    }
+    stats = {
+        "layouts": n_layouts,
+        "checked": n_checked,
+        "feasible": int(ok.sum()),
+        "front": len(front),
+        "elapsed": time.perf_counter() - t0,
+    }
+    return result, stats
@@ -0,0 +1,207 @@
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# ==========================================
+# 跨 session / 跨行程的持久化結果快取 (SQLite，單一檔案)
+# key = 命名空間 + 輸入的正規化雜湊 (同 design_dag 的指紋)；值以 pickle 存成 BLOB
+# 計算公式所在的原始碼改變時版本號跟著改變，舊版本的結果不再命中，超過 CACHE_MAX_AGE_DAYS 未使用才刪除
+# (同時部署的兩個版本共用檔案時不會互相清空)；總大小超過上限時刪除最久未用的項目
+# 多個 Streamlit worker 行程共用同一個檔案 (WAL 模式，讀取不互相阻塞)
+# ==========================================
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.environ.get("STRUCTURE_APP_CACHE", os.path.join(HERE, ".cache", "design_results.sqlite"))
+CACHE_MAX_MB = float(os.environ.get("STRUCTURE_APP_CACHE_MB", "256"))
+CACHE_MAX_AGE_DAYS = float(os.environ.get("STRUCTURE_APP_CACHE_DAYS", "7"))
+CACHE_VERSION = 1           # 公式以外的不相容變更 (例如結果格式) 時手動遞增
+
+# 結果取決於這些檔案的內容：任一檔案改變即視為新版本 (包含 app，因為繪圖函數寫在 app 內)
+SOURCE_FILES = ["design_engine.py", "design_dag.py", "column_stack.py", "site_polygon.py", "rebar_layout.py",
+                "design_optimizer.py", "uncertainty.py", "sensitivity.py", "plan_render.py", "plan_export.py",
+                "render_cache.py", "portfolio.py", "batch_cli.py", "design_inputV6.py", "design_inputproEd.py"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def source_version(files=SOURCE_FILES, base=HERE):
+    """CACHE_VERSION + 相關原始碼內容的雜湊"""
+    h = hashlib.blake2b(str(CACHE_VERSION).encode(), digest_size=8)
+    for name in files:
+        h.update(name.encode())
+        try:
+            with open(os.path.join(base, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b"-")
+    return h.hexdigest()
+
+
+def input_key(namespace, args=(), kwargs=None):
+    """命名空間 + 輸入的正規化雜湊 (陣列取內容，dict 依 key 排序)"""
+    from design_dag import value_fingerprint
+    return f"{namespace}:{value_fingerprint((args, kwargs or {}))}"
+
+
+class DiskCache:
+    """SQLite 持久化快取 (執行緒安全；每條執行緒一個連線)
+
+    path 為 None 或 enabled=False 時不做任何事 (每次都是未命中)。
+    資料庫錯誤 (鎖定逾時、磁碟已滿、檔案損毀) 一律視為未命中，不影響計算本身。
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_MB * 2**20, version=None,
+                 max_age=CACHE_MAX_AGE_DAYS * 86400):
+        self.path = path or None
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = self.path is not None
+        self._version = version
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = source_version()
+        return self._version
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        with self._lock:
+            if not self._ready:
+                conn.executescript(_SCHEMA)
+                # 其他版本的結果只在久未使用時才刪除 (可能是仍在執行的另一個部署版本)
+                conn.execute("DELETE FROM entries WHERE version != ? AND accessed < ?",
+                             (self.version, time.time() - self.max_age))
+                self._ready = True
+        return conn
+
+    def get(self, key):
+        """回傳 (是否命中, 值)"""
+        if not self.enabled:
+            return False, None
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM entries WHERE key = ? AND version = ?",
+                               (key, self.version)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+                value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self.errors += 1
+            row = None
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, key.split(":", 1)[0], self.version, blob, len(blob), now, now))
+            self._evict(conn)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict(self, conn):
+        """總大小超過上限時，依最後使用時間刪除到上限的 90%"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - self.max_bytes * 0.9
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                victims.append((key,))
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def memoize(self, namespace):
+        """函數結果依輸入持久化的裝飾器 (可再外包 st.cache_data 作為行程內的第一層)"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = input_key(namespace, args, kwargs)
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                value = func(*args, **kwargs)
+                self.put(key, value)
+                return value
+            return wrapper
+        return decorator
+
+    def clear(self):
+        if not self.enabled:
+            return
+        try:
+            self._conn().execute("DELETE FROM entries")
+        except sqlite3.Error:
+            self.errors += 1
+
+    def stats(self):
+        """命中率與檔案統計"""
+        entries, size = 0, 0
+        if self.enabled:
+            try:
+                entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            except sqlite3.Error:
+                self.errors += 1
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "errors": self.errors,
+            "entries": entries,
+            "cache_mb": size / 2**20,
+        }
+
+
+# 全域共用快取 (STRUCTURE_APP_CACHE 設為空字串即停用)
+result_cache = DiskCache()
@@ -0,0 +1,184 @@
+"""多使用者同時操作的負載測試 (以 Streamlit AppTest 模擬 session)
+
+用法：
+    python loadtest.py                                   # 兩個 app 各 8 個 session、每個 20 次互動
+    python loadtest.py design_inputV6.py --sessions 16 --interactions 50
+    python loadtest.py --cold                            # 每次 rerun 前清空所有快取並停用磁碟快取 (對照組)
+    python loadtest.py --json loadtest.json
+
+每個 session 在獨立執行緒中反覆隨機改動一個輸入元件或切換分頁並 rerun (與伺服器同一行程、共用模組層級快取)，
+回報 rerun 延遲 p50/p95/p99、整體吞吐量 (rerun/s) 與每個 session 的平均記憶體增量。
+
+AppTest 每次 rerun 會替換行程內唯一的 Runtime，無法真正同時執行，因此 rerun 以鎖排隊：
+「延遲」為使用者感受到的時間 (排隊 + 執行)，「服務時間」為單次 rerun 本身的執行時間。
+單核心、受 GIL 限制的伺服器上，這與實際多 session 互相等待的情形相近。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from disk_cache import result_cache
+from render_cache import plot_cache, process_rss_mb
+
+APPS = ["design_inputV6.py", "design_inputproEd.py"]
+SKIP_KEYS = {"perf_panel"}      # 除錯面板不列入隨機操作
+TAB_KEY = "active_tab"          # 主分頁的 key (切換分頁也是一種互動)
+_run_lock = threading.Lock()
+
+
+def _widgets(at):
+    """目前畫面上可隨機操作的輸入元件"""
+    widgets = list(at.slider) + list(at.number_input) + list(at.selectbox) + list(at.select_slider) + list(at.checkbox)
+    return [w for w in widgets if w.key not in SKIP_KEYS]
+
+
+def random_value(widget, rng, defaults):
+    """依元件類型產生合法的隨機值；數字輸入以初始值的 0.5~1.5 倍為範圍，避免柱網無限放大"""
+    kind = type(widget).__name__
+    if kind in ("Selectbox", "SelectSlider"):
+        return rng.choice(widget.options)
+    if kind == "Checkbox":
+        return not widget.value
+    if kind == "Slider":
+        lo, hi, step = widget.min, widget.max, widget.step
+        value = lo + step * rng.randint(0, int(round((hi - lo) / step)))
+        return int(value) if isinstance(widget.value, int) else round(value, 6)
+    base = defaults.setdefault(widget.label, widget.value)
+    if isinstance(base, int):
+        value = rng.randint(max(1, base // 2), max(1, base * 3 // 2))
+    else:
+        value = round(base * rng.uniform(0.5, 1.5), 2)
+    if widget.min is not None:
+        value = max(value, widget.min)
+    if widget.max is not None:
+        value = min(value, widget.max)
+    return value
+
+
+def clear_caches():
+    st.cache_data.clear()
+    plot_cache.clear()
+
+
+def run_session(path, interactions, seed, think_time=0.0, cold=False, tab_switch=0.25, timeout=120):
+    """模擬單一使用者：首次載入後隨機互動 (tab_switch 機率為切換分頁)
+
+    回傳 (各次延遲秒數, 各次服務時間秒數, 例外次數, AppTest)
+    """
+    rng = random.Random(seed)
+    defaults = {}
+    latencies = []
+    service = []
+    errors = 0
+    at = AppTest.from_file(path, default_timeout=timeout)
+    for i in range(interactions + 1):
+        tabs = [t.label for t in at.tabs]
+        if i > 0 and tabs and rng.random() < tab_switch:
+            at.session_state[TAB_KEY] = rng.choice(tabs)
+        elif i > 0 and _widgets(at):
+            widget = rng.choice(_widgets(at))
+            widget.set_value(random_value(widget, rng, defaults))
+        t0 = time.perf_counter()
+        with _run_lock:
+            t1 = time.perf_counter()
+            if cold:
+                clear_caches()
+            at.run()
+            t2 = time.perf_counter()
+        latencies.append(t2 - t0)
+        service.append(t2 - t1)
+        errors += len(at.exception)
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+    return latencies, service, errors, at
+
+
+def load_test(path, sessions=8, interactions=20, think_time=0.0, cold=False, tab_switch=0.25, seed=0):
+    """以 sessions 條執行緒同時操作同一個 app，回傳統計 dict"""
+    path = os.path.abspath(path)
+    result_cache.enabled = result_cache.path is not None and not cold
+    # 暖身：先載入一次，模組匯入與字型等一次性成本不計入記憶體增量
+    AppTest.from_file(path, default_timeout=120).run()
+    clear_caches()
+    cache_before = plot_cache.stats()
+    rss_before = process_rss_mb()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, path, interactions, seed + k, think_time, cold, tab_switch) for k in range(sessions)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+    rss_after = process_rss_mb()
+    cache_after = plot_cache.stats()
+    hits = cache_after["hits"] - cache_before["hits"]
+    misses = cache_after["misses"] - cache_before["misses"]
+
+    first = np.array([r[1][0] for r in results]) * 1000
+    reruns = np.concatenate([r[0][1:] for r in results]) * 1000
+    service = np.concatenate([r[1][1:] for r in results]) * 1000
+    all_runs = sessions * (interactions + 1)
+    pct = np.percentile(reruns, [50, 95, 99]) if len(reruns) else [np.nan] * 3
+    # AppTest 物件 (含 session_state) 仍存活時量測，記憶體增量才包含所有 session
+    stats = {
+        "app": os.path.basename(path),
+        "sessions": sessions,
+        "interactions": interactions,
+        "cold": cold,
+        "first_load_ms": float(np.median(first)),
+        "p50_ms": float(pct[0]),
+        "p95_ms": float(pct[1]),
+        "p99_ms": float(pct[2]),
+        "mean_ms": float(reruns.mean()) if len(reruns) else float("nan"),
+        "service_p50_ms": float(np.median(service)) if len(service) else float("nan"),
+        "service_p95_ms": float(np.percentile(service, 95)) if len(service) else float("nan"),
+        "throughput": all_runs / wall,
+        "wall_s": wall,
+        "errors": sum(r[2] for r in results),
+        "rss_mb": rss_after,
+        "mb_per_session": (rss_after - rss_before) / sessions if rss_before is not None else None,
+        "render_hit_rate": hits / max(hits + misses, 1),
+    }
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit app 多 session 負載測試")
+    parser.add_argument("apps", nargs="*", default=APPS, help="要測試的 app 腳本 (預設兩個版本都測)")
+    parser.add_argument("--sessions", type=int, default=8, help="同時 session 數 (預設 8)")
+    parser.add_argument("--interactions", type=int, default=20, help="每個 session 的互動次數 (預設 20)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="互動間平均停頓秒數 (預設 0)")
+    parser.add_argument("--cold", action="store_true", help="每次 rerun 前清空 st.cache_data 與繪圖快取，並停用磁碟快取")
+    parser.add_argument("--tab-switch", type=float, default=0.25, help="每次互動為切換分頁的機率 (預設 0.25)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="結果另存為 JSON")
+    args = parser.parse_args(argv)
+
+    report = []
+    for app in args.apps:
+        s = load_test(app, args.sessions, args.interactions, args.think_time, args.cold, args.tab_switch, args.seed)
+        report.append(s)
+        per_session = f"{s['mb_per_session']:.1f} MB" if s["mb_per_session"] is not None else "-"
+        print(f"{s['app']}: {s['sessions']} sessions × {s['interactions']} 次互動"
+              f"{' (無快取)' if s['cold'] else ''}\n"
+              f"  rerun 延遲  p50 {s['p50_ms']:.0f} ms / p95 {s['p95_ms']:.0f} ms / p99 {s['p99_ms']:.0f} ms"
+              f"  (首次載入 {s['first_load_ms']:.0f} ms)\n"
+              f"  服務時間  p50 {s['service_p50_ms']:.0f} ms / p95 {s['service_p95_ms']:.0f} ms\n"
+              f"  吞吐量 {s['throughput']:.1f} rerun/s，總耗時 {s['wall_s']:.1f} s，例外 {s['errors']} 次\n"
+              f"  記憶體 每 session {per_session}，行程 RSS {s['rss_mb']:.0f} MB，"
+              f"繪圖快取命中率 {s['render_hit_rate']*100:.0f} %")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if any(s["errors"] for s in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
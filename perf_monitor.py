@@ -0,0 +1,100 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# ==========================================
+# 效能監測：記錄每次 rerun 各段落與各張圖的耗時、峰值記憶體，可選擇以 cProfile 分析
+# 結果顯示於側邊欄除錯面板，並逐行附加到 JSON Lines 記錄檔
+# ==========================================
+
+PERF_LOG_PATH = os.environ.get("STRUCTURE_APP_PERF_LOG", "perf_log.jsonl")
+last_summary = {}      # app -> 最近一次 rerun 的摘要 (供 startup_report 等工具讀取)
+
+
+class RerunTimer:
+    """單次 rerun 的計時器
+
+    lap(name)   ：記錄自上一個 lap 起的耗時 (以段落結尾打點，不需改變縮排)
+    stage(name) ：with 區塊計時 (用於單張圖等巢狀項目，其時間也包含在所屬段落內)
+    memory=True 時以 tracemalloc 量測本次 rerun 的 Python 記憶體峰值 (有額外開銷，僅除錯時開啟)。
+    """
+
+    def __init__(self, app, memory=False, profile=False):
+        self.app = app
+        self.records = []          # (類別, 名稱, 耗時 ms)
+        self.summary = None
+        self._t0 = time.perf_counter()
+        self._last = self._t0
+        self._own_trace = memory and not tracemalloc.is_tracing()
+        if self._own_trace:
+            tracemalloc.start()
+        if memory:
+            tracemalloc.reset_peak()
+        self._memory = memory
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.records.append(("段落", name, (now - self._last) * 1000))
+        self._last = now
+
+    @contextmanager
+    def stage(self, name, kind="圖"):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((kind, name, (time.perf_counter() - t0) * 1000))
+
+    def finish(self):
+        """結束計時並回傳摘要 dict (重複呼叫回傳同一份)"""
+        if self.summary is not None:
+            return self.summary
+        from render_cache import process_rss_mb
+        if self.profiler is not None:
+            self.profiler.disable()
+        peak_mb = None
+        if self._memory and tracemalloc.is_tracing():
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            if self._own_trace:
+                tracemalloc.stop()
+        self.summary = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "app": self.app,
+            "total_ms": (time.perf_counter() - self._t0) * 1000,
+            "peak_mb": peak_mb,
+            "rss_mb": process_rss_mb(),
+            "profiled": self.profiler is not None,
+            "records": [{"kind": k, "name": n, "ms": round(ms, 3)} for k, n, ms in self.records],
+        }
+        last_summary[self.app] = self.summary
+        return self.summary
+
+    def write_log(self, path=PERF_LOG_PATH):
+        """將本次摘要附加為一行 JSON"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.finish(), ensure_ascii=False) + "\n")
+
+    def profile_text(self, limit=25, sort="cumulative"):
+        """cProfile 結果的文字報表 (依累計時間排序)"""
+        if self.profiler is None:
+            return None
+        buf = io.StringIO()
+        pstats.Stats(self.profiler, stream=buf).strip_dirs().sort_stats(sort).print_stats(limit)
+        return buf.getvalue()
+
+    def profile_bytes(self):
+        """cProfile 原始結果 (.prof，可用 snakeviz / pstats 開啟)"""
+        if self.profiler is None:
+            return None
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
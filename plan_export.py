@@ -0,0 +1,255 @@
+"""結構平面圖向量匯出 (SVG / DXF)，不經 matplotlib
+
+用法：
+    python plan_export.py -o plan.svg                           # 預設 30 m × 20 m 基地
+    python plan_export.py -o plan.dxf --width 3000 --depth 3000 --span-x 3 --span-y 3 --floors 30
+    python plan_export.py -o site.svg --site site.geojson --col-w 80 --col-d 80
+
+內容：基地外框、柱 (依 D/C 紅綠燈上色)、樑線。座標單位為 m，原點為基地外框左下角。
+輸出以產生器逐批 (EXPORT_CHUNK 支柱) 產生文字並寫入檔案，記憶體用量與柱數無關；
+app 的下載按鈕同樣逐批寫入暫存檔，不在記憶體中組出整份文字。
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+import numpy as np
+
+import design_engine as engine
+import plan_render
+
+# ==========================================
+# 柱網依 x 方向分批 (每批數列柱)，每批以 numpy 算好座標後用單一格式字串一次格式化
+# 不建立任何繪圖物件，百萬支柱的平面圖也只佔用一批的暫存記憶體
+# ==========================================
+
+EXPORT_CHUNK = 16384        # 每批輸出的柱數 (控制暫存陣列與字串大小)
+PRECISION = 3               # 座標小數位數 (mm)
+MARGIN = 1.0                # SVG 圖面四周留白 (m)
+
+# DXF 圖層：名稱 -> AutoCAD 顏色索引 (ACI)；D/C 圖層順序同 plan_render.RATIO_COLORS
+DXF_LAYERS = {"SITE": 1, "BEAM": 5, "COLUMN": 8, "DC_OK": 3, "DC_WARN": 30, "DC_FAIL": 1}
+DXF_RATIO_LAYERS = ["DC_OK", "DC_WARN", "DC_FAIL"]
+
+FORMATS = {".svg": "svg", ".dxf": "dxf"}
+MIME_TYPES = {"svg": "image/svg+xml", "dxf": "application/dxf"}
+
+
+def _fmt(template, arrays, sep=""):
+    """把同長度的陣列逐筆代入 template (每筆一組欄位)，一次完成整批格式化"""
+    if not len(arrays[0]):
+        return ""
+    flat = np.column_stack(arrays).ravel().tolist()
+    return sep.join([template] * len(arrays[0])) % tuple(flat)
+
+
+def grid_chunks(xs, ys, mask=None, ratio=None, col_w=engine.PLAN_COL_SIZE, col_d=None, chunk=EXPORT_CHUNK):
+    """柱網分批：每批回傳 dict (柱左下角 x / y、紅綠燈等級、X 向與 Y 向樑線端點)
+
+    mask 為基地內的柱，ratio 為每根柱的 D/C (NaN 視為基地外)，皆為 nx × ny。
+    樑線畫在相鄰兩柱 (都在基地內) 的面與面之間，沿柱中心線。
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    col_d = col_w if col_d is None else col_d
+    nx, ny = len(xs), len(ys)
+    rows = max(1, chunk // max(ny, 1))
+    for a in range(0, nx, rows):
+        lo = max(a - 1, 0)      # 多取前一列柱，接上跨批次的 X 向樑
+        b = min(a + rows, nx)
+        inside = np.ones((b - lo, ny), dtype=bool) if mask is None else np.array(mask[lo:b], dtype=bool)
+        classes = None
+        if ratio is not None:
+            r = np.asarray(ratio[lo:b], dtype=float)
+            inside &= np.isfinite(r)
+            classes = plan_render.ratio_classes(r)
+        X, Y = np.meshgrid(xs[lo:b], ys, indexing="ij")
+        k = a - lo
+        cur = inside[k:]
+        # Y 向樑：同一列柱上下相鄰
+        vy = cur[:, 1:] & cur[:, :-1]
+        # X 向樑：與左側一列柱相鄰 (第一批的第一列沒有左側柱)
+        hx = inside[1:] & inside[:-1]
+        yield {
+            "x": X[k:][cur],
+            "y": Y[k:][cur],
+            "cls": classes[k:][cur] if classes is not None else None,
+            "beam_y": (X[k:, :-1][vy] + col_w / 2, Y[k:, :-1][vy] + col_d, Y[k:, 1:][vy]),
+            "beam_x": (Y[1:][hx] + col_d / 2, X[:-1][hx] + col_w, X[1:][hx]),
+        }
+
+
+def _site_ring(site, width, depth):
+    if site is None:
+        return np.array([[0, 0], [width, 0], [width, depth], [0, depth]], dtype=float)
+    return np.asarray(site, dtype=float)
+
+
+def svg_stream(xs, ys, width, depth, site=None, mask=None, ratio=None,
+               col_w=engine.PLAN_COL_SIZE, col_d=None, col_color="#555", margin=MARGIN):
+    """SVG 文字產生器 (逐批 yield str)
+
+    y 軸以群組 transform 翻轉成向上為正，與平面圖相同方向；ratio 為 None 時柱一律用 col_color。
+    """
+    col_d = col_w if col_d is None else col_d
+    p = PRECISION
+    vw, vh = width + 2 * margin, depth + 2 * margin
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           f'<svg xmlns="http://www.w3.org/2000/svg" width="{vw:.{p}f}m" height="{vh:.{p}f}m" '
+           f'viewBox="{-margin:.{p}f} {-margin:.{p}f} {vw:.{p}f} {vh:.{p}f}">\n'
+           '<style>'
+           '.site{fill:none;stroke:red;stroke-width:0.1;stroke-dasharray:0.5 0.3}'
+           '.beam{fill:none;stroke:blue;stroke-opacity:0.3;stroke-width:0.05}'
+           f'rect{{stroke:#000;stroke-width:0.02;fill:{col_color}}}'
+           + "".join(f".c{i}{{fill:{c}}}" for i, c in enumerate(plan_render.RATIO_COLORS)) +
+           '</style>\n'
+           f'<g transform="matrix(1 0 0 -1 0 {depth:.{p}f})">\n')
+    ring = _site_ring(site, width, depth)
+    yield '<polygon class="site" points="' + _fmt(f"%.{p}f,%.{p}f", (ring[:, 0], ring[:, 1]), " ") + '"/>\n'
+    rect = f'<rect x="%.{p}f" y="%.{p}f" width="{col_w:.{p}f}" height="{col_d:.{p}f}"/>\n'
+    rect_cls = f'<rect class="c%d" x="%.{p}f" y="%.{p}f" width="{col_w:.{p}f}" height="{col_d:.{p}f}"/>\n'
+    for part in grid_chunks(xs, ys, mask, ratio, col_w, col_d):
+        bx, by = part["beam_x"], part["beam_y"]
+        if len(bx[0]) or len(by[0]):
+            yield ('<path class="beam" d="' + _fmt(f"M%.{p}f %.{p}fH%.{p}f", (bx[1], bx[0], bx[2]))
+                   + _fmt(f"M%.{p}f %.{p}fV%.{p}f", by) + '"/>\n')
+        if part["cls"] is None:
+            yield _fmt(rect, (part["x"], part["y"]))
+        else:
+            yield _fmt(rect_cls, (part["cls"], part["x"], part["y"]))
+    yield '</g>\n</svg>\n'
+
+
+def dxf_stream(xs, ys, width, depth, site=None, mask=None, ratio=None,
+               col_w=engine.PLAN_COL_SIZE, col_d=None):
+    """DXF (R12 ASCII) 文字產生器 (逐批 yield str)
+
+    基地外框為封閉 POLYLINE，樑為 LINE，柱為實心 SOLID；柱依 D/C 等級放在 DC_OK / DC_WARN / DC_FAIL 圖層，
+    ratio 為 None 時放在 COLUMN 圖層。
+    """
+    col_d = col_w if col_d is None else col_d
+    p = PRECISION
+    yield "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n"
+    yield f"0\nSECTION\n2\nTABLES\n0\nTABLE\n2\nLAYER\n70\n{len(DXF_LAYERS)}\n"
+    for name, color in DXF_LAYERS.items():
+        yield f"0\nLAYER\n2\n{name}\n70\n0\n62\n{color}\n6\nCONTINUOUS\n"
+    yield "0\nENDTAB\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n"
+    ring = _site_ring(site, width, depth)
+    yield ("0\nPOLYLINE\n8\nSITE\n66\n1\n70\n1\n"
+           + _fmt(f"0\nVERTEX\n8\nSITE\n10\n%.{p}f\n20\n%.{p}f\n", (ring[:, 0], ring[:, 1]))
+           + "0\nSEQEND\n8\nSITE\n")
+    line = f"0\nLINE\n8\nBEAM\n10\n%.{p}f\n20\n%.{p}f\n11\n%.{p}f\n21\n%.{p}f\n"
+    # SOLID 的第 3、4 點順序為交叉 (左上、右上)，才會填滿矩形
+    solid = (f"0\nSOLID\n8\n%s\n10\n%.{p}f\n20\n%.{p}f\n11\n%.{p}f\n21\n%.{p}f\n"
+             f"12\n%.{p}f\n22\n%.{p}f\n13\n%.{p}f\n23\n%.{p}f\n")
+    layers = np.array(DXF_RATIO_LAYERS, dtype=object)
+    for part in grid_chunks(xs, ys, mask, ratio, col_w, col_d):
+        y, x1, x2 = part["beam_x"]
+        yield _fmt(line, (x1, y, x2, y))
+        x, y1, y2 = part["beam_y"]
+        yield _fmt(line, (x, y1, x, y2))
+        x, y = part["x"], part["y"]
+        layer = np.full(len(x), "COLUMN", dtype=object) if part["cls"] is None else layers[part["cls"]]
+        yield _fmt(solid, (layer, x, y, x + col_w, y, x, y + col_d, x + col_w, y + col_d))
+    yield "0\nENDSEC\n0\nEOF\n"
+
+
+def export_stream(fmt, **kw):
+    """依格式 ("svg" / "dxf") 回傳文字產生器"""
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"不支援的格式：{fmt}")
+    return (svg_stream if fmt == "svg" else dxf_stream)(**kw)
+
+
+def _write_encoded(f, chunks):
+    """逐批以 UTF-8 編碼寫入二進位檔，回傳寫入的位元組數 (非字元數)"""
+    size = 0
+    for text in chunks:
+        data = text.encode("utf-8")
+        f.write(data)
+        size += len(data)
+    return size
+
+
+def export_file(fmt, **kw):
+    """逐批寫入匿名暫存檔，回傳已回到開頭的檔案物件 (io.FileIO)
+
+    暫存檔建立時即已刪除，讀完後由呼叫端關閉或交給 GC；
+    st.download_button 只接受 bytes / BytesIO / BufferedReader / RawIOBase，故回傳無緩衝的 FileIO。
+    """
+    raw = tempfile.TemporaryFile(buffering=0)
+    buf = io.BufferedWriter(raw)
+    _write_encoded(buf, export_stream(fmt, **kw))
+    buf.flush()
+    buf.detach()
+    raw.seek(0)
+    return raw
+
+
+def export_bytes(fmt, **kw):
+    """整份檔案的 bytes (經暫存檔串流產生；大檔請用 write_plan 直接寫檔)"""
+    with export_file(fmt, **kw) as f:
+        return f.read()
+
+
+def write_plan(path, fmt=None, **kw):
+    """串流寫入檔案，回傳寫入的位元組數；fmt 未給時依副檔名判斷"""
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"無法由副檔名判斷格式：{path}")
+    with open(path, "wb") as f:
+        return _write_encoded(f, export_stream(fmt, **kw))
+
+
+def plan_download(fmt, **kw):
+    """st.download_button 的延遲產生函數 (按下才逐批寫入暫存檔，不組出整份文字)"""
+    return partial(export_file, fmt, **kw)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="結構平面圖向量匯出 (SVG / DXF)")
+    parser.add_argument("-o", "--output", required=True, help="輸出檔 (.svg / .dxf)")
+    parser.add_argument("--format", choices=sorted(MIME_TYPES), help="輸出格式 (預設依副檔名)")
+    parser.add_argument("--width", type=float, default=30.0, help="基地面寬 (m)")
+    parser.add_argument("--depth", type=float, default=20.0, help="基地深度 (m)")
+    parser.add_argument("--site", help="不規則基地頂點檔 (座標清單或 GeoJSON，取代 --width / --depth)")
+    parser.add_argument("--lonlat", action="store_true", help="頂點檔為經緯度")
+    parser.add_argument("--span-x", type=float, default=6.0, help="X 向柱距 (m)")
+    parser.add_argument("--span-y", type=float, default=5.0, help="Y 向柱距 (m)")
+    parser.add_argument("--floors", type=int, default=7, help="樓層數 (D/C 上色用)")
+    parser.add_argument("--fc", type=float, default=280, help="混凝土強度 f'c")
+    parser.add_argument("--col-w", type=float, default=60, help="柱寬 (cm)")
+    parser.add_argument("--col-d", type=float, default=60, help="柱深 (cm)")
+    parser.add_argument("--no-ratio", action="store_true", help="不依 D/C 上色")
+    args = parser.parse_args(argv)
+
+    import site_polygon
+    t0 = time.perf_counter()
+    site, width, depth = None, args.width, args.depth
+    if args.site:
+        with open(args.site, encoding="utf-8") as f:
+            site = site_polygon.load_site(f.read(), lonlat=args.lonlat)
+        _, width, depth = site_polygon.normalize(site)
+    nx, ny = (int(n) for n in engine.grid_counts(width, depth, args.span_x, args.span_y))
+    sx, sy = engine.actual_spans(width, depth, nx, ny)
+    xs, ys = engine.grid_coords(width, depth, nx, ny)
+    mask = site_polygon.column_mask(site, xs, ys) if site is not None else None
+    ratio = None
+    if not args.no_ratio:
+        loads = engine.column_loads(nx, ny, sx, sy, args.floors, args.fc, args.col_w, args.col_d, mask=mask)
+        ratio = np.where(mask, loads["ratio"], np.nan) if mask is not None else loads["ratio"]
+    t1 = time.perf_counter()
+    size = write_plan(args.output, args.format, xs=xs, ys=ys, width=width, depth=depth, site=site, mask=mask,
+                      ratio=ratio, col_w=args.col_w / 100, col_d=args.col_d / 100)
+    n_cols = int(mask.sum()) if mask is not None else nx * ny
+    print(f"{args.output}：{n_cols:,} 支柱，{size / 2**20:.1f} MB，計算 {t1 - t0:.2f} s、匯出 {time.perf_counter() - t1:.2f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+from functools import lru_cache
+
+import numpy as np
+
+# ==========================================
+# 平面圖繪製：以 Collection 一次畫完所有柱與樑，取代逐柱 add_patch / plot
+# 樑線合成單一複合 Path (LineCollection 每段建一個 Path，千支柱約 9 ms)；柱維持 PolyCollection (點陣化較快)
+# 耗時 (單核主機、PLAN_DPI)：含座標刻度的空白圖與 PNG 輸出即約 60 ms，整張平面圖約 65–120 ms (依柱數)，不保證在 100 ms 內；
+# 圖檔另由 render_cache 依幾何參數快取，參數未變的 rerun 不重畫
+# matplotlib 在第一次繪圖時才載入 (只看基地分頁的 session 不需付出匯入成本)
+# ==========================================
+
+LOD_COLUMNS = 4000          # 柱數超過此值改用簡化繪製 (Level of Detail)
+LOD_MARKERS = 40000         # 柱數超過此值只畫格線 (柱已小於一個像素)
+MAX_LABELS = 200            # FAIL 標籤上限，超過則不逐柱標示 (不安全柱數另以指標顯示)
+MAX_GRID_LINES = 200        # 簡化繪製時每向最多畫的格線數 (更密時每隔數條畫一條，已小於數個像素)
+PLAN_DPI = 120              # 平面圖的輸出解析度 (線條圖，低於預設 200 仍清晰，點陣化與 PNG 壓縮較快)
+
+# 應力紅綠燈：綠 < 0.8 <= 橘 < 1.0 <= 紅
+RATIO_LEVELS = [0.8, 1.0]
+RATIO_COLORS = ['green', 'orange', 'red']
+
+
+@lru_cache(maxsize=None)
+def ratio_style():
+    """紅綠燈色表 (cmap, norm)，供熱圖使用"""
+    from matplotlib.colors import BoundaryNorm, ListedColormap
+    cmap = ListedColormap(RATIO_COLORS)
+    return cmap, BoundaryNorm([-np.inf] + RATIO_LEVELS + [np.inf], cmap.N)
+
+
+def ratio_classes(ratio):
+    """D/C 陣列轉紅綠燈等級 (0=綠, 1=橘, 2=紅)；應力圖外觀只取決於此等級"""
+    return np.digitize(ratio, RATIO_LEVELS).astype(np.uint8)
+
+
+def ratio_colors(ratio):
+    """D/C 陣列轉紅綠燈顏色陣列"""
+    return np.array(RATIO_COLORS)[ratio_classes(ratio)]
+
+
+def column_polys(xs, ys, w, d):
+    """柱網所有柱的四角座標，形狀 (nx*ny, 4, 2)，順序同 for x in xs: for y in ys"""
+    X, Y = (a.ravel() for a in np.meshgrid(xs, ys, indexing="ij"))
+    dx = np.array([0, w, w, 0])
+    dy = np.array([0, 0, d, d])
+    return np.stack([X[:, None] + dx, Y[:, None] + dy], axis=-1)
+
+
+def beam_segments(xs, ys, span_x, span_y, col_size=0.6, mask=None):
+    """樑線 (示意) 線段，形狀 (n, 2, 2)；給 mask 時只保留兩端柱都在基地內的樑"""
+    half = col_size / 2
+    X, Y = np.meshgrid(xs[1:], ys, indexing="ij")
+    bx = np.stack([np.stack([X - span_x + col_size, Y + half], -1), np.stack([X, Y + half], -1)], axis=-2)
+    X, Y = np.meshgrid(xs, ys[1:], indexing="ij")
+    by = np.stack([np.stack([X + half, Y - span_y + col_size], -1), np.stack([X + half, Y], -1)], axis=-2)
+    if mask is not None:
+        bx = bx[mask[1:] & mask[:-1]]
+        by = by[mask[:, 1:] & mask[:, :-1]]
+    return np.concatenate([bx.reshape(-1, 2, 2), by.reshape(-1, 2, 2)])
+
+
+def segment_path(segments):
+    """線段 (n, 2, 2) 合成單一 matplotlib Path (每段 MOVETO + LINETO)"""
+    from matplotlib.path import Path
+    verts = np.asarray(segments, dtype=float).reshape(-1, 2)
+    codes = np.tile(np.array([Path.MOVETO, Path.LINETO], dtype=Path.code_type), len(verts) // 2)
+    return Path(verts, codes)
+
+
+def is_lod(xs, ys):
+    """是否啟用簡化繪製"""
+    return len(xs) * len(ys) > LOD_COLUMNS
+
+
+def draw_grid_plan(ax, xs, ys, span_x, span_y, col_size=0.6, col_color='#555', beam_kw=None, mask=None):
+    """結構平面圖：柱 (PolyCollection) + 樑線 (單一複合 Path 的 PathCollection)
+
+    柱數過多時改為整條格線 + 方形標記，繪製時間與柱數幾乎無關 (格線每向最多 MAX_GRID_LINES 條)。
+    輸出 PNG 時以 PLAN_DPI 點陣化 (render_cache 的 dpi 參數)。
+    mask (nx × ny 布林) 為不規則基地內的柱，基地外的柱與樑不畫 (簡化繪製時格線仍畫滿外框)。
+    """
+    from matplotlib.collections import LineCollection, PathCollection, PolyCollection
+    beam_kw = {"edgecolors": "blue", "facecolors": "none", "alpha": 0.3, "linewidths": 1, **(beam_kw or {})}
+    if is_lod(xs, ys):
+        # LOD：樑線以整條格線表示，柱以標記點表示 (極大柱網只畫格線，交點即柱位)
+        cx, cy = xs + col_size / 2, ys + col_size / 2
+        gx, gy = cx, cy
+        if max(len(cx), len(cy)) > MAX_GRID_LINES:
+            step = -(-max(len(cx), len(cy)) // MAX_GRID_LINES)
+            gx, gy = np.append(cx[:-1:step], cx[-1]), np.append(cy[:-1:step], cy[-1])
+        v = np.stack([np.stack([gx, np.full_like(gx, cy[0])], -1), np.stack([gx, np.full_like(gx, cy[-1])], -1)], 1)
+        h = np.stack([np.stack([np.full_like(gy, cx[0]), gy], -1), np.stack([np.full_like(gy, cx[-1]), gy], -1)], 1)
+        ax.add_collection(LineCollection(np.concatenate([v, h]), **beam_kw))
+        if len(xs) * len(ys) <= LOD_MARKERS:
+            X, Y = np.meshgrid(cx, cy, indexing="ij")
+            if mask is not None:
+                X, Y = X[mask], Y[mask]
+            ms = max(1.0, min(4.0, 400.0 / max(len(xs), len(ys))))
+            ax.plot(X.ravel(), Y.ravel(), linestyle='none', marker='s', markersize=ms, color=col_color)
+    else:
+        polys = column_polys(xs, ys, col_size, col_size)
+        if mask is not None:
+            polys = polys[np.asarray(mask).ravel()]
+        ax.add_collection(PathCollection([segment_path(beam_segments(xs, ys, span_x, span_y, col_size, mask))],
+                                         **beam_kw))
+        ax.add_collection(PolyCollection(polys, facecolors=col_color, edgecolors='black'))
+
+
+def draw_stress_map(ax, xs, ys, ratio, col_w, col_d, label="FAIL", label_kw=None):
+    """結構應力圖：依每根柱的 D/C 上色，回傳不安全柱數
+
+    柱數過多時改以 D/C 熱圖 (imshow) 呈現，不畫個別柱與標籤。
+    ratio 為 NaN 的柱 (不規則基地外) 不畫。
+    """
+    from matplotlib.collections import PolyCollection
+    ratio = np.asarray(ratio)
+    n_fail = int((ratio >= 1.0).sum())
+    inside = np.isfinite(ratio).ravel()
+    if is_lod(xs, ys):
+        cmap, norm = ratio_style()
+        dx = (xs[-1] - xs[0]) / max(len(xs) - 1, 1) / 2
+        dy = (ys[-1] - ys[0]) / max(len(ys) - 1, 1) / 2
+        ax.imshow(ratio.T, origin='lower', cmap=cmap, norm=norm, interpolation='nearest',
+                  extent=(xs[0] - dx, xs[-1] + dx, ys[0] - dy, ys[-1] + dy))
+        return n_fail
+
+    ax.add_collection(PolyCollection(column_polys(xs, ys, col_w, col_d)[inside],
+                                     facecolors=ratio_colors(ratio.ravel()[inside]), edgecolors='black'))
+    if 0 < n_fail <= MAX_LABELS:
+        label_kw = {"color": 'red', "ha": 'center', "fontsize": 8, "dy": 0.8, **(label_kw or {})}
+        dy = label_kw.pop("dy")
+        fi, fj = np.nonzero(ratio >= 1.0)
+        for x, y in zip(xs[fi], ys[fj]):
+            ax.text(x, y + dy, label, **label_kw)
+    return n_fail
+
+
+def draw_site(ax, site, width, depth, **kw):
+    """基地外框：多邊形 (不規則基地) 或 width × depth 矩形"""
+    from matplotlib.patches import Polygon, Rectangle
+    kw = {"fill": False, **kw}
+    if site is None:
+        ax.add_patch(Rectangle((0, 0), width, depth, **kw))
+    else:
+        ax.add_patch(Polygon(site, closed=True, **kw))
+
+
+def draw_column_section(ax, col_w, col_d, num_bars, rebar_size, cover=4, positions=None):
+    """柱斷面示意圖 (單位 cm)：混凝土、箍筋、主筋與配筋標示
+
+    positions 為所有主筋中心座標 (見 rebar_layout.bar_positions)，未給時只畫四角。
+    """
+    from matplotlib.patches import Rectangle
+    ax.add_patch(Rectangle((0, 0), col_w, col_d, facecolor='#ddd', edgecolor='black'))
+    ax.add_patch(Rectangle((cover, cover), col_w - 2 * cover, col_d - 2 * cover,
+                           fill=False, edgecolor='blue', linestyle='--'))
+    if positions is None:
+        positions = [(cover, cover), (col_w - cover, cover), (col_w - cover, col_d - cover), (cover, col_d - cover)]
+    ax.scatter(*np.asarray(positions).T, c='red', s=100)
+    ax.text(col_w / 2, col_d / 2, f"{num_bars}-{rebar_size}", ha='center', color='red', fontweight='bold', fontsize=15)
+    ax.axis('off')
+    ax.set_xlim(-5, col_w + 5)
+    ax.set_ylim(-5, col_d + 5)
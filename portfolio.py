@@ -0,0 +1,183 @@
+import io
+import json
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import design_engine as engine
+import plan_render
+
+# ==========================================
+# 多基地組合地圖：數千 ~ 數萬個候選基地一次向量化評估 (與 batch_cli 相同的計算)，
+# 依氣候帶 / 單坪造價 / D/C 上色，以 pydeck ScatterplotLayer (WebGL) 繪製
+# 資料與圖層只在來源或上色方式改變時建立；圖層內容固定，序列化結果也只算一次，
+# rerun 時前端收到相同的圖面規格，不會重建地圖
+# pandas / batch_cli / pydeck 在第一次用到時才載入，不拖慢 app 啟動
+# ==========================================
+
+DEMO_SITES = 10_000         # 示範資料的基地數
+DEMO_SEED = 0
+
+# 示範用候選基地群 (城市中心緯度, 經度, 權重)：涵蓋熱帶、溫帶、寒帶
+DEMO_CITIES = [
+    (25.03, 121.56, 5), (22.63, 120.30, 3), (24.15, 120.67, 3),     # 台北、高雄、台中
+    (35.68, 139.69, 4), (37.57, 126.98, 3), (31.23, 121.47, 3),     # 東京、首爾、上海
+    (1.35, 103.82, 3), (13.76, 100.50, 2), (-6.21, 106.85, 2),      # 新加坡、曼谷、雅加達
+    (43.06, 141.35, 2), (45.80, 126.53, 1), (59.33, 18.07, 1),      # 札幌、哈爾濱、斯德哥爾摩
+]
+DEMO_SPREAD = 0.25          # 基地在城市中心附近的分佈 (度，常態分佈標準差)
+
+COLOR_MODES = {"climate": "氣候帶", "cost": "單坪造價", "ratio": "D/C"}
+ZONE_RGB = np.array([[230, 85, 13], [49, 163, 84], [49, 130, 189]], dtype=np.uint8)   # 熱帶 / 溫帶 / 寒帶
+RATIO_RGB = np.array([[0, 128, 0], [255, 165, 0], [255, 0, 0]], dtype=np.uint8)     # 同 plan_render.RATIO_COLORS
+COST_STOPS = np.array([[26, 150, 65], [255, 255, 191], [215, 25, 28]], dtype=float)  # 低 → 中 → 高
+COST_PERCENTILES = (5, 95)  # 造價色階的上下限 (百分位，避免極端值壓縮色階)
+POINT_ALPHA = 200
+POINT_RADIUS = 4            # 點半徑 (像素)
+
+
+def demo_sites(n=DEMO_SITES, seed=DEMO_SEED):
+    """示範用候選基地 (DataFrame，欄位同 batch_cli 的輸入)"""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    cities = np.array([c[:2] for c in DEMO_CITIES])
+    weight = np.array([c[2] for c in DEMO_CITIES], dtype=float)
+    city = rng.choice(len(cities), size=n, p=weight / weight.sum())
+    lat, lon = (cities[city] + rng.normal(0, DEMO_SPREAD, (n, 2))).T
+    return pd.DataFrame({
+        "site_id": np.arange(1, n + 1),
+        "lat": lat.round(5),
+        "lon": lon.round(5),
+        "land_width": rng.uniform(15, 80, n).round(1),
+        "land_depth": rng.uniform(12, 60, n).round(1),
+        "floors": rng.integers(3, 31, n),
+        "span_x": rng.choice([5.0, 6.0, 7.0, 8.0], n),
+        "span_y": rng.choice([5.0, 6.0, 7.0], n),
+        "col_w": rng.choice([60, 70, 80, 90, 100], n),
+        "col_d": rng.choice([60, 70, 80, 90, 100], n),
+    })
+
+
+def read_sites(data, name):
+    """上傳檔 (bytes) 轉 DataFrame：.parquet 或 CSV，需有 lat / lon 與 batch_cli 的必要欄位"""
+    import pandas as pd
+    import batch_cli
+    buf = io.BytesIO(data)
+    df = pd.read_parquet(buf) if name.lower().endswith(".parquet") else pd.read_csv(buf)
+    missing = [c for c in ["lat", "lon"] + batch_cli.REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必要欄位：{missing}")
+    return df
+
+
+def evaluate_portfolio(df):
+    """評估所有候選基地，回傳欄位式結果 (numpy 陣列 dict) 與統計
+
+    氣候帶以 engine.climate_zone_code (get_climate_zone 的向量化版本) 計算。
+    """
+    import pandas as pd
+    import batch_cli
+    t0 = time.perf_counter()
+    out = batch_cli.evaluate_sites(df)
+    lat = out["lat"].to_numpy(dtype=float)
+    floor_area = out["land_width"].to_numpy(dtype=float) * out["land_depth"].to_numpy(dtype=float) \
+        * out["floors"].to_numpy(dtype=float)
+    ids = out["site_id"] if "site_id" in out.columns else pd.Series(np.arange(1, len(out) + 1))
+    grand_total = out["grand_total"].to_numpy(dtype=float)
+    return {
+        "name": ids.astype(str).to_numpy(),
+        "lat": lat,
+        "lon": out["lon"].to_numpy(dtype=float),
+        "zone": engine.climate_zone_code(lat),
+        "ratio": out["ratio"].to_numpy(dtype=float),
+        "is_safe": out["is_safe"].to_numpy(dtype=bool),
+        "grand_total": grand_total,
+        "per_ping": grand_total / (floor_area / engine.PING),
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def point_colors(result, mode="climate"):
+    """每個基地的 RGB (n, 3) uint8：氣候帶、單坪造價色階 (綠 → 黃 → 紅) 或 D/C 紅綠燈"""
+    if mode == "climate":
+        return ZONE_RGB[result["zone"]]
+    if mode == "ratio":
+        return RATIO_RGB[plan_render.ratio_classes(result["ratio"])]
+    cost = result["per_ping"]
+    lo, hi = np.percentile(cost, COST_PERCENTILES) if len(cost) else (0.0, 1.0)
+    t = np.clip((cost - lo) / (hi - lo if hi > lo else 1.0), 0, 1) * (len(COST_STOPS) - 1)
+    i = np.minimum(t.astype(int), len(COST_STOPS) - 2)
+    f = (t - i)[:, None]
+    return (COST_STOPS[i] * (1 - f) + COST_STOPS[i + 1] * f).round().astype(np.uint8)
+
+
+def view_state(lat, lon):
+    """涵蓋所有基地的地圖中心與縮放等級"""
+    import pydeck as pdk
+    if not len(lat):
+        return pdk.ViewState(latitude=0, longitude=0, zoom=1)
+    extent = max(np.ptp(lat), np.ptp(lon) * np.cos(np.radians(np.median(lat))), 0.01)
+    zoom = float(np.clip(np.log2(360 / extent) - 0.5, 1, 14))
+    return pdk.ViewState(latitude=float((lat.min() + lat.max()) / 2), longitude=float((lon.min() + lon.max()) / 2),
+                         zoom=zoom)
+
+
+@lru_cache(maxsize=None)
+def _compact_deck_class():
+    """pydeck.Deck 的子類別 (第一次建立地圖時才載入 pydeck)"""
+    import pydeck as pdk
+
+    class CompactDeck(pdk.Deck):
+        """建立時就把圖面規格序列化成緊湊 JSON，to_json 直接回傳
+
+        pydeck 的 to_json 逐層縮排排版，上萬筆資料很慢：只序列化空圖層的設定，資料另以緊湊格式填入。
+        圖層內容建立後不再改變，快取的 Deck 重複顯示時不必重新序列化。
+        """
+
+        def __init__(self, records, **kwargs):
+            super().__init__(**kwargs)
+            spec = json.loads(super().to_json())
+            spec["layers"][0]["data"] = records
+            self._json = json.dumps(spec, ensure_ascii=False, separators=(",", ":"))
+
+        def to_json(self):
+            return self._json
+
+    return CompactDeck
+
+
+def build_deck(result, mode="climate"):
+    """pydeck 地圖 (ScatterplotLayer)：點半徑以像素為單位，縮放時大小不變
+
+    圖層資料為精簡的 dict list (不經 DataFrame)，序列化一次後固定 (見 _compact_deck_class)。
+    """
+    import pydeck as pdk
+    rgb = point_colors(result, mode).tolist()
+    zones = [engine.CLIMATE_ZONES[z][0] for z in range(len(engine.CLIMATE_ZONES))]
+    records = [
+        {"p": [lon, lat], "c": c, "n": name, "z": zones[z], "cost": f"{cost:,.0f}", "r": f"{ratio:.2f}"}
+        for lon, lat, c, name, z, cost, ratio in zip(
+            result["lon"].round(5).tolist(), result["lat"].round(5).tolist(), rgb, result["name"].tolist(),
+            result["zone"].tolist(), result["per_ping"].tolist(), result["ratio"].tolist())
+    ]
+    layer = pdk.Layer(
+        "ScatterplotLayer", [], id="portfolio",
+        get_position="p", get_fill_color=f"[c[0], c[1], c[2], {POINT_ALPHA}]",
+        get_radius=POINT_RADIUS, radius_units="pixels",
+        stroked=False, pickable=True, auto_highlight=True,
+    )
+    return _compact_deck_class()(records, layers=[layer], initial_view_state=view_state(result["lat"], result["lon"]),
+                                 map_style=None,
+                                 tooltip={"html": "基地 {n}<br/>{z}<br/>單坪造價 NT$ {cost}<br/>D/C {r}"})
+
+
+def summary(result):
+    """組合統計：各氣候帶基地數、不安全基地數、單坪造價中位數"""
+    counts = np.bincount(result["zone"], minlength=len(engine.CLIMATE_ZONES))
+    return {
+        "n_sites": len(result["lat"]),
+        "zone_counts": {engine.CLIMATE_ZONES[i][0]: int(c) for i, c in enumerate(counts)},
+        "n_unsafe": int((~result["is_safe"]).sum()),
+        "median_per_ping": float(np.median(result["per_ping"])) if len(result["lat"]) else 0.0,
+    }
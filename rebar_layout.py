@@ -0,0 +1,162 @@
+import time
+
+import numpy as np
+
+import design_engine as engine
+# 與批次估價共用的常數與公式 (engine 不反向依賴本模組)
+from design_engine import (ESTIMATE_CHUNK, FY, MAX_BAR_SPACING, MAX_REBAR_RATIO, MIN_CLEAR_SPACING,  # noqa: F401
+                           REBAR_GROUPS, STEEL_DENSITY, TIE_AREA, TIE_DIAMETER, TIE_SPACING, bar_counts,
+                           estimate_column_steel, required_steel, tie_weight)
+
+# ==========================================
+# 柱主筋配置：主筋沿斷面周邊排列 (四角 + 各面中間筋)，並檢核最小淨間距、最大中心間距與最大鋼筋比
+# 分組最佳化：柱 × 樓層 的每個柱段依需求鋼筋量分組 (同斷面內分 REBAR_GROUPS 級)，
+# 每組在所有主筋號數中選出滿足間距限制且鋼筋總重最輕者，全部以陣列一次計算
+# 結果的柱鋼筋重 (主筋 + 箍筋) 取代 180 kg/m³ 經驗值計入柱的鋼筋量
+# 需求鋼筋量、根數與間距、箍筋重及批次估算 (estimate_column_steel) 定義於 design_engine
+# ==========================================
+
+
+def bar_index(bar_area):
+    """主筋面積 (cm²) 對應的號數索引 (engine.REBAR_SIZES)"""
+    return int(np.argmin(np.abs(engine.REBAR_AREA - bar_area)))
+
+
+def bar_positions(col_w, col_d, kx, ky, bar_dia):
+    """單一斷面所有主筋中心座標 (cm)，形狀 (num_bars, 2)，由左下角起逆時針排列"""
+    inset = engine.COVER + TIE_DIAMETER + bar_dia / 2
+    tx = np.linspace(inset, col_w - inset, int(kx) + 2)
+    ty = np.linspace(inset, col_d - inset, int(ky) + 2)[1:-1]
+    return np.concatenate([
+        np.column_stack([tx, np.full_like(tx, inset)]),                 # 下 (含兩角)
+        np.column_stack([np.full_like(ty, col_w - inset), ty]),         # 右
+        np.column_stack([tx[::-1], np.full_like(tx, col_d - inset)]),   # 上 (含兩角)
+        np.column_stack([np.full_like(ty, inset), ty[::-1]]),           # 左
+    ])
+
+
+def section_layout(col_w, col_d, bar_area, as_req=None):
+    """單一斷面、指定主筋的配置 (斷面詳圖用)；as_req 未給時取最小鋼筋比"""
+    idx = bar_index(bar_area)
+    dia = engine.REBAR_DIA[idx]
+    if as_req is None:
+        as_req = engine.MIN_REBAR_RATIO * col_w * col_d
+    res = {k: v.item() for k, v in bar_counts(as_req, col_w, col_d, engine.REBAR_AREA[idx], dia).items()}
+    res["positions"] = bar_positions(col_w, col_d, res["kx"], res["ky"], dia)
+    res["bar_dia"] = float(dia)
+    return res
+
+
+def group_segments(as_req, section_id, n_groups=REBAR_GROUPS):
+    """柱段分組：同一斷面內依需求鋼筋量在 [最小, 最大] 間等分為 n_groups 級 (不需排序)
+
+    as_req 為 (柱數, 樓層數)，section_id 為每層的斷面編號 (樓層數,)；
+    回傳 (每段的組別 (連續編號), 每組的斷面編號)。
+    """
+    n_sec = int(section_id.max()) + 1 if section_id.size else 0
+    lo = np.full(n_sec, np.inf)
+    hi = np.full(n_sec, -np.inf)
+    np.minimum.at(lo, section_id, as_req.min(axis=0, initial=np.inf))
+    np.maximum.at(hi, section_id, as_req.max(axis=0, initial=-np.inf))
+    width = (hi - lo)[section_id]
+    scale = np.divide(n_groups, width, out=np.zeros_like(width), where=width > 0)
+    level = (as_req - lo[section_id]) * scale      # 每層一個位移與倍率，原地運算避免多餘暫存
+    level = np.minimum(level, n_groups - 1, out=level).astype(np.int64)
+    level += section_id * n_groups
+    raw = level
+    # 去掉沒有柱段的組並重新連續編號 (組數很少，以查表取代對全部柱段排序)
+    used = np.flatnonzero(np.bincount(raw.ravel(), minlength=n_sec * n_groups))
+    remap = np.zeros(n_sec * n_groups, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return remap[raw], used // n_groups
+
+
+def optimize_rebar(stack, sizes=None, n_groups=REBAR_GROUPS, storey_height=engine.STOREY_HEIGHT):
+    """所有柱段的分組配筋最佳化
+
+    stack 為 column_stack.build_stack 的柱段陣列；sizes 為可選的主筋號數索引 (預設全部)。
+    每組取組內最大需求鋼筋量，對每個號數算出根數與間距，在可行者中取鋼筋重最輕者；
+    全部不可行時取根數最少 (最粗) 的號數並標示 feasible=False。
+    回傳 dict：groups (每組的斷面、需求、號數、根數、間距、段數、重量)、group (每段組別)、
+    main_weight / tie_weight / steel_weight (ton)、n_infeasible、elapsed。
+    """
+    t0 = time.perf_counter()
+    sizes = np.arange(len(engine.REBAR_SIZES)) if sizes is None else np.atleast_1d(sizes)
+    # 斷面與強度沿每層相同，以每層一值廣播 (不需逐段讀取結構陣列的欄位)
+    floor_w, floor_d, floor_fc = stack["col_w"][0], stack["col_d"][0], stack["fc"][0]
+    as_req = required_steel(stack["pu"], floor_fc, floor_w, floor_d)
+    # 斷面編號：每層的 (柱寬, 柱深) 組合
+    sections, section_id = np.unique(np.column_stack([floor_w, floor_d]), axis=0, return_inverse=True)
+    group, group_section = group_segments(as_req, section_id.ravel(), n_groups)
+    n = len(group_section)
+
+    flat = group.ravel()
+    members = np.bincount(flat, minlength=n)
+    demand = np.zeros(n)
+    np.maximum.at(demand, flat, as_req.ravel())
+    col_w, col_d = sections[group_section].astype(float).T
+
+    # 組 × 號數 一次計算
+    area = engine.REBAR_AREA[sizes]
+    opts = bar_counts(demand[:, None], col_w[:, None], col_d[:, None], area, engine.REBAR_DIA[sizes])
+    main = members[:, None] * opts["num_bars"] * area / 1e4 * storey_height * STEEL_DENSITY
+    best = np.argmin(np.where(opts["feasible"], main, np.inf), axis=1)
+    none_ok = ~opts["feasible"].any(axis=1)
+    best[none_ok] = np.argmin(opts["num_bars"][none_ok], axis=1)
+    rows = np.arange(n)
+    pick = {k: v[rows, best] for k, v in opts.items()}
+    ties = members * tie_weight(col_w, col_d, storey_height)
+    groups = {
+        "col_w": col_w,
+        "col_d": col_d,
+        "demand": demand,
+        "bar_idx": sizes[best],
+        "num_bars": pick["num_bars"],
+        "kx": pick["kx"],
+        "ky": pick["ky"],
+        "spacing_x": pick["spacing_x"],
+        "spacing_y": pick["spacing_y"],
+        "steel_ratio": pick["num_bars"] * area[best] / (col_w * col_d),
+        "feasible": pick["feasible"],
+        "members": members,
+        "main_weight": main[rows, best],
+        "tie_weight": ties,
+    }
+    main_weight = float(groups["main_weight"].sum())
+    tie_total = float(ties.sum())
+    return {
+        "groups": groups,
+        "group": group.astype(np.min_scalar_type(max(n - 1, 0))),
+        "main_weight": main_weight,
+        "tie_weight": tie_total,
+        "steel_weight": main_weight + tie_total,
+        "n_infeasible": int(members[~pick["feasible"]].sum()),
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def schedule_table(design):
+    """配筋表：相同斷面 + 主筋的組合併為一列，回傳 st.dataframe 可用的 dict"""
+    g = design["groups"]
+    keys = np.column_stack([g["col_w"], g["col_d"], g["bar_idx"], g["num_bars"]])
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    members = np.bincount(inv, weights=g["members"], minlength=len(uniq)).astype(int)
+    weight = np.bincount(inv, weights=g["main_weight"] + g["tie_weight"], minlength=len(uniq))
+    feasible = np.bincount(inv, weights=~g["feasible"], minlength=len(uniq)) == 0
+    sx = np.zeros(len(uniq))
+    sy = np.zeros(len(uniq))
+    sx[inv], sy[inv] = g["spacing_x"], g["spacing_y"]
+    ratio = uniq[:, 3] * engine.REBAR_AREA[uniq[:, 2].astype(int)] / (uniq[:, 0] * uniq[:, 1])
+    # 大斷面在前，同斷面依鋼筋比由高到低
+    order = np.lexsort((-ratio, -uniq[:, 0] * uniq[:, 1]))
+    uniq, ratio, members, weight, feasible, sx, sy = (a[order] for a in (uniq, ratio, members, weight, feasible, sx, sy))
+    return {
+        "斷面 (cm)": [f"{w:.0f}×{d:.0f}" for w, d in uniq[:, :2]],
+        "主筋": [f"{n:.0f}-{engine.REBAR_SIZES[int(i)]}" for i, n in uniq[:, 2:]],
+        "鋼筋比 (%)": (ratio * 100).round(2),
+        "間距 X/Y (cm)": [f"{a:.1f} / {b:.1f}" for a, b in zip(sx, sy)],
+        "柱段數": members,
+        "鋼筋重 (ton)": weight.round(2),
+        "間距檢核": ["OK" if ok else "NG" for ok in feasible],
+    }
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from disk_cache import input_key, result_cache
+
+# ==========================================
+# 繪圖快取：以幾何參數為 key 的 PNG LRU 快取
+# 模組層級物件在 Streamlit rerun / session 之間共用，圖面只在幾何改變時重畫
+# 可再接一層磁碟快取 (disk_cache)，伺服器重啟或其他 worker 行程畫過的圖也不必重畫
+# 多個 session 同時要同一張未快取的圖時只畫一次，其餘等待後直接取用
+# 繪圖可送進背景執行緒池 (submit)：每張圖是獨立的 Figure + Agg，同一次 rerun 的各張圖彼此並行
+# ==========================================
+
+# 與 st.pyplot 預設相同，畫面外觀不變
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200, "format": "png"}
+# 背景繪圖執行緒數 (所有 session 共用；Agg 繪製與 PNG 壓縮有部分時間不持有 GIL)
+RENDER_WORKERS = int(os.environ.get("STRUCTURE_APP_RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def array_key(arr):
+    """陣列內容的短雜湊，用於組成快取 key"""
+    arr = np.ascontiguousarray(arr)
+    return hashlib.blake2b(arr.tobytes() + str(arr.shape).encode(), digest_size=16).hexdigest()
+
+
+def process_rss_mb():
+    """目前行程常駐記憶體 (MB)，非 Linux 回傳 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class RenderCache:
+    """有上限的 PNG LRU 快取 (筆數 + 位元組雙重上限，執行緒安全)
+
+    disk 為 disk_cache.DiskCache 時，記憶體未命中會先查磁碟，重畫的結果也寫回磁碟。
+    submit 在背景執行緒池繪製 (回傳 Future)，workers 為執行緒數。
+    """
+
+    def __init__(self, max_entries=64, max_bytes=64 * 2**20, disk=None, workers=RENDER_WORKERS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.workers = max(1, int(workers))
+        self._pool = None
+        self._futures = {}      # 已送進執行緒池、尚未完成的 key -> Future
+        self._store = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}      # 正在繪製的 key -> threading.Event
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.render_seconds = 0.0
+
+    def render(self, key, draw, figsize, dpi=None):
+        """回傳 key 對應的 PNG bytes；未命中時以 draw(fig) 在新 Figure 上繪製
+
+        dpi 未給時使用 SAVEFIG_OPTIONS 的解析度。
+        使用物件導向 Figure (不經 pyplot 全域狀態)，存檔後立即清空，不會累積未關閉的圖。
+        同一 key 正由其他執行緒 (其他 session) 繪製時，等它畫完後取用快取，不重複繪圖。
+        """
+        while True:
+            with self._lock:
+                png = self._store.get(key)
+                if png is not None:
+                    self._store.move_to_end(key)
+                    self.hits += 1
+                    return png
+                busy = self._pending.get(key)
+                if busy is None:
+                    self.misses += 1
+                    self._pending[key] = threading.Event()
+                    break
+            busy.wait()
+        try:
+            return self._render_miss(key, draw, figsize, dpi)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def submit(self, key, draw, figsize, dpi=None):
+        """render 的非同步版：回傳 PNG bytes 的 Future
+
+        記憶體命中時回傳已完成的 Future；同一 key 已送出且尚未完成時共用同一個 Future。
+        draw 只能操作傳入的 fig (不可呼叫 pyplot 或 Streamlit)，且在背景執行緒中才被呼叫，
+        其引用的變數送出後不可再改變。
+        """
+        with self._lock:
+            png = self._store.get(key)
+            if png is not None:
+                self._store.move_to_end(key)
+                self.hits += 1
+                done = Future()
+                done.set_result(png)
+                return done
+            future = self._futures.get(key)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="render")
+                future = self._pool.submit(self._render_submitted, key, draw, figsize, dpi)
+                self._futures[key] = future
+            return future
+
+    def _render_submitted(self, key, draw, figsize, dpi):
+        try:
+            return self.render(key, draw, figsize, dpi)
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def _render_miss(self, key, draw, figsize, dpi=None):
+        """未命中：查磁碟快取或重畫，並放入記憶體快取"""
+        hit = False
+        use_disk = self.disk is not None and self.disk.enabled
+        if use_disk:
+            disk_key = input_key("png", (key, figsize) if dpi is None else (key, figsize, dpi))
+            hit, png = self.disk.get(disk_key)
+        if hit:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            from matplotlib.figure import Figure  # 第一次繪圖才載入 matplotlib
+            t0 = time.perf_counter()
+            fig = Figure(figsize=figsize)
+            try:
+                draw(fig)
+                buf = io.BytesIO()
+                fig.savefig(buf, **(SAVEFIG_OPTIONS if dpi is None else {**SAVEFIG_OPTIONS, "dpi": dpi}))
+            finally:
+                fig.clear()
+            png = buf.getvalue()
+            if use_disk:
+                self.disk.put(disk_key, png)
+            with self._lock:
+                self.render_seconds += time.perf_counter() - t0
+
+        with self._lock:
+            if key not in self._store:
+                self._store[key] = png
+                self._bytes += len(png)
+            while self._store and (len(self._store) > self.max_entries or self._bytes > self.max_bytes):
+                _, old = self._store.popitem(last=False)
+                self._bytes -= len(old)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """命中率與記憶體統計"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._store),
+                "cache_mb": self._bytes / 2**20,
+                "render_ms": self.render_seconds * 1000,
+                "rss_mb": process_rss_mb(),
+            }
+
+
+# 全域共用快取 (記憶體 LRU + 磁碟)
+plot_cache = RenderCache(disk=result_cache)
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+import design_engine as engine
+
+# ==========================================
+# 參數敏感度：以目前方案為中心，一次只改一個參數掃過其滑桿範圍，看 D/C 與總造價的變化
+# 每個參數是一次 evaluate_designs 向量化呼叫 (矩形基地、單一柱斷面的批次模型)，
+# 並以各參數造價的最低 / 最高值與目前方案的差距畫龍捲風圖
+# ==========================================
+
+SWEEP_POINTS = 41           # 連續參數的取樣點數
+
+# 參數名稱 -> (顯示名稱, 掃描範圍)；範圍為 ("slider", 下限, 上限, 間距) 取滑桿範圍，
+# ("relative", 比例) 取目前值的 ±比例 (沒有滑桿的數字輸入)，("options", 值清單) 為選單
+PARAMETERS = {
+    "land_width": ("基地面寬 (m)", ("relative", 0.5)),
+    "land_depth": ("基地深度 (m)", ("relative", 0.5)),
+    "floors": ("樓層數", ("relative", 0.5)),
+    "span_x": ("X向柱距 (m)", ("slider", 3.0, 12.0, 0.25)),
+    "span_y": ("Y向柱距 (m)", ("slider", 3.0, 12.0, 0.25)),
+    "fc": ("混凝土強度 f'c", ("options", engine.FC_OPTIONS)),
+    "col_w": ("柱寬 (cm)", ("slider", 50, 120, 10)),
+    "col_d": ("柱深 (cm)", ("slider", 50, 120, 10)),
+    "p_conc": ("混凝土單價", ("relative", 0.5)),
+    "p_steel": ("鋼筋單價", ("relative", 0.5)),
+    "glass_idx": ("開窗玻璃系統", ("options", list(range(len(engine.GLASS_NAMES))))),
+    "wall_idx": ("外牆裝修材質", ("options", list(range(len(engine.WALL_NAMES))))),
+    "window_ratio": ("開窗率", ("options", engine.WINDOW_RATIOS.tolist())),
+}
+FACADE_PARAMETERS = ["glass_idx", "wall_idx", "window_ratio"]
+INTEGER_PARAMETERS = ["floors", "fc", "col_w", "col_d", "glass_idx", "wall_idx"]
+
+
+def sweep_values(name, current):
+    """參數的掃描值 (含目前值，已排序去重)"""
+    kind = PARAMETERS[name][1]
+    if kind[0] == "slider":
+        _, lo, hi, step = kind
+        values = np.arange(lo, hi + step / 2, step, dtype=float)
+    elif kind[0] == "relative":
+        values = np.linspace(current * (1 - kind[1]), current * (1 + kind[1]), SWEEP_POINTS)
+    else:
+        values = np.asarray(kind[1], dtype=float)
+    values = np.append(values, current)
+    if name in INTEGER_PARAMETERS:
+        values = np.round(values)
+        if name == "floors":
+            values = np.maximum(values, 1)
+    return np.unique(values)
+
+
+def sweep(base, name, values=None, actual_span=True, cost_key="grand_total"):
+    """單一參數掃描 (一次向量化計算)，回傳 {"values", "ratio", "cost"}
+
+    base 為 evaluate_designs 的參數 dict (須含 latitude)；cost_key 為要看的造價欄位。
+    """
+    values = sweep_values(name, base[name]) if values is None else np.asarray(values, dtype=float)
+    kwargs = dict(base)
+    kwargs[name] = values.astype(int) if name in INTEGER_PARAMETERS else values
+    res = engine.evaluate_designs(actual_span=actual_span, **kwargs)
+    n = len(values)
+    return {
+        "values": values,
+        "ratio": np.broadcast_to(res["ratio"], n).astype(float),
+        "cost": np.broadcast_to(res[cost_key], n).astype(float),
+    }
+
+
+def sensitivity(base, names=None, actual_span=True, cost_key="grand_total"):
+    """所有 (或指定) 參數的掃描結果與龍捲風圖資料
+
+    回傳 dict：base_ratio / base_cost (同一模型的目前方案)、curves (參數 -> sweep 結果)、
+    tornado (依造價擺幅由大到小：參數、顯示名稱、最低造價差、最高造價差)、elapsed。
+    """
+    t0 = time.perf_counter()
+    names = list(PARAMETERS) if names is None else list(names)
+    ref = engine.evaluate_designs(actual_span=actual_span, **base)
+    base_cost = float(ref[cost_key])
+    curves = {name: sweep(base, name, actual_span=actual_span, cost_key=cost_key) for name in names}
+    tornado = sorted(
+        ((name, PARAMETERS[name][0], float(c["cost"].min()) - base_cost, float(c["cost"].max()) - base_cost)
+         for name, c in curves.items()),
+        key=lambda row: row[3] - row[2], reverse=True)
+    return {
+        "base_ratio": float(ref["ratio"]),
+        "base_cost": base_cost,
+        "curves": curves,
+        "tornado": tornado,
+        "elapsed": time.perf_counter() - t0,
+    }
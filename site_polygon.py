@@ -0,0 +1,192 @@
+import json
+import re
+
+import numpy as np
+
+import design_engine as engine
+
+# ==========================================
+# 不規則基地：頂點清單 / GeoJSON 座標 → 面積、周長、外框，並以向量化點在多邊形內判定裁切柱網
+# 柱網為規則格點，以掃描線 (每列 y 與所有邊求交點 + searchsorted) 判定，
+# 數百個頂點 × 數萬個柱位仍在數毫秒內完成
+# ==========================================
+
+EARTH_RADIUS = 6371008.8    # 地球平均半徑 (m)
+POINT_CHUNK = 8192          # 任意點判定時每批點數 (控制 點數 × 邊數 的暫存陣列大小)
+BOUNDARY_TOL = 1e-6         # 柱中心與基地邊界的距離小於此值 (m) 視為在邊界上
+
+# 預設範例：L 形基地 (m)
+EXAMPLE_VERTICES = "0, 0\n24, 0\n24, 10\n12, 10\n12, 20\n0, 20"
+
+
+def _geojson_ring(obj):
+    """GeoJSON (Feature / FeatureCollection / Polygon / MultiPolygon) 的第一個外環"""
+    if obj.get("type") == "FeatureCollection":
+        for feature in obj.get("features") or []:
+            if not isinstance(feature, dict):
+                raise ValueError("GeoJSON features 必須是物件清單")
+            ring = _geojson_ring(feature)
+            if ring is not None:
+                return ring
+        return None
+    if obj.get("type") == "Feature":
+        geometry = obj.get("geometry") or {}
+        return _geojson_ring(geometry) if isinstance(geometry, dict) else None
+    if obj.get("type") in ("Polygon", "MultiPolygon"):
+        ring = obj.get("coordinates")
+        # Polygon 為 [外環, 內環...]，MultiPolygon 再多一層
+        for _ in range(1 if obj["type"] == "Polygon" else 2):
+            if not isinstance(ring, list) or not ring:
+                raise ValueError(f"GeoJSON {obj['type']} 的 coordinates 格式錯誤")
+            ring = ring[0]
+        return ring
+    return None
+
+
+def parse_vertices(text):
+    """解析頂點文字，回傳 (頂點陣列 (n, 2), 是否為 GeoJSON)
+
+    支援每行一點 "x, y" (逗號、空白、分號或 tab 分隔，忽略標題與 # 註解行)、
+    JSON 座標陣列 [[x, y], ...] 與 GeoJSON (經緯度)。首尾重複的閉合點會去除。
+    """
+    text = text.strip()
+    is_geojson = False
+    if text[:1] in "[{":
+        try:
+            obj = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"JSON 格式錯誤：{e}") from None
+        if isinstance(obj, dict):
+            obj = _geojson_ring(obj)
+            if obj is None:
+                raise ValueError("GeoJSON 中找不到 Polygon")
+            is_geojson = True
+        if not isinstance(obj, list) or not all(isinstance(row, list) and len(row) >= 2 for row in obj):
+            raise ValueError("座標需為 [[x, y], ...] 的數值配對清單")
+        rows = [row[:2] for row in obj]
+    else:
+        rows = []
+        for line in text.splitlines():
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            parts = [p for p in re.split(r"[,;\s]+", line) if p]
+            try:
+                rows.append([float(p) for p in parts[:2]])
+            except ValueError:
+                if rows:
+                    raise ValueError(f"無法解析的座標：{line}") from None
+                continue    # 第一行為欄位標題
+    try:
+        pts = np.array(rows, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("每個頂點需為 (x, y) 兩個數值") from None
+    if pts.ndim != 2 or pts.shape[1] != 2 or not np.isfinite(pts).all():
+        raise ValueError("每個頂點需為 (x, y) 兩個數值")
+    if len(pts) > 1 and np.allclose(pts[0], pts[-1]):
+        pts = pts[:-1]
+    if len(pts) < 3:
+        raise ValueError("基地多邊形至少需要 3 個頂點")
+    return pts, is_geojson
+
+
+def lonlat_to_local(lonlat):
+    """經緯度 (lon, lat) 轉為以形心為原點的平面座標 (m)，等距圓柱投影，適用於基地尺度"""
+    lonlat = np.asarray(lonlat, dtype=float)
+    lon0, lat0 = lonlat.mean(axis=0)
+    x = np.radians(lonlat[:, 0] - lon0) * EARTH_RADIUS * np.cos(np.radians(lat0))
+    y = np.radians(lonlat[:, 1] - lat0) * EARTH_RADIUS
+    return np.column_stack([x, y])
+
+
+def normalize(poly):
+    """平移多邊形使外框左下角位於原點，回傳 (多邊形, 外框寬, 外框深)"""
+    poly = np.asarray(poly, dtype=float)
+    poly = poly - poly.min(axis=0)
+    width, depth = poly.max(axis=0)
+    return poly, float(width), float(depth)
+
+
+def load_site(text, lonlat=False):
+    """頂點文字 → 已平移至原點的多邊形 (n, 2)；GeoJSON 一律視為經緯度"""
+    pts, is_geojson = parse_vertices(text)
+    if lonlat or is_geojson:
+        pts = lonlat_to_local(pts)
+    if polygon_area(pts) <= 0:
+        raise ValueError("基地多邊形面積為 0")
+    return normalize(pts)[0]
+
+
+def polygon_area(poly):
+    """多邊形面積 (鞋帶公式，與頂點順逆時針無關)"""
+    x, y = np.asarray(poly, dtype=float).T
+    return float(abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2)
+
+
+def polygon_perimeter(poly):
+    """多邊形周長 (m)，供外牆造價使用"""
+    poly = np.asarray(poly, dtype=float)
+    return float(np.hypot(*(np.roll(poly, -1, axis=0) - poly).T).sum())
+
+
+def _edges(poly):
+    poly = np.asarray(poly, dtype=float)
+    nxt = np.roll(poly, -1, axis=0)
+    return poly[:, 0], poly[:, 1], nxt[:, 0], nxt[:, 1]
+
+
+def points_in_polygon(px, py, poly):
+    """任意點是否在多邊形內 (奇偶規則，向量化)
+
+    點 × 邊 的交點判定以 POINT_CHUNK 分批廣播，記憶體用量與點數無關。
+    """
+    px = np.asarray(px, dtype=float)
+    py = np.asarray(py, dtype=float)
+    shape = np.broadcast(px, py).shape
+    px, py = (np.broadcast_to(a, shape).ravel() for a in (px, py))
+    x1, y1, x2, y2 = _edges(poly)
+    slope = np.divide(x2 - x1, y2 - y1, out=np.zeros_like(x1), where=y1 != y2)
+    inside = np.empty(len(px), dtype=bool)
+    for s in range(0, len(px), POINT_CHUNK):
+        cx, cy = px[s:s + POINT_CHUNK, None], py[s:s + POINT_CHUNK, None]
+        # 向 +x 方向的射線與邊相交：邊跨越該點的 y，且交點在點的右側
+        cross = ((y1 > cy) != (y2 > cy)) & (cx < x1 + (cy - y1) * slope)
+        inside[s:s + POINT_CHUNK] = np.count_nonzero(cross, axis=1) % 2 == 1
+    return inside.reshape(shape)
+
+
+def grid_in_polygon(xs, ys, poly):
+    """規則格點 (xs × ys) 是否在多邊形內，形狀 (len(xs), len(ys))
+
+    掃描線：每列 y 與所有邊的交點排序後，以 searchsorted 計算每個 x 左側的交點數 (奇數即在內)。
+    各列加上位移後攤平成單一陣列，一次 searchsorted 完成全部格點。
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    x1, y1, x2, y2 = _edges(poly)
+    n_edges = len(x1)
+    Y = ys[:, None]
+    crosses = (y1 > Y) != (y2 > Y)
+    slope = np.divide(x2 - x1, y2 - y1, out=np.zeros_like(x1), where=y1 != y2)
+    hi = max(xs.max(), x1.max()) + 1.0
+    lo = min(xs.min(), x1.min())
+    inter = np.where(crosses, x1 + (Y - y1) * slope, hi)   # 不相交的邊放在所有點的右側
+    inter.sort(axis=1)
+    offset = (np.arange(len(ys)) * (hi - lo + 1.0))[:, None]
+    flat = (inter + offset).ravel()
+    query = (xs[None, :] + offset).ravel()
+    left = np.searchsorted(flat, query).reshape(len(ys), len(xs)) - np.arange(len(ys))[:, None] * n_edges
+    return (left % 2 == 1).T
+
+
+def column_mask(poly, xs, ys, col_size=engine.PLAN_COL_SIZE, tol=BOUNDARY_TOL):
+    """柱網中位於基地內的柱 (以柱中心判定，中心落在邊界上也算)，poly 為 None 時全部保留"""
+    if poly is None:
+        return np.ones((len(xs), len(ys)), dtype=bool)
+    cx = np.asarray(xs, dtype=float) + col_size / 2
+    cy = np.asarray(ys, dtype=float) + col_size / 2
+    # 奇偶規則對邊界上的點沒有定義：中心或其上下左右 tol 內任一點在多邊形內即保留
+    mask = grid_in_polygon(cx, cy, poly)
+    for dx, dy in ((tol, 0), (-tol, 0), (0, tol), (0, -tol)):
+        mask |= grid_in_polygon(cx + dx, cy + dy, poly)
+    return mask
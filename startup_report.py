@@ -0,0 +1,104 @@
+"""冷啟動報告：模組匯入時間與各分頁的首次繪製時間
+
+用法：
+    python startup_report.py                       # 兩個 app、每個分頁各以全新行程冷啟動一次
+    python startup_report.py design_inputV6.py --json startup.json
+
+每一項都在全新的 Python 行程中量測 (等同容器冷啟動後的第一個 session)：
+  1. 匯入時間：已載入 streamlit 後，再匯入各模組的增量時間
+  2. 冷啟動：以 AppTest 執行一次 app，回報首次繪製 (標題送出) 時間、整次 rerun 時間，
+     以及該分頁是否觸發 pandas / pydeck / matplotlib 載入；另以「全部分頁」模式做對照
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APPS = ["design_inputV6.py", "design_inputproEd.py"]
+MODULES = ["numpy", "pandas", "pyarrow", "matplotlib.figure", "matplotlib.collections", "matplotlib.pyplot",
+           "design_engine", "design_optimizer", "design_dag", "uncertainty", "plan_render", "render_cache"]
+HEAVY = ["pandas", "pydeck", "matplotlib"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_PROBE = """
+import time, streamlit
+t0 = time.perf_counter()
+import {module}
+print((time.perf_counter() - t0) * 1000)
+"""
+
+_APP_PROBE = """
+import json, sys, time
+t_start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import perf_monitor
+at = AppTest.from_file({path!r}, default_timeout=300)
+if {tab!r} is not None:
+    at.session_state["active_tab"] = {tab!r}
+at.session_state["lazy_tabs"] = {lazy!r}
+t0 = time.perf_counter()
+at.run()
+summary = next(iter(perf_monitor.last_summary.values()))
+records = summary["records"]
+print(json.dumps({{
+    "errors": len(at.exception),
+    "first_paint_ms": next(r["ms"] for r in records if r["name"].startswith("首次繪製")),
+    "rerun_ms": (time.perf_counter() - t0) * 1000,
+    "tabs": [t.label for t in at.tabs],
+    "loaded": {{m: any(k == m or k.startswith(m + ".") for k in sys.modules) for m in {heavy!r}}},
+}}))
+"""
+
+
+def _python(code):
+    # 停用磁碟快取，量到的是真正的冷啟動
+    env = {**os.environ, "STRUCTURE_APP_CACHE": ""}
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=HERE, capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "子行程失敗")
+    return out.stdout.strip().splitlines()[-1]
+
+
+def import_times(modules=MODULES):
+    """各模組在全新行程中 (已載入 streamlit) 的匯入時間 (ms)"""
+    return {m: float(_python(_IMPORT_PROBE.format(module=m))) for m in modules}
+
+
+def cold_start(app, tab=None, lazy=True):
+    """全新行程中第一次執行 app 的結果 dict"""
+    code = _APP_PROBE.format(path=os.path.join(HERE, app), tab=tab, lazy=lazy, heavy=HEAVY)
+    return json.loads(_python(code))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模組匯入時間與冷啟動首次繪製報告")
+    parser.add_argument("apps", nargs="*", default=APPS)
+    parser.add_argument("--json", help="結果另存為 JSON")
+    args = parser.parse_args(argv)
+
+    report = {"imports": import_times(), "apps": {}}
+    print("模組匯入時間 (已載入 streamlit 之後，全新行程)")
+    for m, ms in report["imports"].items():
+        print(f"  {m:<26} {ms:8.1f} ms")
+
+    for app in args.apps:
+        first = cold_start(app)
+        rows = [("(預設) " + first["tabs"][0], first)]
+        rows += [(tab, cold_start(app, tab)) for tab in first["tabs"][1:]]
+        rows.append(("全部分頁 (關閉只繪製目前分頁)", cold_start(app, lazy=False)))
+        report["apps"][app] = {name: res for name, res in rows}
+        print(f"\n{app} 冷啟動")
+        print(f"  {'分頁':<32} {'首次繪製':>10} {'整次 rerun':>12}  載入模組")
+        for name, res in rows:
+            loaded = ", ".join(m for m, ok in res["loaded"].items() if ok) or "-"
+            flag = f"  ⚠ 例外 {res['errors']}" if res["errors"] else ""
+            print(f"  {name:<32} {res['first_paint_ms']:8.1f} ms {res['rerun_ms']:10.0f} ms  {loaded}{flag}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""批次柱鋼筋估算 (engine.estimate_column_steel) 與 DAG 逐段分組配筋 (column_steel) 一致"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import design_dag
+import design_engine as engine
+
+SECTIONS = np.arange(50, 121, 10)
+
+
+def random_design(rng):
+    return {
+        "land_width": float(rng.uniform(8, 60)),
+        "land_depth": float(rng.uniform(8, 60)),
+        "floors": int(rng.integers(1, 40)),
+        "span_x": float(rng.uniform(3, 12)),
+        "span_y": float(rng.uniform(3, 12)),
+        "fc": float(rng.choice(engine.FC_OPTIONS)),
+        "col_w": float(rng.choice(SECTIONS)),
+        "col_d": float(rng.choice(SECTIONS)),
+    }
+
+
+def random_transitions(rng, design):
+    # 變斷面：起始樓層可超過總樓層 (不生效)，部分與原斷面相同 (同斷面共用分組)
+    steps = []
+    for _ in range(int(rng.integers(1, 3))):
+        same = rng.random() < 0.3
+        steps.append((int(rng.integers(1, design["floors"] + 3)),
+                      design["col_w"] if same else float(rng.choice(SECTIONS)),
+                      design["col_d"] if same else float(rng.choice(SECTIONS)),
+                      float(rng.choice(engine.FC_OPTIONS))))
+    return tuple(steps)
+
+
+def dag_column_steel(design, transitions):
+    dag = design_dag.build_design_dag(actual_span=True)
+    dag.set_inputs(lat=25.03, glass_idx=1, wall_idx=1, bar_area=engine.REBAR_AREA[2], p_conc=2500, p_steel=28000,
+                   transitions=transitions, **design)
+    return dag["column_steel"]
+
+
+def estimated_column_steel(design, transitions):
+    nx, ny = engine.grid_counts(design["land_width"], design["land_depth"], design["span_x"], design["span_y"])
+    sx, sy = engine.actual_spans(design["land_width"], design["land_depth"], nx, ny)
+    counts, areas = engine.grid_trib_classes(nx, ny, sx, sy)
+    return engine.estimate_column_steel(counts[None], areas[None], design["floors"], design["fc"],
+                                        design["col_w"], design["col_d"], transitions=transitions)[0]
+
+
+@pytest.mark.parametrize("with_transitions", [False, True])
+def test_estimate_matches_dag(with_transitions):
+    rng = np.random.default_rng(21)
+    for _ in range(40):
+        design = random_design(rng)
+        transitions = random_transitions(rng, design) if with_transitions else ()
+        assert estimated_column_steel(design, transitions) == pytest.approx(dag_column_steel(design, transitions),
+                                                                             rel=1e-9), (design, transitions)
+
+
+def test_engine_does_not_import_rebar_layout():
+    # engine 為底層模組：批次估價不應反向載入 rebar_layout (於全新行程檢查)
+    code = "import sys, design_engine as e; e.evaluate_designs(30, 20, 7, 6, 5, 280, 60, 60); print('rebar_layout' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(engine.__file__)))
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,34 @@
+"""最佳化 Pareto 前緣的每一列與 DAG (單一方案完整計算) 的總造價一致"""
+import numpy as np
+import pytest
+
+import design_dag
+import design_engine as engine
+import design_optimizer as opt
+
+LAND_WIDTH, LAND_DEPTH, FLOORS = 30.0, 22.0, 9
+SITE = np.array([[0, 0], [30, 0], [30, 12], [14, 22], [0, 22]], dtype=float)
+CASES = {
+    "default": {},
+    "window_ratio": {"window_ratio": 0.45, "glass_idx": 2, "wall_idx": 0},
+    "transitions": {"window_ratio": 0.45, "transitions": ((4, 60, 60, 280),)},
+    "two_transitions": {"transitions": ((3, 50, 50, 210), (6, 50, 60, 350))},
+    "site_transitions": {"site": SITE, "transitions": ((4, 60, 60, 280),)},
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_front_grand_total_matches_dag(case):
+    kw = CASES[case]
+    front, stats = opt.optimize_design(LAND_WIDTH, LAND_DEPTH, FLOORS, **kw)
+    assert stats["front"] > 0
+    for i in range(stats["front"]):
+        dag = design_dag.build_design_dag(actual_span=True)
+        dag.set_inputs(lat=25.03, land_width=LAND_WIDTH, land_depth=LAND_DEPTH, floors=FLOORS,
+                       span_x=front["span_x"][i], span_y=front["span_y"][i],
+                       glass_idx=kw.get("glass_idx", 1), wall_idx=kw.get("wall_idx", 1),
+                       fc=front["fc"][i], col_w=front["col_w"][i], col_d=front["col_d"][i],
+                       bar_area=engine.REBAR_AREA[front["rebar_idx"][i]], p_conc=2500, p_steel=28000,
+                       window_ratio=kw.get("window_ratio", engine.WINDOW_RATIO),
+                       transitions=kw.get("transitions", ()), site=kw.get("site"))
+        assert front["grand_total"][i] == pytest.approx(dag["grand_total"], rel=1e-9), (case, i)